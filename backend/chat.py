@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from game_roles import Role, RoleAssigner
+from tracing import untraced_task
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ALL_CHANNEL = "all"
+TEAM_CHANNEL = "team"
+
+
+class ChatRoom:
+    """Lobby chat with bounded history, rate limiting and batched fan-out.
+
+    Every channel keeps a fixed-size ring buffer, so chat memory per lobby
+    does not grow with the length of the evening. Messages posted within
+    FLUSH_INTERVAL are sent to each recipient as a single "chat" frame.
+
+    Channels:
+    - "all": everyone in the lobby (and spectators)
+    - "team": players sharing a base role (RoleAssigner.get_base_role),
+      only while a game is in progress; the lone doctor has no team channel
+    """
+
+    HISTORY_SIZE = 50  # messages kept per channel
+    MAX_LENGTH = 280  # characters per message
+    FLUSH_INTERVAL = 0.1  # seconds to batch messages before fan-out
+    RATE_BURST = 5  # messages a player can send in a burst
+    RATE_PER_SECOND = 1.0  # sustained messages per second
+
+    def __init__(self, lobby):
+        self.lobby = lobby
+        self.history: Dict[str, Deque[dict]] = {}
+        self._pending: Dict[str, List[dict]] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # player_id -> (tokens, last time)
+        self._flush_task = None
+        self._seq = 0
+
+    def channel_key(self, player, channel: str) -> Optional[str]:
+        """Get the internal channel key for a player, or None if not allowed."""
+        if channel == ALL_CHANNEL:
+            return ALL_CHANNEL
+        if channel == TEAM_CHANNEL and player.role and player.role != Role.DOCTOR:
+            return f"{TEAM_CHANNEL}:{RoleAssigner.get_base_role(player.role).value}"
+        return None
+
+    def close(self) -> None:
+        """Drop messages not yet sent (the lobby is being reset)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._pending = {}
+
+    def allow(self, player_id: str) -> bool:
+        """Token-bucket rate limit per player."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(player_id, (self.RATE_BURST, now))
+        tokens = min(self.RATE_BURST, tokens + (now - last) * self.RATE_PER_SECOND)
+        if tokens < 1:
+            self._buckets[player_id] = (tokens, now)
+            return False
+        self._buckets[player_id] = (tokens - 1, now)
+        return True
+
+    def post(self, player, channel_key: str, text: str) -> dict:
+        """Record a message and schedule it for fan-out."""
+        self._seq += 1
+        message = {
+            "seq": self._seq,
+            "channel": channel_key.split(":")[0],
+            "playerId": player.id,
+            "from": player.name,
+            "text": text[:self.MAX_LENGTH],
+            "ts": int(time.time() * 1000)
+        }
+
+        if channel_key not in self.history:
+            self.history[channel_key] = deque(maxlen=self.HISTORY_SIZE)
+        self.history[channel_key].append(message)
+        self._pending.setdefault(channel_key, []).append(message)
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = untraced_task(self._flush_later())
+
+        return message
+
+    def history_for(self, player) -> List[dict]:
+        """Get the replayable history visible to a player, oldest first."""
+        messages = list(self.history.get(ALL_CHANNEL, ()))
+        team_key = self.channel_key(player, TEAM_CHANNEL)
+        if team_key:
+            messages.extend(self.history.get(team_key, ()))
+            messages.sort(key=lambda m: m["seq"])
+        return messages
+
+    def reset_teams(self) -> None:
+        """Drop team channels (roles are reassigned every game)."""
+        for key in [k for k in self.history if k != ALL_CHANNEL]:
+            del self.history[key]
+        for key in [k for k in self._pending if k != ALL_CHANNEL]:
+            del self._pending[key]
+
+    def forget_player(self, player_id: str) -> None:
+        """Drop rate-limit state for a player who left."""
+        self._buckets.pop(player_id, None)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.FLUSH_INTERVAL)
+
+        pending, self._pending = self._pending, {}
+        for channel_key, messages in pending.items():
+            # Serialize once per channel batch
+            frame = json.dumps({"type": "chat", "messages": messages})
+            if channel_key == ALL_CHANNEL:
+                self.lobby.spectators.publish(frame)
+
+            # Channel keys are also the lobby's multicast group names ("all", "team:ALLY")
+            await self.lobby.send_to_group(channel_key, frame)
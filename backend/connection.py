@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Optional
+from starlette.websockets import WebSocketState
+from wire import JSON_CODEC
+from opcodes import opcode_frame
+from tracing import current_span, untraced_task
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class Connection:
+    """A client connection, independent of the transport carrying it.
+
+    Handlers and LobbyManager only ever call send_text, so the same game
+    logic serves WebSocket and SSE clients alike. send_text never waits on
+    the network: frames go into a bounded outbound queue that is drained in
+    order by the transport, so a slow client cannot stall a lobby.
+    """
+
+    transport = "unknown"
+
+    MAX_QUEUE = 256  # frames buffered before the client counts as stalled
+
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+        self.player_id: Optional[str] = None  # Set once the client joins
+        self.lobby = None  # LobbyManager the player is in (see connection_registry.py)
+        self.codec = JSON_CODEC  # Negotiated on join/reconnect
+        self.opcodes = False  # Send integer opcodes instead of type strings (negotiated too)
+        self.rtt_ms: Optional[float] = None  # Round-trip time reported by the client
+        self.opened_at = time.time()
+        self.outbound: asyncio.Queue = asyncio.Queue(maxsize=self.MAX_QUEUE)
+        self.closed = False
+
+    @property
+    def queue_depth(self) -> int:
+        """Frames waiting to be written to the client."""
+        return self.outbound.qsize()
+
+    async def send_text(self, text: str) -> None:
+        """Queue a frame for the client (a "send" span when traced)."""
+        parent = current_span()
+        if parent is None:
+            self._enqueue(text)
+            return
+        with parent.child("send", connection=self.id, playerId=self.player_id, bytes=len(text),
+                          queueDepth=self.queue_depth):
+            self._enqueue(text)
+
+    def _enqueue(self, text: str) -> None:
+        if self.closed:
+            raise ConnectionError("Connection closed")
+        if self.opcodes:
+            text = opcode_frame(text)
+        try:
+            self.outbound.put_nowait(text)
+        except asyncio.QueueFull:
+            raise ConnectionError("Client is not keeping up")
+        self._ensure_writer()
+
+    def _ensure_writer(self) -> None:
+        """Make sure something is draining the outbound queue."""
+
+    async def flush(self, timeout: float) -> bool:
+        """Wait until every queued frame has been written (False on timeout or once closed)."""
+        if self.closed:
+            return False
+        try:
+            await asyncio.wait_for(self.outbound.join(), timeout)
+            return not self.closed  # A failed write releases the queue too
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = True
+
+    def _discard_queued(self) -> None:
+        """Drop frames that will never be written, so flush() waiters are released."""
+        while True:
+            try:
+                self.outbound.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self.outbound.task_done()
+
+
+class WebSocketConnection(Connection):
+    """Connection backed by a Starlette WebSocket."""
+
+    transport = "websocket"
+
+    def __init__(self, websocket):
+        super().__init__()
+        self.websocket = websocket
+        self._writer: Optional[asyncio.Task] = None
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None:
+            self._writer = untraced_task(self._write_loop())
+
+    async def _write_loop(self):
+        writing = False  # A frame has been taken off the queue but not marked done
+        try:
+            while True:
+                text = await self.outbound.get()
+                writing = True
+                await self.websocket.send_text(text)
+                writing = False
+                self.outbound.task_done()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error writing to WebSocket: {str(e)}")
+            self.closed = True
+        finally:
+            # Nothing will write the rest; release anyone waiting in flush()
+            if writing:
+                self.outbound.task_done()
+            self._discard_queued()
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = True
+        if self._writer:
+            self._writer.cancel()
+        if self.websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await self.websocket.close(code)
+            except Exception:
+                pass  # Closed by the client meanwhile
+
+
+class SSEConnection(Connection):
+    """Connection backed by a Server-Sent Events stream.
+
+    The HTTP response generator drains the outbound queue, so a stream
+    costs one coroutine and no thread.
+    """
+
+    transport = "sse"
+
+    KEEPALIVE_INTERVAL = 15  # seconds between keep-alive comments
+
+    def __init__(self):
+        super().__init__()
+        # Serializes upstream POSTs so per-player message order is kept
+        self.lock = asyncio.Lock()
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = True
+        # Wake the stream so it can finish
+        try:
+            self.outbound.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def events(self) -> AsyncIterator[str]:
+        """Yield SSE-formatted events until the stream is closed."""
+        yield f"event: session\ndata: {json.dumps({'sessionId': self.id})}\n\n"
+
+        while not self.closed:
+            try:
+                text = await asyncio.wait_for(self.outbound.get(), self.KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if text is None:
+                break
+            yield f"data: {text}\n\n"
+            self.outbound.task_done()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from connection import Connection
+from tracing import untraced_task
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EVICTED = 1011  # WebSocket close code used when a send fails
+
+
+class ConnectionRegistry:
+    """Every open connection, indexed connection <-> player <-> lobby.
+
+    - connection -> player / lobby: connection.player_id and connection.lobby
+    - player -> connection: by_player, O(1) for targeted sends
+    - lobby -> connections: one {player_id: connection} dict per lobby, which
+      is what LobbyManager.connections returns
+
+    A connection whose send fails is evicted from every index right away
+    and closed, so broadcasts stop paying for it; the transport's usual
+    disconnect handling then starts the player's reconnect timeout.
+    """
+
+    def __init__(self):
+        self.connections: Dict[str, Connection] = {}  # connection ID -> connection
+        self.by_player: Dict[str, Connection] = {}
+        self.by_lobby: Dict[object, Dict[str, Connection]] = {}
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def register(self, connection: Connection) -> None:
+        """Track a newly opened connection."""
+        self.connections[connection.id] = connection
+
+    def unregister(self, connection: Connection) -> None:
+        """Forget a closed connection (its player keeps their place in the lobby)."""
+        self.connections.pop(connection.id, None)
+        self._drop_binding(connection)
+
+    def bind(self, connection: Connection, lobby, player_id: str) -> None:
+        """Make connection the one that carries player_id in lobby."""
+        previous = self.by_player.get(player_id)
+        if previous is not None and previous is not connection:
+            self._drop_binding(previous)
+        if connection.player_id not in (None, player_id):
+            self._drop_binding(connection)  # Same connection, new player
+
+        connection.player_id = player_id
+        connection.lobby = lobby
+        self.by_player[player_id] = connection
+        self.lobby_connections(lobby)[player_id] = connection
+
+    def unbind_player(self, player_id: str) -> None:
+        """Detach a player that left the lobby from its connection."""
+        connection = self.by_player.get(player_id)
+        if connection is not None:
+            self._drop_binding(connection)
+            connection.player_id = None
+            connection.lobby = None
+
+    def unbind_lobby(self, lobby) -> None:
+        """Detach every player of a lobby (e.g. when it is reset)."""
+        for player_id in list(self.by_lobby.pop(lobby, {})):
+            self.unbind_player(player_id)
+
+    def get(self, player_id: str) -> Optional[Connection]:
+        """Get the live connection of a player (None if they have none)."""
+        return self.by_player.get(player_id)
+
+    def lobby_connections(self, lobby) -> Dict[str, Connection]:
+        """Get the live {player_id: connection} dict of a lobby."""
+        connections = self.by_lobby.get(lobby)
+        if connections is None:
+            connections = self.by_lobby[lobby] = {}
+        return connections
+
+    async def send(self, connection: Connection, text: str) -> bool:
+        """Send a frame; on failure evict and close the connection (returns False)."""
+        try:
+            await connection.send_text(text)
+            return True
+        except Exception as e:
+            logger.error(f"Evicting connection of player {connection.player_id}: {str(e)}")
+            self.evict(connection)
+            return False
+
+    def evict(self, connection: Connection) -> None:
+        """Stop sending to a connection and close it in the background."""
+        self._drop_binding(connection)
+        if not connection.closed:
+            untraced_task(connection.close(EVICTED))
+
+    def describe(self) -> List[dict]:
+        """Per-connection metadata, for diagnostics."""
+        return [
+            {
+                "id": connection.id,
+                "transport": connection.transport,
+                "playerId": connection.player_id,
+                "lobby": getattr(connection.lobby, "game_id", None),
+                "codec": connection.codec,
+                "rttMs": connection.rtt_ms,
+                "queueDepth": connection.queue_depth,
+                "openedAt": connection.opened_at,
+            }
+            for connection in self.connections.values()
+        ]
+
+    def _drop_binding(self, connection: Connection) -> None:
+        # Keeps connection.player_id so the transport can still report the disconnect
+        player_id = connection.player_id
+        if player_id is None or self.by_player.get(player_id) is not connection:
+            return
+        del self.by_player[player_id]
+        connections = self.by_lobby.get(connection.lobby)
+        if connections is not None and connections.get(player_id) is connection:
+            del connections[player_id]
+
+
+# Create a singleton instance
+connection_registry = ConnectionRegistry()
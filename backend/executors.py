@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class BoundedPool:
+    """A named thread pool for blocking work, with a bounded backlog.
+
+    run() awaits the call on a worker thread and re-raises its exception
+    in the caller. At most workers + max_queue calls are handed to the
+    executor at once; further callers wait (without a thread) until a
+    slot frees up, so a burst of slow disk writes cannot pile up
+    unbounded work. describe() reports backlog and timing for metrics.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pool-{name}")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()  # Counters are updated from the worker threads
+        self.waiting = 0  # Callers blocked on the bound
+        self.queued = 0  # Handed to the executor, not started yet
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_queue_seconds = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) on the pool and return its result."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.max_queue)
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        try:
+            with self._lock:
+                self.queued += 1
+            queued_at = time.perf_counter()
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._call, fn, args, queued_at)
+        finally:
+            self._slots.release()
+
+    def _call(self, fn: Callable[..., Any], args: tuple, queued_at: float) -> Any:
+        # Runs on a worker thread
+        started = time.perf_counter()
+        waited = started - queued_at
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self._queue_seconds += waited
+            self._max_queue_seconds = max(self._max_queue_seconds, waited)
+
+        failed = True
+        try:
+            result = fn(*args)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+                self._run_seconds += time.perf_counter() - started
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+    def describe(self) -> dict:
+        done = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "maxQueue": self.max_queue,
+            "waiting": self.waiting,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avgQueueMs": round(self._queue_seconds / done * 1000, 3) if done else 0.0,
+            "maxQueueMs": round(self._max_queue_seconds * 1000, 3),
+            "avgRunMs": round(self._run_seconds / done * 1000, 3) if done else 0.0
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a short periodic sleep.
+
+    Any lag beyond a few milliseconds means something blocked the loop
+    (a synchronous file write, a long computation, a GC pause).
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self) -> None:
+        self.max_lag = 0.0
+        self.samples = 0
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, time.perf_counter() - expected)
+            self.samples += 1
+
+    def describe(self) -> dict:
+        return {"maxLagMs": round(self.max_lag * 1000, 3), "samples": self.samples}
+
+
+def offload_log_handlers() -> logging.handlers.QueueListener:
+    """Move the root logger's handlers to a background thread.
+
+    Records are put on an unbounded queue by the calling thread (the event
+    loop) and written by the listener thread, so slow stderr or log files
+    never block the loop. Call stop() on the returned listener to flush.
+    """
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+# Create singleton instances
+# CPU-bound work (e.g. PNG encoding); zlib and PIL release the GIL for most of it
+cpu_pool = BoundedPool("cpu", workers=min(4, os.cpu_count() or 1), max_queue=64)
+# Small file and SQLite reads/writes
+disk_pool = BoundedPool("disk", workers=4, max_queue=256)
+POOLS: Dict[str, BoundedPool] = {pool.name: pool for pool in (cpu_pool, disk_pool)}
+loop_monitor = LoopLagMonitor()
+
+
+def describe_executors() -> dict:
+    return {"pools": {name: pool.describe() for name, pool in POOLS.items()}, "loop": loop_monitor.describe()}
@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from typing import List, Optional
+from executors import disk_pool
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv(
+    "GAME_HISTORY_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_history.db")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT UNIQUE NOT NULL,
+    started_at REAL,
+    ended_at REAL NOT NULL,
+    winner TEXT NOT NULL,
+    num_players INTEGER NOT NULL,
+    num_rounds INTEGER NOT NULL,
+    rounds_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_games_ended_at ON games (ended_at);
+
+CREATE TABLE IF NOT EXISTS game_players (
+    game_rowid INTEGER NOT NULL REFERENCES games (id),
+    player_id TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    base_role TEXT NOT NULL,
+    survived INTEGER NOT NULL,
+    won INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_game_players_name ON game_players (player_name COLLATE NOCASE, game_rowid);
+
+-- Aggregates maintained on insert, so stats never scan the game tables
+CREATE TABLE IF NOT EXISTS role_stats (
+    role TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS size_stats (
+    num_players INTEGER PRIMARY KEY,
+    games INTEGER NOT NULL,
+    ally_wins INTEGER NOT NULL,
+    enemy_wins INTEGER NOT NULL
+);
+"""
+
+
+class GameHistoryStore:
+    """Embedded SQLite store for finished games.
+
+    record_game only enqueues; a single writer thread drains the queue and
+    writes whole batches in one transaction, so the event loop never waits
+    on disk. Reads use their own connection on a worker thread.
+    """
+
+    BATCH_SIZE = 50  # games written per transaction at most
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Create the schema and start the writer thread."""
+        if self._writer and self._writer.is_alive():
+            return
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="game-history-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Game history store at {self.db_path}")
+
+    def stop(self) -> None:
+        """Flush pending games and stop the writer thread."""
+        if self._writer and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._writer = None
+
+    def record_game(self, record: dict) -> None:
+        """Queue a finished game for writing (never blocks)."""
+        if not self._writer:
+            logger.warning(f"Game history store not started - dropping game {record['game_id']}")
+            return
+        self._queue.put(record)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+
+            if batch:
+                try:
+                    with conn:
+                        for record in batch:
+                            self._insert(conn, record)
+                    logger.info(f"Wrote {len(batch)} game(s) to history")
+                except Exception as e:
+                    logger.error(f"Error writing game history: {str(e)}")
+        conn.close()
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, record: dict) -> None:
+        players = record["players"]
+        winner = record["winner"]
+
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO games"
+            " (game_id, started_at, ended_at, winner, num_players, num_rounds, rounds_json)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (record["game_id"], record.get("started_at"), record["ended_at"], winner,
+             len(players), len(record["rounds"]), json.dumps(record["rounds"]))
+        )
+        if cursor.rowcount == 0:
+            return  # Already recorded
+        game_rowid = cursor.lastrowid
+
+        conn.executemany(
+            "INSERT INTO game_players"
+            " (game_rowid, player_id, player_name, role, base_role, survived, won)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(game_rowid, p["id"], p["name"], p["role"], p["baseRole"],
+              int(p["survived"]), int(p["won"])) for p in players]
+        )
+
+        conn.executemany(
+            "INSERT INTO role_stats (role, games, wins) VALUES (?, 1, ?)"
+            " ON CONFLICT (role) DO UPDATE SET games = games + 1, wins = wins + excluded.wins",
+            [(p["role"], int(p["won"])) for p in players]
+        )
+        conn.execute(
+            "INSERT INTO size_stats (num_players, games, ally_wins, enemy_wins) VALUES (?, 1, ?, ?)"
+            " ON CONFLICT (num_players) DO UPDATE SET games = games + 1,"
+            " ally_wins = ally_wins + excluded.ally_wins, enemy_wins = enemy_wins + excluded.enemy_wins",
+            (len(players), int(winner == "ALLY"), int(winner == "ENEMY"))
+        )
+
+    # Queries (run on a worker thread via the async wrappers)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[dict]:
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+    def _get_stats(self) -> dict:
+        by_role = self._query("SELECT role, games, wins FROM role_stats ORDER BY role")
+        by_size = self._query(
+            "SELECT num_players, games, ally_wins, enemy_wins FROM size_stats ORDER BY num_players")
+
+        for row in by_role:
+            row["winRate"] = row["wins"] / row["games"]
+        for row in by_size:
+            row["allyWinRate"] = row["ally_wins"] / row["games"]
+
+        return {"byRole": by_role, "byPlayerCount": by_size}
+
+    def _find_games(self, player_name: Optional[str], since: Optional[float],
+                    until: Optional[float], limit: int) -> List[dict]:
+        where = []
+        params = []
+        if player_name:
+            where.append("g.id IN (SELECT game_rowid FROM game_players"
+                         " WHERE player_name = ? COLLATE NOCASE)")
+            params.append(player_name)
+        if since is not None:
+            where.append("g.ended_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("g.ended_at < ?")
+            params.append(until)
+
+        sql = ("SELECT g.game_id, g.started_at, g.ended_at, g.winner, g.num_players, g.num_rounds, g.rounds_json"
+               " FROM games g")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY g.ended_at DESC LIMIT ?"
+        params.append(limit)
+
+        games = self._query(sql, tuple(params))
+        for game in games:
+            game["rounds"] = json.loads(game.pop("rounds_json"))
+        return games
+
+    async def get_stats(self) -> dict:
+        """Win rates by role and by player count, from the aggregate tables."""
+        return await disk_pool.run(self._get_stats)
+
+    async def find_games(self, player_name: Optional[str] = None, since: Optional[float] = None,
+                         until: Optional[float] = None, limit: int = 50) -> List[dict]:
+        """Most recent games, optionally filtered by player name and end date."""
+        return await disk_pool.run(self._find_games, player_name, since, until, limit)
+
+
+# Create a singleton instance
+history_store = GameHistoryStore()
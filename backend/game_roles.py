@@ -1,7 +1,10 @@
 import random
 from enum import Enum
-from typing import List, Dict
+from types import MappingProxyType
+from typing import List, Dict, Mapping
 import logging
+from game_rules import GameRules, DEFAULT_RULES
+from player_status import ALIVE_STATUSES
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,86 +18,114 @@ class Role(Enum):
     HEARTBROKEN_ENEMY = "HEARTBROKEN_ENEMY"
 
 
+# Integer role codes (index into ROLES), for array-backed assignment
+ROLES: List[Role] = list(Role)
+ROLE_CODE: Dict[Role, int] = {role: code for code, role in enumerate(ROLES)}
+
+# Role metadata, built once at import and shared by every lobby
+BASE_ROLE: Mapping[Role, Role] = MappingProxyType({
+    Role.DOCTOR: Role.DOCTOR,
+    Role.ALLY: Role.ALLY,
+    Role.ENEMY: Role.ENEMY,
+    Role.HEARTBROKEN_ALLY: Role.ALLY,
+    Role.HEARTBROKEN_ENEMY: Role.ENEMY
+})
+HEARTBROKEN_ROLES = frozenset({Role.HEARTBROKEN_ALLY, Role.HEARTBROKEN_ENEMY})
+ROLE_COLORS: Mapping[Role, str] = MappingProxyType({
+    Role.DOCTOR: "#4CAF50",  # Green
+    Role.ALLY: "#2196F3",    # Blue
+    Role.ENEMY: "#F44336"    # Red
+})
+ROLE_INFO: Mapping[Role, Mapping[str, object]] = MappingProxyType({
+    role: MappingProxyType({
+        "role": role.value,
+        "baseRole": BASE_ROLE[role].value,
+        "isHeartbroken": role in HEARTBROKEN_ROLES,
+        "color": ROLE_COLORS[BASE_ROLE[role]]
+    })
+    for role in Role
+})
+
+
 class RoleAssigner:
     @staticmethod
-    def assign_roles(num_players: int) -> List[Role]:
+    def role_counts(num_players: int, rules: GameRules = DEFAULT_RULES) -> Dict[Role, int]:
         """
-        Assign roles to players based on the number of players in the game.
+        Decide how many players get each role.
 
         Rules:
         - Exactly one doctor
         - At most one heartbroken (can be ally or enemy)
         - Remaining players split between allies and enemies
-
-        Returns a shuffled list of roles.
+        The chances and ratios come from the lobby's rule set (see rules.json).
         """
-        if num_players < 2:
-            logger.error("Cannot assign roles for fewer than 2 players")
-            return [Role.ALLY] * num_players  # Fallback
+        counts = {Role.DOCTOR: 1}  # Always have one doctor
 
-        roles = [Role.DOCTOR]  # Always have one doctor
+        # Decide if we should have a heartbroken player (if enough players)
+        has_heartbroken = (random.random() < rules.heartbroken_chance
+                           and num_players >= rules.heartbroken_min_players)
 
-        # Decide if we should have a heartbroken player
-        # 70% chance if enough players
-        has_heartbroken = random.random() < 0.7 and num_players >= 3
-
-        # Calculate number of enemies (roughly 1/3 of remaining players, minimum 1)
+        # Calculate number of enemies (a share of the remaining players, with a minimum)
         remaining = num_players - 1  # subtract doctor
         if has_heartbroken:
             remaining -= 1  # subtract heartbroken
 
-        num_enemies = max(1, round(remaining / 3))
-        num_allies = remaining - num_enemies
-
-        # Add regular roles
-        roles.extend([Role.ALLY] * num_allies)
-        roles.extend([Role.ENEMY] * num_enemies)
+        num_enemies = max(rules.min_enemies, round(remaining * rules.enemy_ratio))
+        counts[Role.ALLY] = remaining - num_enemies
+        counts[Role.ENEMY] = num_enemies
 
         # Add heartbroken if needed
         if has_heartbroken:
-            # Decide if heartbroken is ally or enemy (50% chance either way)
-            heartbroken_role = Role.HEARTBROKEN_ALLY if random.random() < 0.5 else Role.HEARTBROKEN_ENEMY
-            roles.append(heartbroken_role)
+            # Decide if heartbroken is ally or enemy
+            heartbroken_role = (Role.HEARTBROKEN_ALLY if random.random() < rules.heartbroken_ally_chance
+                                else Role.HEARTBROKEN_ENEMY)
+            counts[heartbroken_role] = 1
+
+        return counts
+
+    @staticmethod
+    def assign_role_codes(num_players: int, rules: GameRules = DEFAULT_RULES) -> bytearray:
+        """
+        Assign roles as a shuffled array of integer role codes (see ROLES).
+
+        Builds one byte per player and shuffles it in place, so large rooms
+        never allocate a Role object list.
+        """
+        if num_players < 2:
+            logger.error("Cannot assign roles for fewer than 2 players")
+            return bytearray([ROLE_CODE[Role.ALLY]]) * num_players  # Fallback
+
+        counts = RoleAssigner.role_counts(num_players, rules)
+        codes = bytearray()
+        for role, count in counts.items():
+            codes += bytes([ROLE_CODE[role]]) * count
 
         # Shuffle the roles
-        random.shuffle(roles)
+        random.shuffle(codes)
 
-        logger.info(f"Assigned roles: {[r.value for r in roles]}")
-        return roles
+        summary = ", ".join(f"{role.value}={count}" for role, count in counts.items())
+        logger.info(f"Assigned roles for {num_players} players: {summary}")
+        return codes
+
+    @staticmethod
+    def assign_roles(num_players: int, rules: GameRules = DEFAULT_RULES) -> List[Role]:
+        """Assign roles to players. Returns a shuffled list of roles."""
+        return [ROLES[code] for code in RoleAssigner.assign_role_codes(num_players, rules)]
 
     @staticmethod
     def get_base_role(role: Role) -> Role:
         """Get the base role (ALLY or ENEMY) for a given role."""
-        if role in [Role.ALLY, Role.HEARTBROKEN_ALLY]:
-            return Role.ALLY
-        elif role in [Role.ENEMY, Role.HEARTBROKEN_ENEMY]:
-            return Role.ENEMY
-        return role  # DOCTOR remains as is
+        return BASE_ROLE[role]  # DOCTOR remains as is
 
     @staticmethod
     def is_heartbroken(role: Role) -> bool:
         """Check if a role is a heartbroken variant."""
-        return role in [Role.HEARTBROKEN_ALLY, Role.HEARTBROKEN_ENEMY]
+        return role in HEARTBROKEN_ROLES
 
     @staticmethod
-    def get_role_info(role: Role) -> Dict[str, any]:
-        """Get information about a role for the client."""
-        is_heartbroken = RoleAssigner.is_heartbroken(role)
-        base_role = RoleAssigner.get_base_role(role)
-
-        role_colors = {
-            Role.DOCTOR: "#4CAF50",  # Green
-            Role.ALLY: "#2196F3",    # Blue
-            Role.ENEMY: "#F44336"    # Red
-        }
-
-        return {
-            "role": role.value,
-            "baseRole": base_role.value,
-            "isHeartbroken": is_heartbroken,
-            # Default gray if somehow invalid
-            "color": role_colors.get(base_role, "#9E9E9E")
-        }
+    def get_role_info(role: Role) -> Mapping[str, object]:
+        """Get information about a role for the client (a shared read-only mapping)."""
+        return ROLE_INFO[role]
 
     @staticmethod
     def count_team_members(players: List, team_role: Role = None) -> Dict[str, int]:
@@ -103,30 +134,7 @@ class RoleAssigner:
         If team_role is specified, only returns the count for that team.
         Otherwise returns a dictionary with counts for both teams.
         """
-        ally_count = 0
-        enemy_count = 0
-
-        for player in players:
-            if not hasattr(player, 'role') or not player.role:
-                continue
-
-            base_role = RoleAssigner.get_base_role(player.role)
-            if base_role == Role.ALLY:
-                ally_count += 1
-            elif base_role == Role.ENEMY:
-                enemy_count += 1
-
-        # If a specific team was requested, return just that count
-        if team_role == Role.ALLY:
-            return ally_count
-        elif team_role == Role.ENEMY:
-            return enemy_count
-
-        # Otherwise return counts for both teams
-        return {
-            "ALLY": ally_count,
-            "ENEMY": enemy_count
-        }
+        return RoleAssigner._count_teams(players, team_role, alive_only=False)
 
     @staticmethod
     def count_alive_team_members(players: List, team_role: Role = None) -> Dict[str, int]:
@@ -134,33 +142,29 @@ class RoleAssigner:
 
         Similar to count_team_members but only counts alive players.
         """
-        from lobby_manager import PlayerStatus  # Import here to avoid circular imports
+        return RoleAssigner._count_teams(players, team_role, alive_only=True)
 
-        ally_count = 0
-        enemy_count = 0
+    @staticmethod
+    def _count_teams(players, team_role: Role, alive_only: bool):
+        counts = {Role.ALLY: 0, Role.ENEMY: 0, Role.DOCTOR: 0}
 
         for player in players:
-            if not hasattr(player, 'role') or not player.role:
+            role = getattr(player, "role", None)
+            if not role:
                 continue
 
-            # Only count alive players
-            if not hasattr(player, 'status') or player.status not in [PlayerStatus.ALIVE, PlayerStatus.SICK]:
+            # Only count alive players if asked to
+            if alive_only and getattr(player, "status", None) not in ALIVE_STATUSES:
                 continue
 
-            base_role = RoleAssigner.get_base_role(player.role)
-            if base_role == Role.ALLY:
-                ally_count += 1
-            elif base_role == Role.ENEMY:
-                enemy_count += 1
+            counts[BASE_ROLE[role]] += 1
 
         # If a specific team was requested, return just that count
-        if team_role == Role.ALLY:
-            return ally_count
-        elif team_role == Role.ENEMY:
-            return enemy_count
+        if team_role in (Role.ALLY, Role.ENEMY):
+            return counts[team_role]
 
         # Otherwise return counts for both teams
         return {
-            "ALLY": ally_count,
-            "ENEMY": enemy_count
+            "ALLY": counts[Role.ALLY],
+            "ENEMY": counts[Role.ENEMY]
         }
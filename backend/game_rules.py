@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RULES_FILE = os.getenv(
+    "GAME_RULES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+)
+DEFAULT_RULE_SET = os.getenv("GAME_RULES", "default")
+
+
+class GameRules:
+    """A rule set compiled from rules.json.
+
+    Everything the game loop needs is a plain number or a prebuilt callable,
+    so hot paths never look at the config or compare strings.
+    """
+
+    __slots__ = (
+        "name", "min_players",
+        "heartbroken_chance", "heartbroken_min_players", "heartbroken_ally_chance",
+        "enemy_ratio", "min_enemies",
+        "sick_count", "should_end", "doctor_can_die", "round_seconds"
+    )
+
+    def __init__(self, name: str, min_players: int,
+                 heartbroken_chance: float, heartbroken_min_players: int, heartbroken_ally_chance: float,
+                 enemy_ratio: float, min_enemies: int,
+                 sick_count: Callable[[int], int],
+                 should_end: Callable[[int, int], bool],
+                 doctor_can_die: Callable[[int], bool],
+                 round_seconds: Optional[int]):
+        self.name = name
+        self.min_players = min_players
+        self.heartbroken_chance = heartbroken_chance
+        self.heartbroken_min_players = heartbroken_min_players
+        self.heartbroken_ally_chance = heartbroken_ally_chance
+        self.enemy_ratio = enemy_ratio
+        self.min_enemies = min_enemies
+        self.sick_count = sick_count  # (num_players) -> players to sicken per round
+        self.should_end = should_end  # (num_dead, num_non_doctor) -> game over?
+        self.doctor_can_die = doctor_can_die  # (num_alive_others) -> allowed?
+        self.round_seconds = round_seconds  # Default round timer (None: doctor ends rounds)
+
+
+def _compile_sick_count(tiers: list, cap: int) -> Callable[[int], int]:
+    """Turn [[min_players, count], ...] into a table lookup by player count."""
+    tiers = sorted((int(min_players), int(count)) for min_players, count in tiers)
+    if not tiers or tiers[0][0] != 0:
+        raise ValueError("sickPerRound tiers must start at 0 players")
+
+    table = bytearray()
+    for (start, count), (end, _) in zip(tiers, tiers[1:] + [(tiers[-1][0] + 1, 0)]):
+        table += bytes([min(count, cap)]) * (end - start)
+    top = table[-1]
+    size = len(table)
+
+    return lambda num_players: table[num_players] if num_players < size else top
+
+
+def _check_enemy_counts(min_players: int, heartbroken_chance: float, heartbroken_min_players: int,
+                        enemy_ratio: float, min_enemies: int) -> None:
+    """Reject enemy settings that would leave a valid lobby with a negative ally count."""
+    if not 0 <= enemy_ratio <= 1:
+        raise ValueError("enemies.ratio must be between 0 and 1")
+    if min_enemies < 0:
+        raise ValueError("enemies.min must not be negative")
+
+    # Players left after the doctor (and a possible heartbroken) at the sizes where that is smallest
+    def remaining(num_players: int) -> int:
+        has_heartbroken = heartbroken_chance > 0 and num_players >= heartbroken_min_players
+        return num_players - 1 - has_heartbroken
+
+    fewest = min(remaining(num_players) for num_players in {min_players, max(min_players, heartbroken_min_players)})
+    if min_enemies > fewest:
+        raise ValueError(f"enemies.min is {min_enemies} but the smallest lobby has only {fewest} players to make enemies")
+
+
+def compile_rules(name: str, config: dict) -> GameRules:
+    """Validate one rule set from rules.json and compile it."""
+    try:
+        heartbroken = config["heartbroken"]
+        enemies = config["enemies"]
+        sick = config["sickPerRound"]
+        fraction = float(config["endWhenDeadFraction"])
+
+        if config["doctorDiesLast"]:
+            doctor_can_die = lambda num_alive_others: num_alive_others == 0  # noqa: E731
+        else:
+            doctor_can_die = lambda num_alive_others: True  # noqa: E731
+
+        rules = GameRules(
+            name=name,
+            min_players=max(2, int(config["minPlayers"])),
+            heartbroken_chance=float(heartbroken["chance"]),
+            heartbroken_min_players=int(heartbroken["minPlayers"]),
+            heartbroken_ally_chance=float(heartbroken["allyChance"]),
+            enemy_ratio=float(enemies["ratio"]),
+            min_enemies=int(enemies["min"]),
+            sick_count=_compile_sick_count(sick["tiers"], int(sick["max"])),
+            should_end=lambda num_dead, num_non_doctor: num_dead >= num_non_doctor * fraction,
+            doctor_can_die=doctor_can_die,
+            round_seconds=int(config["roundSeconds"]) if config.get("roundSeconds") else None
+        )
+        _check_enemy_counts(rules.min_players, rules.heartbroken_chance, rules.heartbroken_min_players,
+                            rules.enemy_ratio, rules.min_enemies)
+        return rules
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid rule set '{name}': {str(e)}") from e
+
+
+def load_rule_sets(path: str = RULES_FILE) -> Dict[str, GameRules]:
+    """Load and compile every rule set in a rules file."""
+    with open(path) as f:
+        config = json.load(f)
+    rule_sets = {name: compile_rules(name, rules) for name, rules in config.items()}
+    logger.info(f"Loaded rule sets from {path}: {', '.join(rule_sets)}")
+    return rule_sets
+
+
+# Compiled once at startup
+RULE_SETS: Dict[str, GameRules] = load_rule_sets()
+if DEFAULT_RULE_SET not in RULE_SETS:
+    raise ValueError(f"GAME_RULES names unknown rule set '{DEFAULT_RULE_SET}'")
+DEFAULT_RULES = RULE_SETS[DEFAULT_RULE_SET]
+
+
+def get_rules(name) -> Optional[GameRules]:
+    """Get a compiled rule set by name (None if there is no such set)."""
+    return RULE_SETS.get(name)
@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import time
+import uvicorn
+from connection_registry import connection_registry
+from lobby_manager import LobbyManager, lobby_manager
+from message_handler import disconnected_players, restore_lobby
+from tournament import tournament, REGISTRATION, RUNNING
+from lobby_hibernation import lobby_store
+from executors import disk_pool
+import resume_tokens
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STATE_FILE = os.getenv(
+    "GAME_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "lobby_state.json")
+)
+STATE_MAX_AGE = 300  # seconds; older state files are ignored on startup
+FLUSH_TIMEOUT = 2.0  # seconds to wait for outbound queues during drain
+RETRY_BASE_MS = 1000  # earliest reconnect hint
+RETRY_MS_PER_CLIENT = 20  # spread reconnects so they do not all arrive at once
+SERVICE_RESTART = 1012  # WebSocket close code for "service restart"
+
+
+async def notify_restart(connections: list, spread_ms: int) -> None:
+    """Tell clients to reconnect later, each with its own backoff hint."""
+    for connection in connections:
+        try:
+            await connection.send_text(json.dumps({
+                "type": "server_restarting",
+                "retryAfterMs": RETRY_BASE_MS + random.randint(0, spread_ms)
+            }))
+        except Exception as e:
+            logger.error(f"Error sending server_restarting: {str(e)}")
+
+
+async def drain_server(state_file: str = STATE_FILE) -> None:
+    """Drain the lobby and any tournament before shutdown and save them for the next process.
+
+    1. stop accepting joins
+    2. tell every client (lobby, tournament tables and pool) to reconnect
+       later, each with its own backoff hint
+    3. flush pending outbound queues
+    4. write LobbyManager, tournament and disconnected-player state to
+       state_file, and hibernated lobbies still held in memory to their
+       directory
+    5. close the connections
+    """
+    lobby_manager.draining = True
+    logger.info("Draining server: new joins are refused")
+    # Reconnects are spread over every client of the process, not just one lobby's
+    spread_ms = RETRY_MS_PER_CLIENT * len(connection_registry)
+
+    async def snapshot_and_notify():
+        # Runs in the actor so no handler is half-way through a mutation
+        connections = list(lobby_manager.connections.values())
+        await notify_restart(connections, spread_ms)
+
+        return connections, {
+            "savedAt": time.time(),
+            "lobby": lobby_manager.to_snapshot(),
+            # Keeps resume tokens valid in the next process
+            "resumeSecret": resume_tokens.get_secret().hex(),
+            "disconnectedPlayers": {
+                player_id: name for player_id, (name, _) in disconnected_players.items()
+            }
+        }
+
+    connections, state = await lobby_manager.actor.call(snapshot_and_notify)
+    if tournament.state in (REGISTRATION, RUNNING):
+        tournament_connections, state["tournament"] = await tournament.actor.call(snapshot_tournament, spread_ms)
+        connections += tournament_connections
+
+    await asyncio.gather(*(connection.flush(FLUSH_TIMEOUT) for connection in connections))
+
+    if state["lobby"]["players"] or state.get("tournament"):
+        await disk_pool.run(_write_state, state_file, state)
+        saved_tournament = state.get("tournament")
+        logger.info(f"Saved {len(state['lobby']['players'])} players"
+                    + (f" and {len(saved_tournament['participants'])} tournament participants" if saved_tournament else "")
+                    + f" to {state_file}")
+    await lobby_store.spill_all()
+
+    await asyncio.gather(*(connection.close(SERVICE_RESTART) for connection in connections),
+                         return_exceptions=True)
+
+
+async def snapshot_tournament(spread_ms: int):
+    """Notify and save every table, then the pool and standings (runs in the tournament's actor)."""
+    async def snapshot_table(table: LobbyManager):
+        # Runs in the table's actor
+        connections = list(table.connections.values())
+        await notify_restart(connections, spread_ms)
+        return connections, table.to_snapshot()
+
+    tables = await asyncio.gather(*(table.actor.call(snapshot_table, table)
+                                    for table in tournament.tables[:tournament.seated_tables]))
+    connections = [connection for table_connections, _ in tables for connection in table_connections]
+
+    # Participants waiting in the pool (before the first stage, or sitting one out)
+    seated = set(connections)
+    pool = [connection for participant in tournament.participants.values()
+            if (connection := participant.live_connection()) is not None and connection not in seated]
+    await notify_restart(pool, spread_ms)
+
+    return connections + pool, tournament.to_snapshot([snapshot for _, snapshot in tables])
+
+
+async def restore_tournament(snapshot: dict) -> None:
+    """Load a saved tournament and its tables (runs in the tournament's actor)."""
+    tables = tournament.restore_snapshot(snapshot)
+    await asyncio.gather(*(table.actor.call(restore_lobby, table_snapshot, table)
+                           for table, table_snapshot in tables))
+    tournament.resume_stage()
+
+
+def _write_state(state_file: str, state: dict) -> None:
+    # Write to a temporary file first so a crash never leaves half a file
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+
+async def restore_server(state_file: str = STATE_FILE) -> bool:
+    """Restore a lobby (and tournament) saved by drain_server, if there is a recent one.
+
+    Every restored player starts disconnected with the usual reconnect
+    timeout, so clients can resume with their stored playerId and gameId.
+    """
+    # Claim the file first: with several workers running the lifespan, exactly
+    # one gets it, and the same state is never restored twice
+    claimed_file = f"{state_file}.{os.getpid()}"
+    try:
+        os.replace(state_file, claimed_file)
+    except FileNotFoundError:
+        return False
+
+    try:
+        with open(claimed_file) as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read saved state {state_file}: {str(e)}")
+        return False
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(claimed_file)
+
+    age = time.time() - state["savedAt"]
+    if age > STATE_MAX_AGE:
+        logger.info(f"Ignoring saved state from {age:.0f} seconds ago")
+        return False
+
+    if not os.getenv("GAME_RESUME_SECRET"):
+        resume_tokens.set_secret(bytes.fromhex(state["resumeSecret"]))
+
+    if state["lobby"]["players"]:
+        await lobby_manager.actor.call(restore_lobby, state["lobby"])
+        logger.info(f"Restored game {lobby_manager.game_id} from previous process "
+                    f"({len(state['disconnectedPlayers'])} players were already disconnected)")
+    # Older state files have no tournament
+    if state.get("tournament"):
+        await tournament.actor.call(restore_tournament, state["tournament"])
+    return True
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains and saves the lobby before closing connections."""
+
+    async def shutdown(self, sockets=None):
+        try:
+            await drain_server()
+        except Exception as e:
+            logger.error(f"Error draining server: {str(e)}")
+        await super().shutdown(sockets)
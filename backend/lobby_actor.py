@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+from tracing import Trace, shared_span, untraced_task
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class LobbyActor:
+    """Serializes all work on one lobby through a single inbox task.
+
+    Every mutation of a LobbyManager is submitted here, so two messages for
+    the same lobby can never interleave at an await point (e.g. end_round
+    and mark_dead both ending the game). Sends made while handling a message
+    only enqueue on the connection's outbound queue, so the actor never
+    waits on the network. Each lobby has its own actor, so lobbies progress
+    in parallel without a global lock.
+
+    Work is applied in batches: every item already waiting in the inbox
+    (under a burst, one frame per connection) runs back to back, then
+    after_batch runs once (the lobby uses it to send a single lobby_state
+    for the whole batch) and only then are the callers' results resolved.
+    The inbox is FIFO, so each connection's frames keep their order.
+
+    Items called with a trace record how long they queued and a span for
+    their run; after_batch is recorded in the trace of every traced item
+    of the batch.
+    """
+
+    MAX_BATCH = 256  # Bounds how long the first item of a batch waits for its broadcast
+
+    def __init__(self, name: str, after_batch: Optional[Callable[[], Awaitable[None]]] = None):
+        self.name = name
+        self.after_batch = after_batch
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, trace: Optional[Trace] = None) -> Any:
+        """Run fn(*args) inside the actor and return its result."""
+        self._ensure_task()
+        future = asyncio.get_running_loop().create_future()
+        traced = (trace, time.perf_counter()) if trace else None
+        self.inbox.put_nowait((fn, args, future, traced))
+        return await future
+
+    def submit(self, fn: Callable[..., Awaitable[Any]], *args) -> None:
+        """Queue fn(*args) on the actor without waiting for it (e.g. from a timer)."""
+        self._ensure_task()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._log_failure)
+        self.inbox.put_nowait((fn, args, future, None))
+
+    def _log_failure(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception():
+            logger.error(f"Error in lobby {self.name}: {str(future.exception())}")
+
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = untraced_task(self._run(), name=f"lobby-actor-{self.name}")
+
+    async def _run(self):
+        while True:
+            batch = [await self.inbox.get()]
+            while len(batch) < self.MAX_BATCH and not self.inbox.empty():
+                batch.append(self.inbox.get_nowait())
+
+            try:
+                await self._run_batch(batch)
+            except BaseException as e:
+                # The actor itself is stopping: fail the batch instead of leaving its callers waiting
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"Lobby {self.name} stopped: {type(e).__name__}"))
+                raise
+
+    def _stopping(self) -> bool:
+        """Whether a CancelledError is meant for the actor's task rather than one item."""
+        return asyncio.current_task().cancelling() > 0
+
+    async def _run_batch(self, batch: list) -> None:
+        outcomes = []
+        traces = []
+        for fn, args, future, traced in batch:
+            if future.cancelled():
+                continue
+            try:
+                if traced is None:
+                    outcomes.append((future, await fn(*args), None))
+                    continue
+                trace, queued_at = traced
+                traces.append(trace)
+                trace.root.record("actor.queue", queued_at, time.perf_counter(), batch=len(batch))
+                with trace.root.child("actor.handle", lobby=self.name):
+                    outcomes.append((future, await fn(*args), None))
+            except asyncio.CancelledError as e:
+                # A handler's own await was cancelled: that item fails, the actor keeps going
+                if self._stopping():
+                    raise
+                outcomes.append((future, None, e))
+            except Exception as e:
+                outcomes.append((future, None, e))
+
+        if self.after_batch:
+            try:
+                if traces:
+                    with shared_span("actor.end_batch", traces, lobby=self.name, batch=len(batch)):
+                        await self.after_batch()
+                else:
+                    await self.after_batch()
+            except asyncio.CancelledError:
+                if self._stopping():
+                    raise
+                logger.error(f"Batch finish cancelled in lobby {self.name}")
+            except Exception as e:
+                logger.error(f"Error finishing batch in lobby {self.name}: {str(e)}")
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Optional
+from executors import disk_pool
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+HIBERNATE_AFTER = float(os.getenv("GAME_HIBERNATE_AFTER", "300"))  # seconds without any socket
+MEMORY_BUDGET = int(os.getenv("GAME_HIBERNATE_BUDGET", str(4 * 1024 * 1024)))  # bytes of compressed lobbies
+MAX_AGE = float(os.getenv("GAME_HIBERNATE_MAX_AGE", str(3 * 24 * 3600)))  # seconds a hibernated lobby is kept
+HIBERNATE_DIR = os.getenv(
+    "GAME_HIBERNATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "hibernated")
+)
+
+
+class LobbyStore:
+    """Hibernated lobbies, keyed by game ID.
+
+    Each lobby is kept as a zlib-compressed JSON snapshot (a few hundred
+    bytes for a typical lobby). Snapshots stay in memory up to a byte
+    budget; past it the least recently used ones are written to disk.
+    A lobby is used when it is hibernated and when a returning player
+    asks for it but it cannot be woken yet (touch()). take() looks in
+    memory first, then on disk, and removes the entry either way, since a
+    restored lobby is live again. Files older than max_age are pruned
+    whenever something is spilled.
+    """
+
+    def __init__(self, directory: str = HIBERNATE_DIR, budget: int = MEMORY_BUDGET, max_age: float = MAX_AGE):
+        self.directory = directory
+        self.budget = budget
+        self.max_age = max_age
+        self._memory: OrderedDict = OrderedDict()  # game_id -> blob, least recently used first
+        self._memory_bytes = 0
+
+    async def put(self, game_id: str, state: dict) -> None:
+        """Hibernate one lobby state (see LobbyManager.to_snapshot)."""
+        blob = zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+        self._discard(game_id)
+        self._memory[game_id] = blob
+        self._memory_bytes += len(blob)
+        await self._enforce_budget()
+
+    async def take(self, game_id: str) -> Optional[dict]:
+        """Remove and return a hibernated lobby state (None if unknown or expired)."""
+        game_id = _valid_game_id(game_id)
+        if game_id is None:
+            return None
+
+        blob = self._memory.pop(game_id, None)
+        if blob is not None:
+            self._memory_bytes -= len(blob)
+        else:
+            blob = await disk_pool.run(self._read_file, game_id)
+            if blob is None:
+                return None
+
+        state = json.loads(zlib.decompress(blob))
+        if time.time() - state["savedAt"] > self.max_age:
+            return None
+        return state
+
+    def touch(self, game_id: str) -> None:
+        """Mark an in-memory lobby as recently used, so it is spilled last."""
+        if game_id in self._memory:
+            self._memory.move_to_end(game_id)
+
+    async def spill_all(self) -> None:
+        """Write every in-memory lobby to disk (before the process exits)."""
+        budget, self.budget = self.budget, 0
+        try:
+            await self._enforce_budget()
+        finally:
+            self.budget = budget
+
+    def describe(self) -> dict:
+        return {"inMemory": len(self._memory), "memoryBytes": self._memory_bytes, "budget": self.budget}
+
+    def _discard(self, game_id: str) -> None:
+        blob = self._memory.pop(game_id, None)
+        if blob is not None:
+            self._memory_bytes -= len(blob)
+
+    async def _enforce_budget(self) -> None:
+        spilled = []
+        while self._memory_bytes > self.budget and self._memory:
+            game_id, blob = self._memory.popitem(last=False)
+            self._memory_bytes -= len(blob)
+            spilled.append((game_id, blob))
+        if spilled:
+            await disk_pool.run(self._write_files, spilled)
+
+    def _path(self, game_id: str) -> str:
+        return os.path.join(self.directory, f"{game_id}.json.z")
+
+    def _write_files(self, spilled: list) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for game_id, blob in spilled:
+            # Write to a temporary file first so a crash never leaves half a file
+            path = self._path(game_id)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(blob)
+            os.replace(f"{path}.tmp", path)
+        logger.info(f"Spilled {len(spilled)} hibernated lobbies to {self.directory}")
+        self._prune()
+
+    def _read_file(self, game_id: str) -> Optional[bytes]:
+        path = self._path(game_id)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            os.remove(path)
+            return blob
+        except OSError:
+            return None
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.max_age
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json.z") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+
+
+def _valid_game_id(game_id) -> Optional[str]:
+    """Game IDs are UUIDs; anything else (e.g. a path) is never looked up."""
+    try:
+        return str(uuid.UUID(game_id))
+    except (TypeError, ValueError):
+        return None
+
+
+# Create a singleton instance
+lobby_store = LobbyStore()
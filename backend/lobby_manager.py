@@ -3,20 +3,35 @@ import json
 import uuid
 import asyncio
 import random
-from enum import Enum
+import time
+from collections import deque
+from types import MappingProxyType
 from typing import Dict, List, Optional
-from game_roles import Role, RoleAssigner
+from game_roles import Role, RoleAssigner, ROLES, ROLE_INFO
+from player_status import PlayerStatus, ALIVE_STATUSES, STATUS_INFO
+from game_rules import GameRules, DEFAULT_RULES, get_rules
+from spectators import SpectatorChannel
+from multicast import SPECTATORS, PlayerGroups
+from chat import ChatRoom
+from game_history import history_store
+from lobby_summary import summary_publisher
+from lobby_actor import LobbyActor
+from connection import Connection
+from connection_registry import connection_registry
+from wire import COMPACT_CODEC, encode_lobby_state
+from tracing import span, traced, untraced_task
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
-class PlayerStatus(Enum):
-    WAITING = "WAITING"
-    READY = "READY"
-    ALIVE = "ALIVE"
-    SICK = "SICK"  
-    DEAD = "DEAD"
+# Pre-encoded JSON for the role/status part of a private player payload, one
+# per (role, status) pair; matches json.dumps of get_private_dict() exactly
+PRIVATE_FRAGMENTS = MappingProxyType({
+    (role, status): json.dumps({"status": status.value, **ROLE_INFO[role], **STATUS_INFO[status]})[1:-1]
+    for role in Role
+    for status in PlayerStatus
+})
 
 
 class Player:
@@ -25,6 +40,8 @@ class Player:
         self.name = name
         self.status = PlayerStatus.WAITING
         self.role = None  # Will be assigned when game starts
+        # Encoded once; id and name never change
+        self._json_head = f'"id": {json.dumps(id)}, "name": {json.dumps(name)}'
 
     def to_dict(self):
         base_dict = {
@@ -45,31 +62,78 @@ class Player:
 
         # Add detailed role information if assigned
         if self.role:
-            base_dict.update(RoleAssigner.get_role_info(self.role))
+            base_dict.update(ROLE_INFO[self.role])
 
         # Add status color for UI display
-        status_colors = {
-            PlayerStatus.SICK: "#6B8E23"  # Olive green/slimy color for sick players
-        }
-
-        if self.status in status_colors:
-            base_dict["statusColor"] = status_colors[self.status]
+        base_dict.update(STATUS_INFO[self.status])
 
         return base_dict
 
+    def private_message(self) -> str:
+        """Get the encoded player_role message (only valid once a role is assigned).
+
+        Same bytes as json.dumps of a player_role message built from
+        get_private_dict(), assembled from the precomputed fragments.
+        """
+        return ('{"type": "player_role", "player": {' + self._json_head + ", "
+                + PRIVATE_FRAGMENTS[(self.role, self.status)] + "}}")
+
+
+# Which lobby every player is in (the main lobby or a tournament table), for
+# routing a returning player's reconnect
+player_lobbies: Dict[str, "LobbyManager"] = {}
+
 
 class LobbyManager:
-    def __init__(self):
+    EVENT_LOG_SIZE = 64  # public events kept for reconnect replay
+
+    def __init__(self, tournament=None):
         self.players: Dict[str, Player] = {}
-        self.websockets = {}
+        self.tournament = tournament  # Set for tournament tables (see tournament.py)
         self.game_in_progress = False
         # Generate a unique ID for this game session
         self.game_id = str(uuid.uuid4())
+        # Serializes every mutation of this lobby (see lobby_actor.py)
+        self.actor = LobbyActor(self.game_id[:8], after_batch=self.end_batch)
+        self.rules: GameRules = DEFAULT_RULES  # Compiled rule set (see game_rules.py)
+        self.round_seconds: Optional[int] = DEFAULT_RULES.round_seconds  # None: no round timer
+        self.round_ends_at: Optional[float] = None  # Wall-clock end of the timed round
+        self.round_timers: list = []  # Scheduler handles for the current round
         self.current_round = 0
         self.sick_players: List[str] = []  # List of player IDs who are currently sick
         self.cured_player: Optional[str] = None  # ID of player cured in current round
-
-    def add_player(self, player_id: str, player_name: str, websocket) -> Player:
+        self.started_at: Optional[float] = None  # When the current game started
+        self.round_log: List[dict] = []  # Per-round sick/cured/died, for the history store
+        self.draining = False  # Set while the server shuts down; no new joins
+        self.spectators = SpectatorChannel()  # Public-only watchers, not players
+        self.chat = ChatRoom(self)
+        self.event_seq = 0  # Sequence number of the last public event
+        self.event_log = deque(maxlen=self.EVENT_LOG_SIZE)  # (seq, frame) for reconnect replay
+        self._broadcast_task = None  # Pending coalesced lobby_state broadcast
+        self._state_dirty = False  # lobby_state requested but not yet sent (see request_lobby_state)
+        self.state_version = 0  # Bumped on every lobby_state broadcast
+        self._published_summary = None  # What the shared summary was last published for
+        # Alive non-doctor players (sick-round candidates) and dead non-doctor
+        # players, kept up to date as statuses change so rounds and end checks
+        # never rebuild lists
+        self.alive_candidates: List[str] = []
+        self._alive_pos: Dict[str, int] = {}
+        self.dead_players: set = set()
+        self.doctor_id: Optional[str] = None
+        # Players by multicast group (all, alive, dead, doctor, teams), updated with the index above
+        self.groups = PlayerGroups()
+        # Small integer handles for the compact wire schema
+        self.player_handles: Dict[str, int] = {}
+        self.handle_ids: Dict[int, str] = {}
+        self._next_handle = 1
+
+    @property
+    def connections(self) -> Dict[str, Connection]:
+        """Live {player_id: connection} of this lobby, kept by the connection registry."""
+        return connection_registry.lobby_connections(self)
+
+    @traced("lobby.add_player")
+    def add_player(self, player_id: str, player_name: str, connection: Connection) -> Player:
         """Add a new player to the lobby."""
         # Don't allow new players if game is in progress
         if self.game_in_progress:
@@ -77,25 +141,40 @@ class LobbyManager:
 
         player = Player(player_id, player_name)
         self.players[player_id] = player
-        self.websockets[player_id] = websocket
+        player_lobbies[player_id] = self
+        self.groups.update(player)
+        if connection is not None:
+            connection_registry.bind(connection, self, player_id)
+        self.player_handles[player_id] = self._next_handle
+        self.handle_ids[self._next_handle] = player_id
+        self._next_handle += 1
         logger.info(f"Player {player_name} ({player_id}) joined the lobby")
         return player
 
-    def update_player_websocket(self, player_id: str, websocket) -> bool:
-        """Update a player's websocket connection (for reconnection)."""
+    def update_player_connection(self, player_id: str, connection: Connection) -> bool:
+        """Update a player's connection (for reconnection)."""
         if player_id not in self.players:
             return False
 
-        self.websockets[player_id] = websocket
-        logger.info(f"Updated websocket for player {
+        connection_registry.bind(connection, self, player_id)
+        logger.info(f"Updated connection for player {
                     self.players[player_id].name} ({player_id})")
         return True
 
+    @traced("lobby.remove_player")
     def remove_player(self, player_id: str) -> Optional[Player]:
         """Remove a player from the lobby."""
         player = self.players.pop(player_id, None)
         if player:
-            self.websockets.pop(player_id, None)
+            if player_lobbies.get(player_id) is self:
+                del player_lobbies[player_id]
+            connection_registry.unbind_player(player_id)
+            handle = self.player_handles.pop(player_id, None)
+            self.handle_ids.pop(handle, None)
+            self.chat.forget_player(player_id)
+            self._drop_from_alive_index(player_id)
+            self.dead_players.discard(player_id)
+            self.groups.discard(player_id)
             logger.info(f"Player {player.name} ({player_id}) left the lobby")
         return player
 
@@ -103,11 +182,21 @@ class LobbyManager:
         """Get a player by ID."""
         return self.players.get(player_id)
 
+    def resolve_player_id(self, player_ref) -> Optional[str]:
+        """Map a player reference (UUID or compact integer handle) to a player ID."""
+        if isinstance(player_ref, int) and not isinstance(player_ref, bool):
+            return self.handle_ids.get(player_ref)
+        return player_ref
+
+    @traced("lobby.set_player_status")
     def set_player_status(self, player_id: str, status: PlayerStatus) -> bool:
         """Update a player's status."""
         player = self.get_player(player_id)
         if player:
             player.status = status
+            self._update_alive_index(player)
+            if status == PlayerStatus.DEAD and self.game_in_progress:
+                self._current_round_log()["died"].append(player_id)
             logger.info(f"Player {player.name} ({
                         player_id}) status changed to {status.value}")
             return True
@@ -125,27 +214,58 @@ class LobbyManager:
 
     def assign_roles(self) -> Dict[str, Role]:
         """Assign roles to all players in the lobby."""
-        num_players = len(self.players)
-
-        # Get a list of roles
-        roles = RoleAssigner.assign_roles(num_players)
+        # Get the shuffled role codes (one byte per player, logged once)
+        codes = RoleAssigner.assign_role_codes(len(self.players), self.rules)
 
         # Assign roles to players
-        players_list = list(self.players.values())
         role_assignments = {}
-
-        for i, player in enumerate(players_list):
-            if i < len(roles):
-                player.role = roles[i]
-                role_assignments[player.id] = roles[i]
-                logger.info(f"Assigned role {
-                            roles[i].value} to player {player.name}")
+        for player, code in zip(self.players.values(), codes):
+            player.role = ROLES[code]
+            role_assignments[player.id] = player.role
+            if player.role == Role.DOCTOR:
+                self.doctor_id = player.id
 
         return role_assignments
 
+    def _update_alive_index(self, player: Player) -> None:
+        """Add or remove a player from alive_candidates / dead_players (and move their groups) in O(1)."""
+        self.groups.update(player)
+        if player.status == PlayerStatus.DEAD and player.role != Role.DOCTOR:
+            self.dead_players.add(player.id)
+        else:
+            self.dead_players.discard(player.id)
+
+        if player.status != PlayerStatus.ALIVE or player.role in (None, Role.DOCTOR):
+            self._drop_from_alive_index(player.id)
+        elif player.id not in self._alive_pos:
+            self._alive_pos[player.id] = len(self.alive_candidates)
+            self.alive_candidates.append(player.id)
+
+    def _drop_from_alive_index(self, player_id: str) -> None:
+        pos = self._alive_pos.pop(player_id, None)
+        if pos is None:
+            return
+        # Swap the last entry into the freed slot
+        last = self.alive_candidates.pop()
+        if last != player_id:
+            self.alive_candidates[pos] = last
+            self._alive_pos[last] = pos
+
+    def _rebuild_alive_index(self) -> None:
+        self.alive_candidates = []
+        self._alive_pos = {}
+        self.dead_players = set()
+        self.doctor_id = None
+        self.groups.clear()
+        for player in self.players.values():
+            self._update_alive_index(player)
+            if player.role == Role.DOCTOR:
+                self.doctor_id = player.id
+
+    @traced("lobby.start_game")
     def start_game(self) -> bool:
         """Start the game by assigning roles and changing all ready players to alive."""
-        if not self.all_players_ready() or len(self.players) < 2:
+        if not self.all_players_ready() or len(self.players) < self.rules.min_players:
             return False
 
         # Assign roles
@@ -155,78 +275,268 @@ class LobbyManager:
         for player in self.players.values():
             if player.status == PlayerStatus.READY:
                 player.status = PlayerStatus.ALIVE
+        self._rebuild_alive_index()
 
         # Set game in progress
         self.game_in_progress = True
+        self.started_at = time.time()
+        self.round_log = []
 
         logger.info(f"Game started with ID: {self.game_id}!")
         return True
 
 
-    def can_doctor_die(self) -> bool:
-        """Check if the doctor can be marked as dead (only if all other players are dead)."""
-        non_doctor_alive = False
-
-        for player in self.players.values():
-            if player.role != Role.DOCTOR and player.status == PlayerStatus.ALIVE:
-                non_doctor_alive = True
-                break
+    @traced("lobby.set_rules")
+    def set_rules(self, rules: GameRules) -> bool:
+        """Switch this lobby to another rule set (not while a game is running)."""
+        if self.game_in_progress:
+            return False
+        self.rules = rules
+        self.round_seconds = rules.round_seconds
+        logger.info(f"Lobby {self.game_id} now uses rule set '{rules.name}'")
+        return True
 
-        return not non_doctor_alive
+    def can_doctor_die(self) -> bool:
+        """Check if the doctor can be marked as dead (by default only if all other players are dead)."""
+        return self.rules.doctor_can_die(len(self.alive_candidates))
 
     def is_game_over(self) -> bool:
         """Check if the game is over (all players are dead)."""
         return all(player.status != PlayerStatus.ALIVE for player in self.players.values())
 
+    def to_snapshot(self) -> dict:
+        """Serialize the lobby (without connections) so another process can restore it."""
+        return {
+            "gameId": self.game_id,
+            "gameInProgress": self.game_in_progress,
+            "currentRound": self.current_round,
+            "sickPlayers": list(self.sick_players),
+            "curedPlayer": self.cured_player,
+            "startedAt": self.started_at,
+            "roundLog": self.round_log,
+            "nextHandle": self._next_handle,
+            "eventSeq": self.event_seq,
+            "rules": self.rules.name,
+            "roundSeconds": self.round_seconds,
+            "roundEndsAt": self.round_ends_at,
+            "players": [
+                {
+                    "id": player.id,
+                    "name": player.name,
+                    "status": player.status.value,
+                    "role": player.role.value if player.role else None,
+                    "handle": self.player_handles.get(player.id)
+                }
+                for player in self.players.values()
+            ]
+        }
+
+    def restore_snapshot(self, snapshot: dict) -> None:
+        """Restore lobby state from to_snapshot() output. Players start without connections."""
+        self.reset_game()
+        self.game_id = snapshot["gameId"]
+        self.game_in_progress = snapshot["gameInProgress"]
+        self.current_round = snapshot["currentRound"]
+        self.sick_players = snapshot["sickPlayers"]
+        self.cured_player = snapshot["curedPlayer"]
+        self.started_at = snapshot["startedAt"]
+        self.round_log = snapshot["roundLog"]
+        self._next_handle = snapshot["nextHandle"]
+        self.event_seq = snapshot["eventSeq"]
+        # Newer fields are optional so a state file from an older release still loads
+        self.rules = get_rules(snapshot.get("rules")) or DEFAULT_RULES
+        self.round_seconds = snapshot.get("roundSeconds", self.rules.round_seconds)
+        self.round_ends_at = snapshot.get("roundEndsAt")  # Re-armed by the restoring process
+
+        for data in snapshot["players"]:
+            player = Player(data["id"], data["name"])
+            player.status = PlayerStatus(data["status"])
+            player.role = Role(data["role"]) if data["role"] else None
+            self.players[player.id] = player
+            player_lobbies[player.id] = self
+            if data["handle"] is not None:
+                self.player_handles[player.id] = data["handle"]
+                self.handle_ids[data["handle"]] = player.id
+        self._rebuild_alive_index()
+
+        logger.info(f"Restored game {self.game_id} with {len(self.players)} players")
+
     def reset_game(self):
         """Reset the game state for a new game."""
+        for player_id in self.players:
+            if player_lobbies.get(player_id) is self:
+                del player_lobbies[player_id]
         self.players = {}
-        self.websockets = {}
+        connection_registry.unbind_lobby(self)
+        self.player_handles = {}
+        self.handle_ids = {}
+        self._next_handle = 1
+        self.chat.close()
+        self.chat = ChatRoom(self)
+        self.event_log.clear()
+        self.cancel_round_timers()
+        self._reset_round_state()
+        self._rebuild_alive_index()
         self.game_in_progress = False
         self.game_id = str(uuid.uuid4())
         logger.info(f"Game reset. New game ID: {self.game_id}")
 
-    async def broadcast_lobby_state(self):
-        """Send the current lobby state to all connected players."""
-        # Public information for all players
-        lobby_state = {
+    def _reset_round_state(self) -> None:
+        """Forget the rounds of the last game."""
+        self.current_round = 0
+        self.sick_players = []
+        self.cured_player = None
+        self.started_at = None
+        self.round_log = []
+
+    def get_lobby_state(self) -> dict:
+        """Get the public lobby state message."""
+        return {
             "type": "lobby_state",
             "players": self.get_players_list(),
             "allReady": self.all_players_ready(),
             "gameInProgress": self.game_in_progress,
-            "gameId": self.game_id
+            "gameId": self.game_id,
+            "rules": self.rules.name,
+            "roundSeconds": self.round_seconds,
+            # Epoch ms when the current timed round ends, so clients can count down locally
+            "roundEndsAt": int(self.round_ends_at * 1000) if self.round_ends_at else None
         }
 
-        public_message = json.dumps(lobby_state)
-
-        # Send to all connected players
-        for player_id, websocket in list(self.websockets.items()):
-            try:
-                # First send the public state
-                await websocket.send_text(public_message)
-
-                # Add a small delay to prevent overwhelming the connection
-                await asyncio.sleep(0.05)
-
-                # Then, if game in progress, send private player info
-                if self.game_in_progress:
-                    player = self.players.get(player_id)
-                    if player and player.role:
-                        try:
-                            private_message = json.dumps({
-                                "type": "player_role",
-                                "player": player.get_private_dict()
-                            })
-                            await websocket.send_text(private_message)
-                        except Exception as e:
-                            logger.error(f"Error sending role info to player {
-                                         player_id}: {str(e)}")
-
-            except Exception as e:
-                logger.error(f"Error sending message to player {
-                             player_id}: {str(e)}")
-                # Don't remove here - this will be handled by the disconnect handler
+    async def notify(self, message: dict):
+        """Send a transient public message (e.g. a countdown tick) to everyone.
+
+        Unlike broadcast, it gets no sequence number and is not kept for
+        reconnect replay; the next lobby_state carries the same information.
+        """
+        with span("serialize", type=message["type"]):
+            frame = json.dumps(message)
+        self.spectators.publish(frame, coalesce_key=message["type"])
+        for connection in list(self.connections.values()):
+            await connection_registry.send(connection, frame)
+
+    async def broadcast(self, message: dict):
+        """Send a public message to all connected players and spectators.
+
+        Every public event gets a sequence number and is kept in a short
+        log, so reconnecting players can be sent just what they missed.
+        A pending lobby_state goes out first, so events never overtake it.
+        """
+        await self.flush_lobby_state()
+
+        self.event_seq += 1
+        message["seq"] = self.event_seq
+        with span("serialize", type=message["type"]):
+            public_message = json.dumps(message)
+        self.event_log.append((self.event_seq, public_message))
+        self.spectators.publish(public_message)
+
+        for connection in list(self.connections.values()):
+            await connection_registry.send(connection, public_message)
+
+    async def send_to(self, player_id: str, message: dict) -> bool:
+        """Send a private message to one player (O(1) lookup; False if not connected)."""
+        connection = connection_registry.get(player_id)
+        if connection is None:
+            return False
+        with span("serialize", type=message["type"]):
+            frame = json.dumps(message)
+        return await connection_registry.send(connection, frame)
+
+    async def multicast(self, group: str, message: dict) -> int:
+        """Send a message to one multicast group (see multicast.py), serialized once.
+
+        Unlike broadcast, it gets no sequence number: group messages are
+        not public events and are not replayed on reconnect.
+        """
+        with span("serialize", type=message["type"], group=group):
+            frame = json.dumps(message)
+        return await self.send_to_group(group, frame)
+
+    async def send_to_group(self, group: str, frame: str) -> int:
+        """Send an encoded frame to a group's connected members; returns how many got it."""
+        if group == SPECTATORS:
+            self.spectators.publish(frame)
+            return len(self.spectators)
+
+        connections = self.connections
+        sent = 0
+        for player_id in list(self.groups.get(group)):
+            connection = connections.get(player_id)
+            if connection is not None and await connection_registry.send(connection, frame):
+                sent += 1
+        return sent
+
+    def events_since(self, seq) -> List[str]:
+        """Get logged public events newer than seq (none if seq is unknown)."""
+        if not isinstance(seq, int):
+            return []
+        return [frame for event_seq, frame in self.event_log if event_seq > seq]
+
+    def schedule_broadcast(self, delay: float) -> None:
+        """Broadcast lobby_state after delay; requests made meanwhile share it."""
+        if self._broadcast_task and not self._broadcast_task.done():
+            return
+
+        async def broadcast_later():
+            await asyncio.sleep(delay)
+            await self.actor.call(self.broadcast_lobby_state)
+
+        self._broadcast_task = untraced_task(broadcast_later())
+
+    def request_lobby_state(self) -> None:
+        """Mark the lobby state as changed; it is sent once at the end of the actor's batch."""
+        self._state_dirty = True
+
+    async def end_batch(self) -> None:
+        """Run by the actor after each batch: one lobby_state, then the shared summary."""
+        await self.flush_lobby_state()
+        # Statuses and rounds only change along with a lobby_state; sockets come and go on their own.
+        # Only the main lobby is published (tournament tables are listed by GET /api/tournament)
+        summary_key = (self.state_version, len(self.connections), len(self.spectators))
+        if summary_key != self._published_summary and self.tournament is None:
+            self._published_summary = summary_key
+            summary_publisher.publish(self)
+
+    async def flush_lobby_state(self) -> None:
+        """Send the lobby state now if a change is pending."""
+        if self._state_dirty:
+            await self.broadcast_lobby_state()
+
+    async def broadcast_lobby_state(self):
+        """Send the current lobby state to all connected players."""
+        self._state_dirty = False
+        self.state_version += 1
+
+        # Public information for all players
+        with span("serialize", type="lobby_state", players=len(self.players)):
+            lobby_state = self.get_lobby_state()
+            public_message = json.dumps(lobby_state)
+        compact_message = None  # Encoded on first use
+
+        # Spectators only ever see the latest public state
+        self.spectators.publish(public_message, coalesce_key="lobby_state")
+
+        # Send to all connected players; a failed send evicts the connection
+        for player_id, connection in list(self.connections.items()):
+            # First send the public state, in the connection's codec
+            if connection.codec == COMPACT_CODEC:
+                if compact_message is None:
+                    with span("serialize", type="lobby_state", codec=COMPACT_CODEC):
+                        compact_message = encode_lobby_state(lobby_state, self.player_handles)
+                frame = compact_message
+            else:
+                frame = public_message
+            if not await connection_registry.send(connection, frame):
+                continue
+
+            # Then, if game in progress, send private player info
+            if self.game_in_progress:
+                player = self.players.get(player_id)
+                if player and player.role:
+                    await connection_registry.send(connection, player.private_message())
 
+    @traced("lobby.start_new_round")
     def start_new_round(self) -> bool:
         """Start a new round by randomly selecting players to get sick."""
         if not self.game_in_progress:
@@ -240,35 +550,34 @@ class LobbyManager:
 
         logger.info(f"Starting round {self.current_round}")
 
-        # Get all alive players except the doctor
-        alive_players = [
-            player for player in self.players.values()
-            if player.status == PlayerStatus.ALIVE and player.role != Role.DOCTOR
-        ]
-
-        # Determine how many players should get sick
-        num_to_sicken = 1  # Default
-        if len(self.players) > 10:
-            num_to_sicken = 2
-
-        # Cap at 4 or the number of alive non-doctor players, whichever is smaller
-        num_to_sicken = min(num_to_sicken, 4, len(alive_players))
+        # Determine how many players should get sick (capped by the rule set), but
+        # never more than the number of alive non-doctor players
+        num_to_sicken = min(self.rules.sick_count(len(self.players)), len(self.alive_candidates))
 
         if num_to_sicken == 0:
             logger.warning("No players to make sick - skipping round")
             return False
 
-        # Randomly select players to get sick
-        sick_candidates = random.sample(alive_players, num_to_sicken)
+        # Randomly select players to get sick, straight from the alive index
+        self.sick_players = random.sample(self.alive_candidates, num_to_sicken)
 
         # Mark selected players as sick
-        for player in sick_candidates:
+        for player_id in self.sick_players:
+            player = self.players[player_id]
             player.status = PlayerStatus.SICK
-            self.sick_players.append(player.id)
-            logger.info(f"Player {player.name} ({player.id}) is now sick")
+            self._update_alive_index(player)
+        logger.info(f"Players now sick: {', '.join(self.players[pid].name for pid in self.sick_players)}")
+
+        self.round_log.append({
+            "round": self.current_round,
+            "sick": list(self.sick_players),
+            "cured": None,
+            "died": []
+        })
 
         return True
 
+    @traced("lobby.cure_player")
     def cure_player(self, player_id: str) -> bool:
         """Doctor cures a sick player."""
         if not self.game_in_progress or not self.sick_players:
@@ -281,35 +590,40 @@ class LobbyManager:
 
         # Record the cured player
         self.cured_player = player_id
+        self._current_round_log()["cured"] = player_id
         logger.info(f"Player {player.name} ({player_id}) has been cured")
 
         return True
 
+    @traced("lobby.end_round")
     def end_round(self) -> bool:
         """End the current round, causing uncured sick players to die."""
         if not self.game_in_progress:
             return False
 
         logger.info(f"Ending round {self.current_round}")
+        self.cancel_round_timers()
 
         # Process sick players
+        died = []
         for player_id in self.sick_players:
-            # Skip the cured player
-            if player_id == self.cured_player:
-                # Restore cured player to ALIVE status
-                player = self.get_player(player_id)
-                if player:
-                    player.status = PlayerStatus.ALIVE
-                    logger.info(f"Player {player.name} ({player_id}) has recovered")
+            player = self.get_player(player_id)
+            if not player:
                 continue
 
-            # Uncured sick players die
-            player = self.get_player(player_id)
-            if player:
+            if player_id == self.cured_player:
+                # Restore cured player to ALIVE status
+                player.status = PlayerStatus.ALIVE
+            else:
+                # Uncured sick players die
                 player.status = PlayerStatus.DEAD
-                logger.info(f"Player {player.name} ({player_id}) has died from sickness")
+                died.append(player.name)
+                self._current_round_log()["died"].append(player_id)
+            self._update_alive_index(player)
+
+        logger.info(f"Round {self.current_round} deaths: {', '.join(died) or 'none'}")
 
-        # Check if game should end (half or more non-doctor players are dead)
+        # Check if game should end (by default, half or more non-doctor players are dead)
         if self.should_game_end():
             return self.end_game()
 
@@ -319,12 +633,17 @@ class LobbyManager:
 
         return True
 
-    def should_game_end(self) -> bool:
-        """Check if the game should end (half or more non-doctor players are dead)."""
-        non_doctor_players = [p for p in self.players.values() if p.role != Role.DOCTOR]
-        dead_players = [p for p in non_doctor_players if p.status == PlayerStatus.DEAD]
+    def cancel_round_timers(self) -> None:
+        """Drop the current round's timer and countdown ticks."""
+        for handle in self.round_timers:
+            handle.cancel()
+        self.round_timers = []
+        self.round_ends_at = None
 
-        return len(dead_players) >= len(non_doctor_players) / 2
+    def should_game_end(self) -> bool:
+        """Check if the game should end (by default, half or more non-doctor players are dead)."""
+        num_non_doctor = len(self.players) - (1 if self.doctor_id in self.players else 0)
+        return self.rules.should_end(len(self.dead_players), num_non_doctor)
 
     def calculate_winner(self) -> str:
         """Calculate which team won the game (ALLY or ENEMY)."""
@@ -336,6 +655,39 @@ class LobbyManager:
         else:
             return "ENEMY"
 
+    def _current_round_log(self) -> dict:
+        """Get the log entry for the current round (round 0 before the first round)."""
+        if not self.round_log or self.round_log[-1]["round"] != self.current_round:
+            self.round_log.append({"round": self.current_round, "sick": [], "cured": None, "died": []})
+        return self.round_log[-1]
+
+    def get_game_record(self, winner: str) -> dict:
+        """Build the history record for the current game."""
+        players = []
+        for player in self.players.values():
+            if not player.role:
+                continue
+            base_role = RoleAssigner.get_base_role(player.role)
+            players.append({
+                "id": player.id,
+                "name": player.name,
+                "role": player.role.value,
+                "baseRole": base_role.value,
+                "survived": player.status in ALIVE_STATUSES,
+                # The doctor plays for the allies
+                "won": (Role.ALLY if base_role == Role.DOCTOR else base_role).value == winner
+            })
+
+        return {
+            "game_id": self.game_id,
+            "started_at": self.started_at,
+            "ended_at": time.time(),
+            "winner": winner,
+            "players": players,
+            "rounds": self.round_log
+        }
+
+    @traced("lobby.end_game")
     def end_game(self) -> bool:
         """End the current game and reset for a new one."""
         if not self.game_in_progress:
@@ -345,19 +697,28 @@ class LobbyManager:
         winner = self.calculate_winner()
         logger.info(f"Game over! Winner: {winner}")
 
+        # Hand the finished game to the history store (written off the event loop)
+        record = self.get_game_record(winner)
+        history_store.record_game(record)
+        if self.tournament:
+            self.tournament.record_result(self, record)
+
         # Generate a new game ID for the next game
         self.game_id = str(uuid.uuid4())
 
         # Reset game state
         self.game_in_progress = False
-        self.current_round = 0
-        self.sick_players = []
-        self.cured_player = None
+        self._reset_round_state()
+
+        # Team chat channels belong to this game's roles
+        self.chat.reset_teams()
+        self.cancel_round_timers()
 
         # Reset player statuses (keeping them in the lobby)
         for player in self.players.values():
             player.status = PlayerStatus.WAITING
             player.role = None
+        self._rebuild_alive_index()
 
         logger.info(f"Game ended. New lobby ID: {self.game_id}")
         return winner
@@ -0,0 +1,195 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+from player_status import PlayerStatus
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# One small file per worker; /dev/shm keeps it in memory on Linux.
+# GAME_SUMMARY_DIR="" turns publishing off
+SUMMARY_DIR = os.getenv(
+    "GAME_SUMMARY_DIR",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "juego-creatividad")
+)
+
+MAGIC = b"JCLS"
+LAYOUT_VERSION = 1
+STATUSES = tuple(PlayerStatus)
+STATUS_INDEX = {status: i for i, status in enumerate(STATUSES)}
+
+# magic, layout version, record size, then the seqlock counter (odd while a write is in progress)
+HEADER = struct.Struct("<4sHHQ")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 8
+# game_id, writer pid, game in progress, round, connected players, spectators, updated at,
+# then the player count of every PlayerStatus, in STATUSES order
+RECORD = struct.Struct(f"<36sI?IIId{len(STATUSES)}I")
+REGION_SIZE = HEADER.size + RECORD.size
+
+MAX_READ_ATTEMPTS = 1000  # seqlock retries before a reader gives up on a busy writer
+
+
+class SummaryPublisher:
+    """Publishes this worker's lobby summary into a memory-mapped file.
+
+    The file holds one record behind a seqlock: the writer bumps the
+    sequence to odd, writes the record in place, then bumps it to even.
+    Readers in any process map the same file read-only and retry while
+    the sequence is odd or changed under them, so they never block the
+    writer and never see half a record. Each worker owns its own file,
+    so there is exactly one writer per region.
+    """
+
+    def __init__(self, directory: Optional[str] = SUMMARY_DIR):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._map: Optional[mmap.mmap] = None
+        self._seq = 0
+
+    def start(self) -> None:
+        if not self.directory or self._map is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"lobby-{os.getpid()}.summary")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, REGION_SIZE)
+            self._map = mmap.mmap(fd, REGION_SIZE)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self._map, 0, MAGIC, LAYOUT_VERSION, RECORD.size, 0)
+        self._seq = 0
+        logger.info(f"Publishing lobby summaries to {self.path}")
+
+    def stop(self) -> None:
+        if self._map is None:
+            return
+        self._map.close()
+        self._map = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def publish(self, lobby) -> None:
+        """Publish a LobbyManager's current summary (no-op when not started)."""
+        if self._map is None:
+            return
+        counts = [0] * len(STATUSES)
+        for player in lobby.players.values():
+            counts[STATUS_INDEX[player.status]] += 1
+        self.write(lobby.game_id, lobby.game_in_progress, lobby.current_round,
+                   len(lobby.connections), len(lobby.spectators), counts)
+
+    def write(self, game_id: str, game_in_progress: bool, current_round: int,
+              connected: int, spectators: int, counts: Sequence[int]) -> None:
+        """Write one record under the seqlock."""
+        self._seq += 1
+        SEQ.pack_into(self._map, SEQ_OFFSET, self._seq)
+        RECORD.pack_into(self._map, HEADER.size, game_id.encode("ascii"), os.getpid(), game_in_progress,
+                         current_round, connected, spectators, time.time(), *counts)
+        self._seq += 1
+        SEQ.pack_into(self._map, SEQ_OFFSET, self._seq)
+
+
+class SummaryReader:
+    """Reads the summaries every worker publishes, from any process.
+
+    Regions stay mapped between reads, so a read is two sequence loads
+    and one unpack, with no IPC and no file I/O.
+    """
+
+    def __init__(self, directory: Optional[str] = SUMMARY_DIR):
+        self.directory = directory
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def read_all(self) -> List[dict]:
+        """Summaries of all live workers (files of dead workers are skipped)."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        paths = {entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".summary")}
+        for path in list(self._maps):
+            if path not in paths:
+                self._maps.pop(path).close()
+
+        summaries = []
+        for path in sorted(paths):
+            summary = self.read(path)
+            if summary and _is_alive(summary["pid"]):
+                summaries.append(summary)
+        return summaries
+
+    def read(self, path: str) -> Optional[dict]:
+        """Read one region (None if it is not a summary file or the writer never settled)."""
+        region = self._map(path)
+        if region is None:
+            return None
+
+        for _ in range(MAX_READ_ATTEMPTS):
+            (before,) = SEQ.unpack_from(region, SEQ_OFFSET)
+            if before % 2:
+                continue
+            fields = RECORD.unpack_from(region, HEADER.size)
+            (after,) = SEQ.unpack_from(region, SEQ_OFFSET)
+            if before == after:
+                break
+        else:
+            return None
+        if before == 0:
+            return None  # Nothing published yet
+
+        game_id, pid, game_in_progress, current_round, connected, spectators, updated_at = fields[:7]
+        counts = fields[7:]
+        return {
+            "gameId": game_id.decode("ascii"),
+            "pid": pid,
+            "version": before // 2,
+            "gameInProgress": game_in_progress,
+            "round": current_round,
+            "players": sum(counts),
+            "connected": connected,
+            "spectators": spectators,
+            "statusCounts": {status.value: count for status, count in zip(STATUSES, counts)},
+            "updatedAt": updated_at
+        }
+
+    def _map(self, path: str) -> Optional[mmap.mmap]:
+        region = self._maps.get(path)
+        if region is not None:
+            return region
+        try:
+            with open(path, "rb") as f:
+                region = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        magic, layout_version, record_size, _ = HEADER.unpack_from(region, 0)
+        if magic != MAGIC or layout_version != LAYOUT_VERSION or record_size != RECORD.size:
+            region.close()
+            return None
+        self._maps[path] = region
+        return region
+
+    def close(self) -> None:
+        for region in self._maps.values():
+            region.close()
+        self._maps.clear()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Create singleton instances
+summary_publisher = SummaryPublisher()
+summary_reader = SummaryReader()
@@ -1,12 +1,28 @@
 from web_socket import websocket_endpoint
-from fastapi import FastAPI, WebSocket
+from sse_transport import sse_stream_endpoint, sse_message_endpoint
+from fastapi import FastAPI, WebSocket, Request, Response, HTTPException, Query, Header, Depends
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
+import atexit
+import hmac
 import logging
+import os
 
 # Import our QR code module
-from qr_generator import setup_qr_code
+from qr_generator import setup_qr_code, server_qr_png
+from game_history import history_store
+from lobby_summary import summary_publisher, summary_reader
+from lobby_manager import lobby_manager
+from game_rules import DEFAULT_RULES, get_rules
+from message_handler import MIN_ROUND_SECONDS, MAX_ROUND_SECONDS
+from tournament import tournament, TABLE_SIZE
+from tracing import tracer
+from runtime import build_uvicorn_config
+from executors import cpu_pool, describe_executors, loop_monitor, offload_log_handlers
+from handoff import DrainingServer, restore_server
 
 # Configure logging
 logging.basicConfig(
@@ -14,11 +30,32 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# Log records are written by a background thread, never by the event loop
+atexit.register(offload_log_handlers().stop)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    history_store.start()
+    loop_monitor.start()
+    # Share this worker's lobby summary with other workers and dashboards
+    summary_publisher.start()
+    # Pick up the lobby saved by a previous process during a graceful drain
+    await restore_server()
+    summary_publisher.publish(lobby_manager)
+    yield
+    # Flush finished games to disk before exiting
+    history_store.stop()
+    await tracer.flush()
+    summary_publisher.stop()
+    await loop_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Mount static files from the frontend build directory
-app.mount("/assets", StaticFiles(directory="../frontend/dist/assets"), name="assets")
+# (check_dir=False lets the API run without a frontend build, e.g. for benchmarks)
+app.mount("/assets", StaticFiles(directory="../frontend/dist/assets", check_dir=False), name="assets")
 
 # WebSocket endpoint
 
@@ -27,6 +64,135 @@ app.mount("/assets", StaticFiles(directory="../frontend/dist/assets"), name="ass
 async def websocket_route(websocket: WebSocket):
     await websocket_endpoint(websocket)
 
+# SSE + HTTP POST fallback for networks that break WebSockets
+
+
+@app.get("/sse")
+async def sse_stream_route(request: Request):
+    return await sse_stream_endpoint(request)
+
+
+@app.post("/sse/{session_id}")
+async def sse_message_route(session_id: str, request: Request):
+    return await sse_message_endpoint(session_id, request)
+
+# Game history API
+
+
+@app.get("/api/history/stats")
+async def history_stats_route():
+    return await history_store.get_stats()
+
+
+@app.get("/api/history/games")
+async def history_games_route(player: Optional[str] = None, since: Optional[float] = None,
+                              until: Optional[float] = None, limit: int = Query(50, ge=1, le=500)):
+    return await history_store.find_games(player, since, until, limit)
+
+
+# Join QR code for a projector or the lobby screen (rendered on the cpu pool)
+
+
+@app.get("/api/qr.png")
+async def qr_route(request: Request):
+    png = await cpu_pool.run(server_qr_png, request.url.port or 80)
+    return Response(png, media_type="image/png")
+
+
+# Executor pool backlog and event loop lag
+
+
+@app.get("/api/executors")
+async def executors_route():
+    return describe_executors()
+
+
+# Lobby summaries of every worker, read from shared memory (see lobby_summary.py)
+
+
+@app.get("/api/lobbies")
+async def lobbies_route():
+    return summary_reader.read_all()
+
+
+# Endpoints that change how the server runs (tournaments, tracing) need the
+# GAME_ADMIN_TOKEN in an X-Admin-Token header; without a token set, only localhost may call them
+ADMIN_TOKEN = os.getenv("GAME_ADMIN_TOKEN", "")
+LOCAL_HOSTS = {"127.0.0.1", "::1"}
+
+
+async def require_admin(request: Request, x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN:
+        if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+            raise HTTPException(403, "Admin token required")
+    elif request.client is None or request.client.host not in LOCAL_HOSTS:
+        raise HTTPException(403, "Admin endpoints are only open to localhost unless GAME_ADMIN_TOKEN is set")
+
+
+# Tournament: open registration, start the first stage, follow the tables and standings
+
+
+@app.post("/api/tournament", dependencies=[Depends(require_admin)])
+async def tournament_open_route(stages: int = Query(3, ge=1, le=100),
+                                table_size: int = Query(TABLE_SIZE, ge=2, le=64),
+                                rules: Optional[str] = None,
+                                round_seconds: Optional[int] = Query(None, ge=MIN_ROUND_SECONDS,
+                                                                     le=MAX_ROUND_SECONDS)):
+    rule_set = get_rules(rules) if rules else DEFAULT_RULES
+    if not rule_set:
+        raise HTTPException(400, f"Unknown rule set: {rules}")
+    if not tournament.open(stages, table_size, rule_set, round_seconds):
+        raise HTTPException(409, "A tournament is already running")
+    return tournament.describe()
+
+
+@app.post("/api/tournament/start", dependencies=[Depends(require_admin)])
+async def tournament_start_route():
+    if not tournament.start():
+        raise HTTPException(409, f"Cannot start: tournament is {tournament.state} "
+                                 f"with {len(tournament.participants)} participants")
+    return tournament.describe()
+
+
+@app.get("/api/tournament")
+async def tournament_route():
+    return tournament.describe()
+
+
+@app.get("/api/tournament/standings")
+async def tournament_standings_route(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    return tournament.describe_standings(offset, limit)
+
+
+# Message traces (sampled with GAME_TRACE_SAMPLE, see tracing.py)
+
+
+@app.get("/api/traces")
+async def traces_route(limit: int = Query(50, ge=1, le=1000), type: Optional[str] = None,
+                       player: Optional[str] = None):
+    return tracer.recent(limit, type, player)
+
+
+@app.get("/api/traces/config")
+async def traces_config_route():
+    return tracer.describe()
+
+
+@app.post("/api/traces/config", dependencies=[Depends(require_admin)])
+async def traces_configure_route(sample: Optional[float] = Query(None, ge=0, le=1),
+                                 follow: Optional[str] = None, unfollow: Optional[str] = None):
+    # follow/unfollow take a player ID; every message from a followed player is traced
+    tracer.configure(sample, [follow] if follow else [], [unfollow] if unfollow else [])
+    return tracer.describe()
+
+
+@app.get("/api/traces/{trace_id}")
+async def trace_route(trace_id: str):
+    record = tracer.get(trace_id)
+    if record is None:
+        raise HTTPException(404, "Unknown trace (it may have left the buffer)")
+    return record
+
 # Root route returns the index.html from the Svelte build
 @app.get("/{full_path:path}")
 async def serve_spa(full_path: str):
@@ -49,6 +215,16 @@ if __name__ == "__main__":
     # Generate QR codes and get the server URL
     server_url = setup_qr_code(port=port, auto_open_browser=False)
 
+    # Server tuning comes from the runtime profile (GAME_PROFILE, see runtime.py);
+    # WebSocket compression is negotiated per client unless WS_PER_MESSAGE_DEFLATE=0
+    config = build_uvicorn_config()
+
     # Start the server
     logger.info(f"Starting server at {server_url}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    if config["workers"] > 1:
+        # Multiple workers need an import string (no session handoff)
+        uvicorn.run("main:app", host="0.0.0.0", port=port, **config)
+    else:
+        # On SIGTERM/SIGINT, drain and save the lobby for the next process
+        server = DrainingServer(uvicorn.Config(app, host="0.0.0.0", port=port, **config))
+        server.run()
@@ -2,109 +2,155 @@ import json
 import logging
 import uuid
 import asyncio
-from fastapi import WebSocket
+import math
+import time
 from typing import Optional, Callable, Dict, Awaitable
-from lobby_manager import lobby_manager, PlayerStatus
+from lobby_manager import LobbyManager, lobby_manager, player_lobbies, PlayerStatus
 from game_roles import Role
+from game_rules import get_rules
+from multicast import DOCTOR
+from connection import Connection
+from connection_registry import connection_registry
+from lobby_hibernation import lobby_store, HIBERNATE_AFTER
+from scheduler import scheduler
+from tournament import tournament
+from tracing import Trace, span, tracer, untraced_task
+from wire import JSON_CODEC, COMPACT_CODEC
+from opcodes import OPCODE_VERSION, INBOUND_TYPES, decode_frame
+from schemas import (
+    InvalidMessage, MESSAGE_TYPES, Message,
+    JoinMessage, ReconnectMessage, CurePlayerMessage, ChatMessage,
+    SelectRulesMessage, SetRoundTimerMessage, PingMessage, JoinTournamentMessage
+)
+import resume_tokens
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Type definition for message handlers
-MessageHandler = Callable[[WebSocket, dict, str], Awaitable[Optional[str]]]
+MessageHandler = Callable[[LobbyManager, Connection, Message, str], Awaitable[Optional[str]]]
 
 # Dictionary to store disconnected players for potential reconnection
 # Format: {player_id: (player_name, removal_task)}
 disconnected_players = {}
 RECONNECT_TIMEOUT = 60  # seconds to wait before removing disconnected player
+RECONNECT_BROADCAST_WINDOW = 0.25  # seconds of reconnects coalesced into one broadcast
+hibernation_timer = None  # Scheduler handle; armed while no socket is connected
 
+# Timed rounds (optional per lobby, see LobbyManager.round_seconds)
+ROUND_TICK_INTERVAL = 15  # seconds between countdown ticks; clients count down locally
+FINAL_TICK = 5  # one last tick this many seconds before the round ends
+MIN_ROUND_SECONDS = 10
+MAX_ROUND_SECONDS = 600
 
-async def send_error(websocket: WebSocket, message: str) -> None:
+
+async def send_error(connection: Connection, message: str) -> None:
     """Send an error message to the client."""
-    await websocket.send_text(json.dumps({
+    await connection.send_text(json.dumps({
         "type": "error",
         "message": message
     }))
 
 
-async def handle_join(websocket: WebSocket, data: dict, _: str) -> Optional[str]:
+def negotiate_codec(connection: Connection, data) -> None:
+    """Switch the connection to the compact wire schema and/or opcodes if the client asks for them."""
+    connection.codec = COMPACT_CODEC if data.compact else JSON_CODEC
+    connection.opcodes = data.opcodes == OPCODE_VERSION
+
+
+async def handle_join(lobby: LobbyManager, connection: Connection, data: JoinMessage, _: str) -> Optional[str]:
     """Handle a player joining the lobby."""
-    player_name = data.get("name", "").strip()
+    player_name = data.name.strip()
     if not player_name:
-        await send_error(websocket, "Player name is required")
+        await send_error(connection, "Player name is required")
+        return None
+
+    # Tournament tables are seated by the tournament
+    if lobby.tournament:
+        await send_error(connection, "Cannot join a tournament table")
         return None
 
+    # The server is shutting down and will ask clients to come back
+    if lobby.draining:
+        await send_error(connection, "Server is restarting - try again shortly")
+        return None
+
+    # A spectator joining as a player leaves the spectator group
+    lobby.spectators.remove(connection)
+
     # Generate a new player ID
     new_player_id = str(uuid.uuid4())
 
     # Add player to the lobby
-    player = lobby_manager.add_player(new_player_id, player_name, websocket)
+    player = lobby.add_player(new_player_id, player_name, connection)
 
     # Check if game is in progress (cannot join)
     if not player:
-        await send_error(websocket, "Cannot join - game is already in progress")
+        await send_error(connection, "Cannot join - game is already in progress")
         return None
 
     # Send confirmation to the player
-    await websocket.send_text(json.dumps({
+    negotiate_codec(connection, data)
+    await connection.send_text(json.dumps({
         "type": "joined",
-        "playerId": new_player_id
+        "playerId": new_player_id,
+        "handle": lobby.player_handles[new_player_id],
+        "resumeToken": resume_tokens.issue(new_player_id)
     }))
 
     # Broadcast updated lobby state to all players
-    await lobby_manager.broadcast_lobby_state()
+    lobby.request_lobby_state()
 
     return new_player_id
 
 
-async def handle_reconnect(websocket: WebSocket, data: dict, _: str) -> Optional[str]:
+async def handle_reconnect(lobby: LobbyManager, connection: Connection, data: ReconnectMessage, _: str) -> Optional[str]:
     """Handle a player reconnecting to the lobby."""
-    player_id = data.get("playerId")
-    player_name = data.get("playerName", "").strip()
-    game_id = data.get("gameId")
+    # Fast path: a signed resume token identifies the player on its own
+    token = data.token
+    if token:
+        player_id = resume_tokens.verify(token)
+        if player_id and player_id not in lobby.players and player_id in tournament.participants:
+            return await rejoin_tournament(connection, data, player_id)
+        if player_id and player_id not in lobby.players and lobby is lobby_manager:
+            await wake_lobby(data.game_id)
+        if player_id and player_id in lobby.players:
+            return await resume_player(lobby, connection, data, player_id)
+
+        await connection.send_text(json.dumps({
+            "type": "game_id_mismatch",
+            "currentGameId": lobby.game_id
+        }))
+        return None
+
+    player_id = data.player_id
+    player_name = data.player_name.strip()
+    game_id = data.game_id
 
     if not player_id or not player_name:
-        await send_error(websocket, "Player ID and name are required for reconnection")
+        await send_error(connection, "Player ID and name are required for reconnection")
         return None
 
-    # Check if game ID matches current game
-    if game_id and game_id != lobby_manager.game_id:
+    # Check if game ID matches current game (or a hibernated one); tournament
+    # tables change game ID every stage, so their players are found by ID alone
+    if (not lobby.tournament and game_id and game_id != lobby.game_id
+            and not await wake_lobby(game_id)):
         logger.info(
             f"Player {player_name} tried to reconnect to a different game session")
-        await websocket.send_text(json.dumps({
+        await connection.send_text(json.dumps({
             "type": "game_id_mismatch",
-            "currentGameId": lobby_manager.game_id
+            "currentGameId": lobby.game_id
         }))
         return None
 
     # Check if this player is in the disconnected players list
     if player_id in disconnected_players:
-        # Cancel the removal task
-        removal_task = disconnected_players[player_id][1]
-        if removal_task and not removal_task.done():
-            removal_task.cancel()
-
-        # Remove from disconnected list
-        del disconnected_players[player_id]
-
         # Check if the player is still in the lobby
-        player = lobby_manager.get_player(player_id)
-        if player:
-            # Update the websocket
-            lobby_manager.update_player_websocket(player_id, websocket)
-
-            # Send confirmation to the player
-            await websocket.send_text(json.dumps({
-                "type": "reconnected"
-            }))
-
-            # Broadcast updated lobby state to all players
-            await lobby_manager.broadcast_lobby_state()
-
-            logger.info(f"Player {player_name} ({player_id}) reconnected")
-            return player_id
+        if lobby.get_player(player_id):
+            return await resume_player(lobby, connection, data, player_id)
         else:
             # Player was already removed, treat as a new connection
+            del disconnected_players[player_id]
             logger.info(
                 f"Player {player_name} reconnection failed - already removed from lobby")
 
@@ -112,299 +158,536 @@ async def handle_reconnect(websocket: WebSocket, data: dict, _: str) -> Optional
     # 1. The player wasn't in the disconnected list
     # 2. The player was already removed from the lobby
     # Treat this as a new connection
-    return await handle_join(websocket, {"name": player_name}, None)
+    return await handle_join(lobby, connection, JoinMessage(type="join", name=player_name, compact=data.compact), None)
+
+
+async def resume_player(lobby: LobbyManager, connection: Connection, data: ReconnectMessage, player_id: str) -> str:
+    """Attach a returning player to a new connection."""
+    # Cancel the pending removal, if the old connection was already noticed as gone
+    entry = disconnected_players.pop(player_id, None)
+    if entry:
+        removal_task = entry[1]
+        if removal_task and not removal_task.done():
+            removal_task.cancel()
+
+    player = lobby.get_player(player_id)
+
+    # Update the connection
+    lobby.update_player_connection(player_id, connection)
+    negotiate_codec(connection, data)
+
+    # Send confirmation to the player
+    await connection.send_text(json.dumps({
+        "type": "reconnected",
+        "handle": lobby.player_handles.get(player_id),
+        "resumeToken": resume_tokens.issue(player_id)
+    }))
+
+    # Replay only the events the player missed while away
+    for frame in lobby.events_since(data.last_seq):
+        await connection.send_text(frame)
+
+    # Replay the chat the player can see
+    chat_history = lobby.chat.history_for(player)
+    if chat_history:
+        await connection.send_text(json.dumps({
+            "type": "chat_history",
+            "messages": chat_history
+        }))
+
+    # Reconnects arriving together (e.g. after an access point reboot)
+    # share a single lobby_state broadcast
+    lobby.schedule_broadcast(RECONNECT_BROADCAST_WINDOW)
+
+    logger.info(f"Player {player.name} ({player_id}) reconnected")
+    return player_id
+
+
+async def handle_join_tournament(lobby: LobbyManager, connection: Connection, data: JoinTournamentMessage,
+                                 player_id: str) -> Optional[str]:
+    """Handle a player entering the tournament pool (they are seated when the next stage starts)."""
+    if player_id:
+        await send_error(connection, "Leave the lobby before joining the tournament")
+        return player_id
+
+    player_name = data.name.strip()
+    if not player_name:
+        await send_error(connection, "Player name is required")
+        return None
+
+    if lobby.draining:
+        await send_error(connection, "Server is restarting - try again shortly")
+        return None
+
+    new_player_id = str(uuid.uuid4())
+    participant = tournament.register(new_player_id, player_name, connection)
+    if not participant:
+        await send_error(connection, "No tournament is open")
+        return None
 
+    lobby.spectators.remove(connection)
+    negotiate_codec(connection, data)
+    await send_tournament_joined(connection, participant.id)
+    return None
+
+
+async def rejoin_tournament(connection: Connection, data: ReconnectMessage, player_id: str) -> None:
+    """Attach a returning participant who is not seated at a table to a new connection."""
+    tournament.attach(player_id, connection)
+    negotiate_codec(connection, data)
+    await send_tournament_joined(connection, player_id)
+    logger.info(f"Participant {player_id} is back in the tournament pool")
+
+
+async def send_tournament_joined(connection: Connection, player_id: str) -> None:
+    await connection.send_text(json.dumps({
+        "type": "tournament_joined",
+        "playerId": player_id,
+        "resumeToken": resume_tokens.issue(player_id),
+        "state": tournament.state,
+        "stage": tournament.stage,
+        "stages": tournament.stages,
+        "participants": len(tournament.participants)
+    }))
 
-async def handle_ready(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+
+async def handle_ready(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a player setting ready status."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
+        return player_id
+
+    # A late or repeated ready must not revive or un-kill a player mid-game
+    if lobby.game_in_progress:
+        await send_error(connection, "Cannot change ready status - game in progress")
         return player_id
 
-    lobby_manager.set_player_status(player_id, PlayerStatus.READY)
-    await lobby_manager.broadcast_lobby_state()
+    lobby.set_player_status(player_id, PlayerStatus.READY)
+    lobby.request_lobby_state()
     return player_id
 
 
-async def handle_unready(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_unready(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a player canceling ready status."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
         return player_id
 
     # Only allow unready if game hasn't started
-    if lobby_manager.game_in_progress:
-        await send_error(websocket, "Cannot change ready status - game in progress")
+    if lobby.game_in_progress:
+        await send_error(connection, "Cannot change ready status - game in progress")
         return player_id
 
-    lobby_manager.set_player_status(player_id, PlayerStatus.WAITING)
-    await lobby_manager.broadcast_lobby_state()
+    lobby.set_player_status(player_id, PlayerStatus.WAITING)
+    lobby.request_lobby_state()
     return player_id
 
 
-async def handle_start_game(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_start_game(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a request to start the game."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
+        return player_id
+
+    if lobby.tournament:
+        await send_error(connection, "Tournament games start automatically")
         return player_id
 
-    if not lobby_manager.all_players_ready():
-        await send_error(websocket, "Not all players are ready")
+    if not lobby.all_players_ready():
+        await send_error(connection, "Not all players are ready")
         return player_id
 
     # Check minimum player count
-    if len(lobby_manager.players) < 2:
-        await send_error(websocket, "Need at least 2 players to start")
+    if len(lobby.players) < lobby.rules.min_players:
+        await send_error(connection, f"Need at least {lobby.rules.min_players} players to start")
         return player_id
 
     try:
-        success = lobby_manager.start_game()
+        success = lobby.start_game()
         if success:
-            # First broadcast updated lobby state with roles
-            await lobby_manager.broadcast_lobby_state()
-
-            # Then notify all players that the game has started
-            for pid, ws in lobby_manager.websockets.items():
-                try:
-                    await ws.send_text(json.dumps({
-                        "type": "game_started"
-                    }))
-                except Exception as e:
-                    logger.error(f"Error sending game_started to player {
-                                 pid}: {str(e)}")
+            # The lobby state with roles goes out first (broadcast flushes it),
+            # then all players are told the game has started
+            lobby.request_lobby_state()
+            await lobby.broadcast({
+                "type": "game_started"
+            })
     except Exception as e:
         logger.error(f"Error in handle_start_game: {str(e)}")
-        await send_error(websocket, "Error starting game")
+        await send_error(connection, "Error starting game")
 
     return player_id
 
 
-async def handle_mark_dead(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_mark_dead(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a player marking themselves as dead."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
         return player_id
 
-    player = lobby_manager.get_player(player_id)
+    player = lobby.get_player(player_id)
     if not player or player.status != PlayerStatus.ALIVE:
-        await send_error(websocket, "Player is not alive")
+        await send_error(connection, "Player is not alive")
         return player_id
 
     # Special rule: Doctor cannot die unless all other players are dead
-    if player.role == Role.DOCTOR and not lobby_manager.can_doctor_die():
-        await send_error(websocket, "The Doctor cannot die until all other players are dead")
+    if player.role == Role.DOCTOR and not lobby.can_doctor_die():
+        await send_error(connection, "The Doctor cannot die until all other players are dead")
         return player_id
 
-    lobby_manager.set_player_status(player_id, PlayerStatus.DEAD)
-    await lobby_manager.broadcast_lobby_state()
+    lobby.set_player_status(player_id, PlayerStatus.DEAD)
+    lobby.request_lobby_state()
 
     # Check if game is over (half or more non-doctor players are dead)
-    if lobby_manager.should_game_end():
+    if lobby.should_game_end():
+        # Players see the death before the game_over it causes
+        await lobby.flush_lobby_state()
+
         # End the current game and get winner
-        winner = lobby_manager.end_game()
+        winner = lobby.end_game()
 
         # Notify all players
-        for ws in lobby_manager.websockets.values():
-            try:
-                await ws.send_text(json.dumps({
-                    "type": "game_over",
-                    "winner": winner
-                }))
-            except Exception as e:
-                logger.error(f"Error sending game_over: {str(e)}")
+        await lobby.broadcast({
+            "type": "game_over",
+            "winner": winner
+        })
 
         # Broadcast the updated lobby state with new game ID
-        await lobby_manager.broadcast_lobby_state()
+        lobby.request_lobby_state()
 
     return player_id
 
 
-async def handle_end_game(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_end_game(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a doctor requesting to end the game."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
         return player_id
 
-    player = lobby_manager.get_player(player_id)
+    player = lobby.get_player(player_id)
     if not player or player.status != PlayerStatus.ALIVE:
-        await send_error(websocket, "Player is not alive")
+        await send_error(connection, "Player is not alive")
         return player_id
 
     # Only the doctor can end the game
     if player.role != Role.DOCTOR:
-        await send_error(websocket, "Only the Doctor can end the game")
+        await send_error(connection, "Only the Doctor can end the game")
         return player_id
 
     # End the current game
-    winner = lobby_manager.end_game()
+    winner = lobby.end_game()
 
     # Notify all players
-    for ws in lobby_manager.websockets.values():
-        try:
-            await ws.send_text(json.dumps({
-                "type": "game_over",
-                "endedByDoctor": True,
-                "winner": winner
-            }))
-        except Exception as e:
-            logger.error(f"Error sending game_over: {str(e)}")
+    await lobby.broadcast({
+        "type": "game_over",
+        "endedByDoctor": True,
+        "winner": winner
+    })
 
     # Broadcast the updated lobby state with new game ID
-    await lobby_manager.broadcast_lobby_state()
+    lobby.request_lobby_state()
 
     return player_id
 
 
-async def handle_start_round(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_start_round(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a doctor request to start a new round."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
         return player_id
 
-    player = lobby_manager.get_player(player_id)
+    player = lobby.get_player(player_id)
     if not player or player.status != PlayerStatus.ALIVE:
-        await send_error(websocket, "Player is not alive")
+        await send_error(connection, "Player is not alive")
         return player_id
 
     # Only the doctor can start a round
     if player.role != Role.DOCTOR:
-        await send_error(websocket, "Only the Doctor can start a round")
+        await send_error(connection, "Only the Doctor can start a round")
         return player_id
 
     # Start a new round
-    success = lobby_manager.start_new_round()
+    success = lobby.start_new_round()
     if not success:
-        await send_error(websocket, "Failed to start round")
+        await send_error(connection, "Failed to start round")
         return player_id
 
+    # Timed lobbies end the round automatically
+    round_started = {
+        "type": "round_started",
+        "roundNumber": lobby.current_round
+    }
+    if lobby.round_seconds:
+        arm_round_timer(lobby, time.time() + lobby.round_seconds)
+        round_started["endsAt"] = int(lobby.round_ends_at * 1000)
+
     # Notify all players that a round has started
-    for ws in lobby_manager.websockets.values():
-        try:
-            await ws.send_text(json.dumps({
-                "type": "round_started",
-                "roundNumber": lobby_manager.current_round
-            }))
-        except Exception as e:
-            logger.error(f"Error sending round_started: {str(e)}")
+    await lobby.broadcast(round_started)
 
     # Send the list of sick players to the doctor
     sick_players_info = []
-    for sick_id in lobby_manager.sick_players:
-        sick_player = lobby_manager.get_player(sick_id)
+    for sick_id in lobby.sick_players:
+        sick_player = lobby.get_player(sick_id)
         if sick_player:
             sick_players_info.append({
                 "id": sick_player.id,
+                "handle": lobby.player_handles.get(sick_player.id),
                 "name": sick_player.name
             })
 
-    await websocket.send_text(json.dumps({
+    # Only the doctor sees who is sick
+    await lobby.multicast(DOCTOR, {
         "type": "sick_players",
         "players": sick_players_info
-    }))
+    })
 
     # Broadcast updated lobby state to all players
-    await lobby_manager.broadcast_lobby_state()
+    lobby.request_lobby_state()
 
     return player_id
 
 
-async def handle_cure_player(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_cure_player(lobby: LobbyManager, connection: Connection, data: CurePlayerMessage, player_id: str) -> Optional[str]:
     """Handle a doctor curing a sick player."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
         return player_id
 
-    player = lobby_manager.get_player(player_id)
+    player = lobby.get_player(player_id)
     if not player or player.status != PlayerStatus.ALIVE:
-        await send_error(websocket, "Player is not alive")
+        await send_error(connection, "Player is not alive")
         return player_id
 
     # Only the doctor can cure a player
     if player.role != Role.DOCTOR:
-        await send_error(websocket, "Only the Doctor can cure a player")
+        await send_error(connection, "Only the Doctor can cure a player")
         return player_id
 
-    # Get the player to cure
-    player_to_cure_id = data.get("playerId")
+    # Get the player to cure (compact clients may send a handle)
+    player_to_cure_id = lobby.resolve_player_id(data.player_id)
 
     # Doctor may choose not to cure anyone
     if player_to_cure_id:
         # Apply the cure
-        success = lobby_manager.cure_player(player_to_cure_id)
+        success = lobby.cure_player(player_to_cure_id)
         if not success:
-            await send_error(websocket, "Failed to cure player")
+            await send_error(connection, "Failed to cure player")
             return player_id
 
         # Get the player name for the response
-        cured_player = lobby_manager.get_player(player_to_cure_id)
+        cured_player = lobby.get_player(player_to_cure_id)
         player_name = cured_player.name if cured_player else "Unknown player"
 
         # Notify the doctor of the cure action
-        await websocket.send_text(json.dumps({
+        await lobby.multicast(DOCTOR, {
             "type": "player_cured",
             "playerId": player_to_cure_id,
             "playerName": player_name
-        }))
+        })
     else:
         # Doctor chose not to cure anyone
-        lobby_manager.cured_player = None
-        await websocket.send_text(json.dumps({
+        lobby.cured_player = None
+        await lobby.multicast(DOCTOR, {
             "type": "no_player_cured"
-        }))
+        })
 
     return player_id
 
 
-async def handle_end_round(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
+async def handle_end_round(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
     """Handle a doctor ending the current round."""
     if not player_id:
-        await send_error(websocket, "Not connected to a lobby")
+        await send_error(connection, "Not connected to a lobby")
         return player_id
 
-    player = lobby_manager.get_player(player_id)
+    player = lobby.get_player(player_id)
     if not player or player.status != PlayerStatus.ALIVE:
-        await send_error(websocket, "Player is not alive")
+        await send_error(connection, "Player is not alive")
         return player_id
 
     # Only the doctor can end a round
     if player.role != Role.DOCTOR:
-        await send_error(websocket, "Only the Doctor can end a round")
+        await send_error(connection, "Only the Doctor can end a round")
         return player_id
 
-    # End the round
-    result = lobby_manager.end_round()
+    await finish_round(lobby)
+    return player_id
+
+
+async def finish_round(lobby: LobbyManager) -> None:
+    """End the current round and tell everyone (doctor request or round timer)."""
+    result = lobby.end_round()
 
     # If game ended, result will be the winning team
     if isinstance(result, str):
         # Game is over, result contains the winner
-        for ws in lobby_manager.websockets.values():
-            try:
-                await ws.send_text(json.dumps({
-                    "type": "game_over",
-                    "winner": result
-                }))
-            except Exception as e:
-                logger.error(f"Error sending game_over: {str(e)}")
+        await lobby.broadcast({
+            "type": "game_over",
+            "winner": result
+        })
     else:
         # Round ended normally, notify all players
-        for ws in lobby_manager.websockets.values():
-            try:
-                await ws.send_text(json.dumps({
-                    "type": "round_ended",
-                    "roundNumber": lobby_manager.current_round
-                }))
-            except Exception as e:
-                logger.error(f"Error sending round_ended: {str(e)}")
+        await lobby.broadcast({
+            "type": "round_ended",
+            "roundNumber": lobby.current_round
+        })
 
     # Broadcast updated lobby state to all players
-    await lobby_manager.broadcast_lobby_state()
+    lobby.request_lobby_state()
+
+
+def arm_round_timer(lobby: LobbyManager, ends_at: float) -> None:
+    """Schedule the current round's auto-end and countdown ticks on the shared scheduler.
+
+    Ticks only go out every ROUND_TICK_INTERVAL seconds (plus FINAL_TICK);
+    clients count down from endsAt in between.
+    """
+    lobby.cancel_round_timers()
+    lobby.round_ends_at = ends_at
+
+    actor = lobby.actor
+    game_id, round_number = lobby.game_id, lobby.current_round
+    remaining = ends_at - time.time()
+    deadline = asyncio.get_running_loop().time() + remaining
+
+    handles = [scheduler.call_at(deadline, actor.submit, end_round_on_timeout, lobby, game_id, round_number)]
+    tick_points = set(range(ROUND_TICK_INTERVAL, math.ceil(remaining), ROUND_TICK_INTERVAL)) | {FINAL_TICK}
+    for seconds_left in sorted(tick_points, reverse=True):
+        if seconds_left < remaining:
+            handles.append(scheduler.call_at(deadline - seconds_left, actor.submit,
+                                             send_round_tick, lobby, game_id, round_number, seconds_left))
+    lobby.round_timers = handles
+
+
+def is_current_round(lobby: LobbyManager, game_id: str, round_number: int) -> bool:
+    """Check that a timer still belongs to the running timed round."""
+    return (lobby.game_in_progress and lobby.round_ends_at is not None
+            and lobby.game_id == game_id and lobby.current_round == round_number)
+
+
+async def send_round_tick(lobby: LobbyManager, game_id: str, round_number: int, seconds_left: int) -> None:
+    """Tell everyone how long the timed round has left."""
+    if not is_current_round(lobby, game_id, round_number):
+        return
+
+    await lobby.notify({
+        "type": "round_timer",
+        "roundNumber": round_number,
+        "secondsLeft": seconds_left,
+        "endsAt": int(lobby.round_ends_at * 1000)
+    })
+
+
+async def end_round_on_timeout(lobby: LobbyManager, game_id: str, round_number: int) -> None:
+    """End a timed round the doctor did not end in time."""
+    if not is_current_round(lobby, game_id, round_number):
+        return
+
+    logger.info(f"Round {round_number} timed out")
+    await finish_round(lobby)
 
+
+async def handle_set_round_timer(lobby: LobbyManager, connection: Connection, data: SetRoundTimerMessage, player_id: str) -> Optional[str]:
+    """Handle a player setting the round timer for the next game (0 turns it off)."""
+    if not player_id:
+        await send_error(connection, "Not connected to a lobby")
+        return player_id
+
+    if lobby.tournament:
+        await send_error(connection, "The tournament sets the rules")
+        return player_id
+
+    seconds = data.seconds or None
+    if seconds is not None and not MIN_ROUND_SECONDS <= seconds <= MAX_ROUND_SECONDS:
+        await send_error(connection, f"Round timer must be {MIN_ROUND_SECONDS}-{MAX_ROUND_SECONDS} seconds")
+        return player_id
+
+    if lobby.game_in_progress:
+        await send_error(connection, "Cannot change the round timer during a game")
+        return player_id
+
+    lobby.round_seconds = seconds
+    lobby.request_lobby_state()
     return player_id
 
 
-async def handle_ping(websocket: WebSocket, data: dict, player_id: str) -> Optional[str]:
-    """Handle ping messages to keep the connection alive."""
-    await websocket.send_text(json.dumps({
+async def handle_chat(lobby: LobbyManager, connection: Connection, data: ChatMessage, player_id: str) -> Optional[str]:
+    """Handle a player posting a chat message."""
+    if not player_id:
+        await send_error(connection, "Not connected to a lobby")
+        return player_id
+
+    player = lobby.get_player(player_id)
+    if not player:
+        await send_error(connection, "Not connected to a lobby")
+        return player_id
+
+    text = data.text.strip()
+    if not text:
+        await send_error(connection, "Message text is required")
+        return player_id
+
+    channel_key = lobby.chat.channel_key(player, data.channel)
+    if not channel_key:
+        await send_error(connection, "Cannot post to that chat channel")
+        return player_id
+
+    if not lobby.chat.allow(player_id):
+        await send_error(connection, "You are sending messages too fast")
+        return player_id
+
+    lobby.chat.post(player, channel_key, text)
+    return player_id
+
+
+async def handle_select_rules(lobby: LobbyManager, connection: Connection, data: SelectRulesMessage, player_id: str) -> Optional[str]:
+    """Handle a player choosing the rule set for the next game."""
+    if not player_id:
+        await send_error(connection, "Not connected to a lobby")
+        return player_id
+
+    if lobby.tournament:
+        await send_error(connection, "The tournament sets the rules")
+        return player_id
+
+    rules = get_rules(data.rules)
+    if not rules:
+        await send_error(connection, f"Unknown rule set: {data.rules}")
+        return player_id
+
+    if not lobby.set_rules(rules):
+        await send_error(connection, "Cannot change rules during a game")
+        return player_id
+
+    lobby.request_lobby_state()
+    return player_id
+
+
+async def handle_spectate(lobby: LobbyManager, connection: Connection, data: Message, player_id: str) -> Optional[str]:
+    """Handle a spectator (e.g. a projector) subscribing to the public feed."""
+    if player_id:
+        await send_error(connection, "Players cannot spectate")
+        return player_id
+
+    lobby.spectators.add(connection)
+
+    # Send confirmation and the current public state right away
+    await connection.send_text(json.dumps({
+        "type": "spectating"
+    }))
+    await connection.send_text(json.dumps(lobby.get_lobby_state()))
+
+    return None
+
+
+async def handle_ping(lobby: LobbyManager, connection: Connection, data: PingMessage, player_id: str) -> Optional[str]:
+    """Handle ping messages to keep the connection alive.
+
+    Clients report the round-trip time of their previous ping as "rtt" (ms).
+    """
+    if data.rtt is not None:
+        connection.rtt_ms = data.rtt
+
+    await connection.send_text(json.dumps({
         "type": "pong"
     }))
     return player_id
@@ -422,65 +705,215 @@ MESSAGE_HANDLERS: Dict[str, MessageHandler] = {
     "start_round": handle_start_round,  # New handler
     "cure_player": handle_cure_player,  # New handler
     "end_round": handle_end_round,      # New handler
+    "chat": handle_chat,
+    "select_rules": handle_select_rules,
+    "set_round_timer": handle_set_round_timer,
+    "spectate": handle_spectate,
     "ping": handle_ping,
+    "join_tournament": handle_join_tournament,
 }
 
 
-async def handle_message(websocket: WebSocket, message: str, player_id: str = None) -> Optional[str]:
-    """Process incoming WebSocket messages by dispatching to appropriate handlers."""
-    try:
-        data = json.loads(message)
-        message_type = data.get("type")
+def route(connection: Connection, data: Message) -> LobbyManager:
+    """Find the lobby a message is for: the sender's, or for a reconnect the returning player's.
 
-        # Find the appropriate handler for this message type
-        handler = MESSAGE_HANDLERS.get(message_type)
-        if handler:
-            return await handler(websocket, data, player_id)
-        else:
-            await send_error(websocket, f"Unknown message type: {message_type}")
-            return player_id
+    Clients that are not in a lobby yet talk to the main lobby.
+    """
+    if connection.lobby is not None:
+        return connection.lobby
+    if data.opcode == ReconnectMessage.opcode:
+        player_id = resume_tokens.verify(data.token) if data.token else data.player_id
+        return player_lobbies.get(player_id, lobby_manager)
+    return lobby_manager
 
-    except json.JSONDecodeError:
-        logger.error(f"Invalid JSON format: {message}")
-        await send_error(websocket, "Invalid message format")
+
+async def handle_message(connection: Connection, message: str, player_id: str = None) -> Optional[str]:
+    """Process incoming WebSocket messages by dispatching to appropriate handlers.
+
+    The sender's player ID comes from the connection registry binding
+    (connection.player_id) unless one is passed explicitly.
+    """
+    player_id = player_id or connection.player_id
+
+    # Sampled messages are traced end to end (see tracing.py)
+    trace = tracer.start("message", player_id, connection=connection.id, transport=connection.transport)
+    if trace is None:
+        return await dispatch_message(connection, message, player_id)
+    with trace:
+        return await dispatch_message(connection, message, player_id, trace)
+
+
+async def dispatch_message(connection: Connection, message: str, player_id: Optional[str],
+                           trace: Optional[Trace] = None) -> Optional[str]:
+    """Decode one frame and run its handler in the right lobby's actor."""
+    # Size cap, JSON parsing and schema validation all happen before any
+    # handler runs, so bad input is rejected without touching the lobby
+    try:
+        with span("decode", bytes=len(message)):
+            data = decode_frame(message)
+    except InvalidMessage as e:
+        logger.warning(f"Rejected message: {str(e)}")
+        await send_error(connection, str(e))
+        return player_id
+
+    try:
+        # Run inside the lobby's actor so handlers never interleave
+        lobby = route(connection, data)
+        if trace:
+            trace.root.set(type=data.type, lobby=lobby.game_id)
+        return await lobby.actor.call(HANDLERS_BY_OPCODE[data.opcode], lobby, connection, data, player_id,
+                                      trace=trace)
     except Exception as e:
-        logger.error(f"Error handling message: {str(e)}")
-        await send_error(websocket, "Internal server error")
+        logger.error(f"Error handling {data.type} message: {str(e)}")
+        await send_error(connection, "Internal server error")
 
     return player_id
 
 
-async def handle_disconnect(player_id: str):
+# Every handled message type needs a schema, and every schema a handler
+if MESSAGE_TYPES != set(MESSAGE_HANDLERS):
+    raise RuntimeError(f"Message schemas and handlers differ: {sorted(MESSAGE_TYPES ^ set(MESSAGE_HANDLERS))}")
+
+# Dispatch by integer opcode: inbound opcodes are 0..n-1 (see opcodes.py)
+HANDLERS_BY_OPCODE = tuple(MESSAGE_HANDLERS[message_type] for message_type in INBOUND_TYPES)
+
+
+async def handle_disconnect(player_id: str, connection: Connection = None):
     """Schedule player removal after timeout."""
-    if not player_id:
+    lobby = player_lobbies.get(player_id)
+    if not player_id or lobby is None:
         return
 
+    async def disconnect():
+        # Ignore connections the player has already been resumed away from
+        # (an evicted connection no longer counts as the player's)
+        current = connection_registry.get(player_id)
+        if connection is None or current is None or current is connection:
+            await schedule_removal(player_id)
+            if lobby is lobby_manager and not lobby.connections:
+                arm_hibernation()
+
+    await lobby.actor.call(disconnect)
+
+
+async def schedule_removal(player_id: str):
+    """Track a disconnected player and remove them if they do not come back (runs in their lobby's actor)."""
+
     # Get player before potential removal
-    player = lobby_manager.get_player(player_id)
+    lobby = player_lobbies.get(player_id)
+    player = lobby.get_player(player_id) if lobby else None
     if not player:
         return
 
     player_name = player.name
 
+    # A second disconnect (e.g. an evicted connection closing late) replaces the old timer
+    previous = disconnected_players.pop(player_id, None)
+    if previous and previous[1] and not previous[1].done():
+        previous[1].cancel()
+
     # Add to disconnected players list
+    async def remove_player(lobby: LobbyManager):
+        # If we reach here, the player didn't reconnect in time
+        if player_id in disconnected_players and lobby is lobby_manager and not lobby.connections:
+            # Nobody is connected, so the whole lobby hibernates instead; check
+            # again later in case someone new joins meanwhile
+            del disconnected_players[player_id]
+            await schedule_removal(player_id)
+        elif player_id in disconnected_players:
+            logger.info(f"Removing player {player_name} ({
+                        player_id}) after reconnect timeout")
+            del disconnected_players[player_id]
+            lobby.remove_player(player_id)
+            lobby.request_lobby_state()
+
     async def remove_player_after_timeout():
         try:
             await asyncio.sleep(RECONNECT_TIMEOUT)
-            # If we reach here, the player didn't reconnect in time
-            if player_id in disconnected_players:
-                logger.info(f"Removing player {player_name} ({
-                            player_id}) after reconnect timeout")
-                del disconnected_players[player_id]
-                lobby_manager.remove_player(player_id)
-                await lobby_manager.broadcast_lobby_state()
+            # A tournament player may have been seated at another table meanwhile
+            lobby = player_lobbies.get(player_id)
+            if lobby is None:
+                disconnected_players.pop(player_id, None)
+                return
+            await lobby.actor.call(remove_player, lobby)
         except asyncio.CancelledError:
             # Task was cancelled, which means player reconnected
             logger.info(f"Cancelled removal task for {
                         player_name} ({player_id})")
 
     # Create and store the removal task
-    removal_task = asyncio.create_task(remove_player_after_timeout())
+    removal_task = untraced_task(remove_player_after_timeout())
     disconnected_players[player_id] = (player_name, removal_task)
 
     logger.info(f"Player {player_name} ({player_id}) disconnected, removal scheduled in {
                 RECONNECT_TIMEOUT} seconds")
+
+
+async def restore_lobby(snapshot: dict, lobby: LobbyManager = lobby_manager) -> None:
+    """Load a saved lobby or tournament table (runs in its actor).
+
+    Every player starts disconnected with the usual reconnect timeout, so
+    clients can resume with their stored playerId and gameId.
+    """
+    lobby.restore_snapshot(snapshot)
+    for player_id in lobby.players:
+        await schedule_removal(player_id)
+    if lobby.game_in_progress and lobby.round_ends_at:
+        # Give players time to reconnect before a timed round runs out
+        arm_round_timer(lobby, max(lobby.round_ends_at, time.time() + MIN_ROUND_SECONDS))
+    if lobby is lobby_manager:
+        arm_hibernation()
+
+
+def arm_hibernation() -> None:
+    """Hibernate the lobby if it stays without sockets for HIBERNATE_AFTER seconds."""
+    global hibernation_timer
+    if hibernation_timer:
+        hibernation_timer.cancel()
+    hibernation_timer = scheduler.call_later(HIBERNATE_AFTER, lobby_manager.actor.submit, hibernate_if_idle)
+
+
+async def hibernate_if_idle() -> None:
+    """Move an idle lobby out of memory (see lobby_hibernation.py) and free it for a new game.
+
+    Only the main lobby hibernates: tournament tables are held by the
+    running tournament, which ends or saves them itself.
+    """
+    if lobby_manager.connections or not lobby_manager.players:
+        return
+
+    for player_id in lobby_manager.players:
+        entry = disconnected_players.pop(player_id, None)
+        if entry and entry[1] and not entry[1].done():
+            entry[1].cancel()
+
+    game_id = lobby_manager.game_id
+    await lobby_store.put(game_id, {"savedAt": time.time(), "lobby": lobby_manager.to_snapshot()})
+    logger.info(f"Hibernated idle game {game_id} with {len(lobby_manager.players)} players "
+                f"({lobby_store.describe()})")
+
+    lobby_manager.reset_game()
+    # Spectators see the fresh lobby
+    lobby_manager.request_lobby_state()
+
+
+async def wake_lobby(game_id: Optional[str]) -> bool:
+    """Restore a hibernated game for a returning player (runs in the actor).
+
+    Only an empty lobby can take it; otherwise the player is told the
+    game changed, as before, and the game is kept in memory for when the
+    lobby frees up.
+    """
+    if not game_id:
+        return False
+    if lobby_manager.players:
+        lobby_store.touch(game_id)
+        return False
+
+    state = await lobby_store.take(game_id)
+    if not state:
+        return False
+
+    await restore_lobby(state["lobby"])
+    logger.info(f"Woke hibernated game {game_id} with {len(lobby_manager.players)} players")
+    return True
@@ -0,0 +1,81 @@
+from types import MappingProxyType
+from typing import Dict, Mapping, Set, Tuple
+from game_roles import BASE_ROLE, Role
+from player_status import ALIVE_STATUSES, PlayerStatus
+
+# Group names; a team group is named like its chat channel key ("team:ALLY")
+ALL = "all"
+ALIVE = "alive"
+DEAD = "dead"
+DOCTOR = "doctor"
+SPECTATORS = "spectators"  # Served by the lobby's SpectatorChannel, not by PlayerGroups
+BASE_TEAMS = tuple(dict.fromkeys(BASE_ROLE.values()))
+
+
+def team_group(role: Role) -> str:
+    """Group of the players sharing role's base team."""
+    return f"team:{BASE_ROLE[role].value}"
+
+
+def _groups_for(role, status: PlayerStatus) -> Tuple[str, ...]:
+    groups = [ALL]
+    if role is not None:
+        if status in ALIVE_STATUSES:
+            groups.append(ALIVE)
+        elif status == PlayerStatus.DEAD:
+            groups.append(DEAD)
+        if role == Role.DOCTOR:
+            groups.append(DOCTOR)
+        groups.append(team_group(role))
+    return tuple(groups)
+
+
+# The groups of a player with a given (role, status), built once at import
+GROUPS_BY_STATE: Mapping[tuple, Tuple[str, ...]] = MappingProxyType({
+    (role, status): _groups_for(role, status)
+    for role in (None, *Role)
+    for status in PlayerStatus
+})
+PLAYER_GROUPS = (ALL, ALIVE, DEAD, DOCTOR, *(f"team:{team.value}" for team in BASE_TEAMS))
+
+
+class PlayerGroups:
+    """A lobby's players indexed by multicast group, by player ID.
+
+    Membership follows each player's role and status, and is updated by
+    the lobby wherever those change (the same places as its alive index),
+    so sending to a group walks just its members instead of filtering
+    every connection. Players without a connection stay members; senders
+    skip them.
+    """
+
+    def __init__(self):
+        self.members: Dict[str, Set[str]] = {group: set() for group in PLAYER_GROUPS}
+        self._groups: Dict[str, Tuple[str, ...]] = {}  # player ID -> groups they are in
+
+    def update(self, player) -> None:
+        """Move a player to the groups of their current role and status."""
+        groups = GROUPS_BY_STATE[(player.role, player.status)]
+        previous = self._groups.get(player.id, ())
+        if groups is previous:
+            return
+        for group in previous:
+            if group not in groups:
+                self.members[group].discard(player.id)
+        for group in groups:
+            self.members[group].add(player.id)
+        self._groups[player.id] = groups
+
+    def discard(self, player_id: str) -> None:
+        """Drop a player who left the lobby from every group."""
+        for group in self._groups.pop(player_id, ()):
+            self.members[group].discard(player_id)
+
+    def clear(self) -> None:
+        for members in self.members.values():
+            members.clear()
+        self._groups = {}
+
+    def get(self, group: str) -> Set[str]:
+        """Player IDs in a group (empty for an unknown group)."""
+        return self.members.get(group, set())
@@ -0,0 +1,83 @@
+import json
+from types import MappingProxyType
+from typing import Annotated, Literal, Mapping, Tuple, Union, get_args
+from pydantic import Field, TypeAdapter, ValidationError, create_model
+from schemas import INBOUND_MODELS, MAX_FRAME_SIZE, InvalidMessage, Message, _describe, decode_message
+
+# Bump whenever the table below changes; clients send the version they speak
+OPCODE_VERSION = 2
+
+# Server-to-client message types, after the client-to-server ones
+OUTBOUND_TYPES = (
+    "opcodes", "joined", "reconnected", "lobby_state", "player_role", "game_started", "game_over",
+    "round_started", "round_ended", "round_timer", "sick_players", "player_cured", "no_player_cured",
+    "chat", "chat_history", "spectating", "pong", "error", "server_restarting", "game_id_mismatch",
+    "tournament_joined", "table_assigned", "tournament_standings",
+)
+
+# One table for both directions. Client-to-server types come first, in
+# INBOUND_MODELS order, so an inbound opcode is also its handler's index;
+# types used both ways (chat) keep their inbound code
+INBOUND_TYPES: Tuple[str, ...] = tuple(get_args(model.model_fields["type"].annotation)[0] for model in INBOUND_MODELS)
+TYPES_BY_OPCODE: Tuple[str, ...] = INBOUND_TYPES + tuple(t for t in OUTBOUND_TYPES if t not in INBOUND_TYPES)
+OPCODES: Mapping[str, int] = MappingProxyType({message_type: code for code, message_type in enumerate(TYPES_BY_OPCODE)})
+
+for _model in INBOUND_MODELS:
+    _model.opcode = OPCODES[get_args(_model.model_fields["type"].annotation)[0]]
+
+# Sent to every client when it connects; older clients ignore the unknown type
+OPCODE_TABLE_FRAME = json.dumps({"type": "opcodes", "version": OPCODE_VERSION, "opcodes": dict(OPCODES)})
+
+
+def _opcode_model(model):
+    """A variant of an inbound model tagged by "op" instead of "type"."""
+    message_type = get_args(model.model_fields["type"].annotation)[0]
+    return create_model(
+        f"{model.__name__}Op",
+        __base__=model,
+        type=(Literal[message_type], message_type),
+        op=(Literal[model.opcode], ...)
+    )
+
+
+OPCODE_MODELS = tuple(_opcode_model(model) for model in INBOUND_MODELS)
+OPCODE_ADAPTER = TypeAdapter(Annotated[Union[OPCODE_MODELS], Field(discriminator="op")])
+_TAG_NAMES = {**{code: name for code, name in enumerate(INBOUND_TYPES)},
+              **{str(code): name for code, name in enumerate(INBOUND_TYPES)}}
+
+
+def decode_frame(frame) -> Message:
+    """Decode an inbound frame tagged either by "type" or, as its first key, by "op".
+
+    Both give the same typed message (with .type and .opcode set), so
+    handlers never see which form the client used.
+    """
+    if not frame.startswith('{"op"'):
+        return decode_message(frame)
+
+    if len(frame) > MAX_FRAME_SIZE:
+        raise InvalidMessage("Message too large")
+    try:
+        return OPCODE_ADAPTER.validate_json(frame)
+    except ValidationError as e:
+        raise InvalidMessage(_describe(e, _TAG_NAMES)) from None
+
+
+# Outbound frames all start with the type (json.dumps of a dict literal whose
+# first key is "type"), so switching a frame to its opcode is a prefix swap
+_TYPE_PREFIXES = {f'{{"type": "{message_type}"': f'{{"op": {code}' for message_type, code in OPCODES.items()}
+_TYPE_START = len('{"type": "')
+_last_frame = ("", "")  # A broadcast passes the same str to every connection
+
+
+def opcode_frame(frame: str) -> str:
+    """Replace a frame's leading "type" string with its opcode (unchanged if it has none)."""
+    global _last_frame
+    if _last_frame[0] is frame:
+        return _last_frame[1]
+
+    end = frame.find('"', _TYPE_START)
+    replacement = _TYPE_PREFIXES.get(frame[:end + 1]) if end > 0 else None
+    encoded = replacement + frame[end + 1:] if replacement else frame
+    _last_frame = (frame, encoded)
+    return encoded
@@ -0,0 +1,24 @@
+from enum import Enum
+from types import MappingProxyType
+from typing import Mapping
+
+
+class PlayerStatus(Enum):
+    WAITING = "WAITING"
+    READY = "READY"
+    ALIVE = "ALIVE"
+    SICK = "SICK"
+    DEAD = "DEAD"
+
+
+# Statuses that still count as alive for team counts and history
+ALIVE_STATUSES = frozenset({PlayerStatus.ALIVE, PlayerStatus.SICK})
+
+# Extra private fields per status, built once and shared by every lobby
+STATUS_INFO: Mapping[PlayerStatus, Mapping[str, str]] = MappingProxyType({
+    status: MappingProxyType(
+        {"statusColor": "#6B8E23"}  # Olive green/slimy color for sick players
+        if status == PlayerStatus.SICK else {}
+    )
+    for status in PlayerStatus
+})
@@ -1,3 +1,5 @@
+import functools
+import io
 import qrcode
 import socket
 import logging
@@ -63,25 +65,37 @@ def generate_qr_code_terminal(url):
         logger.error(f"Error generating terminal QR code: {e}")
 
 
+@functools.lru_cache(maxsize=8)
+def render_qr_png(url):
+    """Encode the QR code for url as PNG bytes (CPU-bound; run it on the cpu pool)."""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def server_qr_png(port=8000):
+    """PNG of the QR code players scan to open this server."""
+    return render_qr_png(f"http://{get_local_ip()}:{port}")
+
+
 def generate_qr_code_html(url, filename="qr_code.html"):
     """Generate an HTML file with the QR code and open it in a browser."""
     try:
-        # Generate QR code image
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Save the image to a file
+        # Save the QR code image to a file
         img_path = os.path.join(os.path.dirname(
             os.path.abspath(__file__)), "qr_code.png")
-        img.save(img_path)
+        with open(img_path, "wb") as f:
+            f.write(render_qr_png(url))
 
         # Create HTML file
         html_path = os.path.join(os.path.dirname(
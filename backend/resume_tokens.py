@@ -0,0 +1,53 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from typing import Optional
+
+TOKEN_TTL = 6 * 60 * 60  # seconds a resume token stays valid
+
+# Set GAME_RESUME_SECRET to keep tokens valid across restarts; otherwise a
+# random secret is used (and carried over by the graceful drain handoff)
+_secret: bytes = os.getenv("GAME_RESUME_SECRET", "").encode() or secrets.token_bytes(32)
+
+
+def get_secret() -> bytes:
+    return _secret
+
+
+def set_secret(secret: bytes) -> None:
+    global _secret
+    _secret = secret
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_secret, payload.encode(), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def issue(player_id: str) -> str:
+    """Create a signed resume token for a player: "<player_id>.<expiry>.<signature>"."""
+    payload = f"{player_id}.{int(time.time()) + TOKEN_TTL}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify(token) -> Optional[str]:
+    """Return the player ID in a valid, unexpired token (None otherwise).
+
+    Validation is a single HMAC over the token itself - no lobby state is
+    consulted.
+    """
+    if not isinstance(token, str):
+        return None
+
+    payload, _, signature = token.rpartition(".")
+    player_id, _, expiry = payload.rpartition(".")
+    if not player_id or not expiry.isdigit():
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    if int(expiry) < time.time():
+        return None
+    return player_id
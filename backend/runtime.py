@@ -0,0 +1,99 @@
+import importlib.util
+import logging
+import os
+from typing import Dict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def has_module(name: str) -> bool:
+    """Check if an optional module is installed."""
+    return importlib.util.find_spec(name) is not None
+
+
+# Server runtime profiles (keyword arguments for uvicorn.run)
+# "auto" loop/http pick uvloop/httptools when they are installed
+PROFILES: Dict[str, dict] = {
+    # Plain asyncio + h11, close to uvicorn's pure-Python defaults
+    "baseline": {
+        "loop": "asyncio",
+        "http": "h11",
+        "ws": "websockets",
+        "workers": 1,
+        "backlog": 2048,
+        "ws_max_size": 16 * 1024 * 1024,
+        "ws_ping_interval": 20.0,
+        "ws_ping_timeout": 20.0,
+        "timeout_keep_alive": 5,
+        "ws_per_message_deflate": True,
+    },
+    # Same limits, with the fast event loop and HTTP parser when available
+    "default": {
+        "loop": "auto",
+        "http": "auto",
+        "ws": "websockets",
+        "workers": 1,
+        "backlog": 2048,
+        "ws_max_size": 16 * 1024 * 1024,
+        "ws_ping_interval": 20.0,
+        "ws_ping_timeout": 20.0,
+        "timeout_keep_alive": 5,
+        "ws_per_message_deflate": True,
+    },
+    # Large events: deep accept queue for reconnect bursts, small frames
+    # only (game messages are tiny), slower pings to save phone radios
+    "event": {
+        "loop": "auto",
+        "http": "auto",
+        "ws": "websockets",
+        "workers": 1,
+        "backlog": 8192,
+        "ws_max_size": 64 * 1024,
+        "ws_ping_interval": 30.0,
+        "ws_ping_timeout": 30.0,
+        "timeout_keep_alive": 30,
+        "ws_per_message_deflate": True,
+    },
+}
+
+# Environment variables that override single settings of the profile
+ENV_OVERRIDES = {
+    "GAME_WORKERS": ("workers", int),
+    "GAME_BACKLOG": ("backlog", int),
+    "WS_MAX_SIZE": ("ws_max_size", int),
+    "WS_PING_INTERVAL": ("ws_ping_interval", float),
+    "WS_PING_TIMEOUT": ("ws_ping_timeout", float),
+    "KEEP_ALIVE_TIMEOUT": ("timeout_keep_alive", int),
+    "WS_PER_MESSAGE_DEFLATE": ("ws_per_message_deflate", lambda value: value != "0"),
+}
+
+
+def build_uvicorn_config(profile_name: str = None) -> dict:
+    """Resolve a runtime profile into uvicorn.run keyword arguments.
+
+    The profile comes from GAME_PROFILE unless given; single settings can
+    be overridden with the variables in ENV_OVERRIDES.
+    """
+    profile_name = profile_name or os.getenv("GAME_PROFILE", "default")
+    if profile_name not in PROFILES:
+        raise ValueError(f"Unknown runtime profile '{profile_name}' (choose from {', '.join(PROFILES)})")
+
+    config = dict(PROFILES[profile_name])
+
+    for env_name, (key, parse) in ENV_OVERRIDES.items():
+        value = os.getenv(env_name)
+        if value is not None:
+            config[key] = parse(value)
+
+    if config["loop"] == "auto":
+        config["loop"] = "uvloop" if has_module("uvloop") else "asyncio"
+    if config["http"] == "auto":
+        config["http"] = "httptools" if has_module("httptools") else "h11"
+
+    if config["workers"] > 1:
+        # Lobbies live in process memory, so players must share a worker
+        logger.warning(f"Running {config['workers']} workers - each worker has its own lobbies")
+
+    logger.info(f"Runtime profile '{profile_name}': {config}")
+    return config
@@ -0,0 +1,87 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class TimerHandle:
+    """A scheduled callback; cancel() just marks it so the scheduler skips it."""
+
+    __slots__ = ("when", "fn", "args", "cancelled")
+
+    def __init__(self, when: float, fn: Callable[..., Any], args: tuple):
+        self.when = when
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Scheduler:
+    """One timer heap and one task for every lobby's timers.
+
+    Round timers for hundreds of lobbies share this instead of each lobby
+    sleeping in its own task. Callbacks are plain functions run on the event
+    loop; anything that touches a lobby should hand off to its actor with
+    LobbyActor.submit. Cancelled handles stay in the heap until they reach
+    the top, so cancel() is O(1).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, TimerHandle]] = []
+        self._counter = itertools.count()  # Tie-breaker for equal deadlines
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def call_at(self, when: float, fn: Callable[..., Any], *args) -> TimerHandle:
+        """Run fn(*args) at loop time `when`."""
+        handle = TimerHandle(when, fn, args)
+        heapq.heappush(self._heap, (when, next(self._counter), handle))
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="scheduler")
+        elif self._heap[0][2] is handle:
+            self._wakeup.set()  # New earliest deadline; re-arm the sleep
+        return handle
+
+    def call_later(self, delay: float, fn: Callable[..., Any], *args) -> TimerHandle:
+        """Run fn(*args) after delay seconds."""
+        return self.call_at(asyncio.get_running_loop().time() + delay, fn, *args)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Drop cancelled timers at the top
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                timeout = None
+            else:
+                timeout = self._heap[0][0] - loop.time()
+                if timeout <= 0:
+                    _, _, handle = heapq.heappop(self._heap)
+                    try:
+                        handle.fn(*handle.args)
+                    except Exception as e:
+                        logger.error(f"Error in scheduled callback: {str(e)}")
+                    continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Create a singleton instance
+scheduler = Scheduler()
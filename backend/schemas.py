@@ -0,0 +1,139 @@
+from typing import Annotated, ClassVar, Literal, Mapping, Optional, Union, get_args
+from pydantic import BaseModel, ConfigDict, Field, StrictInt, StrictStr, TypeAdapter, ValidationError
+
+MAX_FRAME_SIZE = 4096  # characters; larger frames are rejected before decoding
+MAX_NAME_LENGTH = 64
+MAX_TEXT_LENGTH = 1000  # chat text beyond ChatRoom.MAX_LENGTH is truncated, not rejected
+
+
+class InvalidMessage(Exception):
+    """An inbound frame that is too large, not JSON, or does not match its schema."""
+
+
+class Message(BaseModel):
+    # Unknown fields are ignored so older/newer clients can add hints freely
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+    opcode: ClassVar[int] = -1  # Integer code of the message type (set from the table in opcodes.py)
+
+
+class JoinMessage(Message):
+    type: Literal["join"]
+    name: StrictStr = Field("", max_length=MAX_NAME_LENGTH)
+    compact: bool = False
+    opcodes: Optional[StrictInt] = None  # Opcode table version the client speaks
+
+
+class ReconnectMessage(Message):
+    type: Literal["reconnect"]
+    token: Optional[StrictStr] = Field(None, max_length=256)
+    player_id: Optional[StrictStr] = Field(None, alias="playerId", max_length=64)
+    player_name: StrictStr = Field("", alias="playerName", max_length=MAX_NAME_LENGTH)
+    game_id: Optional[StrictStr] = Field(None, alias="gameId", max_length=64)
+    last_seq: Optional[StrictInt] = Field(None, alias="lastSeq")
+    compact: bool = False
+    opcodes: Optional[StrictInt] = None
+
+
+class ReadyMessage(Message):
+    type: Literal["ready"]
+
+
+class UnreadyMessage(Message):
+    type: Literal["unready"]
+
+
+class StartGameMessage(Message):
+    type: Literal["start_game"]
+
+
+class MarkDeadMessage(Message):
+    type: Literal["mark_dead"]
+
+
+class EndGameMessage(Message):
+    type: Literal["end_game"]
+
+
+class StartRoundMessage(Message):
+    type: Literal["start_round"]
+
+
+class CurePlayerMessage(Message):
+    type: Literal["cure_player"]
+    # Player UUID, or the compact integer handle; None means cure nobody
+    player_id: Union[StrictInt, Annotated[StrictStr, Field(max_length=64)], None] = Field(None, alias="playerId")
+
+
+class EndRoundMessage(Message):
+    type: Literal["end_round"]
+
+
+class ChatMessage(Message):
+    type: Literal["chat"]
+    text: StrictStr = Field("", max_length=MAX_TEXT_LENGTH)
+    channel: StrictStr = Field("all", max_length=16)
+
+
+class SelectRulesMessage(Message):
+    type: Literal["select_rules"]
+    rules: Optional[StrictStr] = Field(None, max_length=64)
+
+
+class SetRoundTimerMessage(Message):
+    type: Literal["set_round_timer"]
+    seconds: Optional[StrictInt] = None  # Range is checked by the handler
+
+
+class SpectateMessage(Message):
+    type: Literal["spectate"]
+
+
+class JoinTournamentMessage(Message):
+    type: Literal["join_tournament"]
+    name: StrictStr = Field("", max_length=MAX_NAME_LENGTH)
+    compact: bool = False
+    opcodes: Optional[StrictInt] = None
+
+
+class PingMessage(Message):
+    type: Literal["ping"]
+    rtt: Optional[float] = Field(None, ge=0, lt=60000)  # Client-measured ms of the previous ping
+
+
+INBOUND_MODELS = (
+    JoinMessage, ReconnectMessage, ReadyMessage, UnreadyMessage, StartGameMessage,
+    MarkDeadMessage, EndGameMessage, StartRoundMessage, CurePlayerMessage, EndRoundMessage,
+    ChatMessage, SelectRulesMessage, SetRoundTimerMessage, SpectateMessage, PingMessage,
+    JoinTournamentMessage,
+)
+InboundMessage = Annotated[Union[INBOUND_MODELS], Field(discriminator="type")]
+
+# Built once: JSON parsing and validation run in a single pass in pydantic-core
+INBOUND_ADAPTER = TypeAdapter(InboundMessage)
+MESSAGE_TYPES = frozenset(get_args(model.model_fields["type"].annotation)[0] for model in INBOUND_MODELS)
+
+def decode_message(frame) -> Message:
+    """Decode and validate one inbound frame, raising InvalidMessage with a client-facing reason."""
+    if len(frame) > MAX_FRAME_SIZE:
+        raise InvalidMessage("Message too large")
+
+    try:
+        return INBOUND_ADAPTER.validate_json(frame)
+    except ValidationError as e:
+        raise InvalidMessage(_describe(e)) from None
+
+
+def _describe(error: ValidationError, tag_names: Mapping = None) -> str:
+    first = error.errors(include_url=False, include_input=False)[0]
+    kind = first["type"]
+    if kind == "union_tag_invalid":
+        return f"Unknown message type: {first['ctx']['tag']}"
+    if kind == "union_tag_not_found":
+        return "Message type is required"
+    if kind in ("json_invalid", "model_attributes_type", "dict_type") or len(first["loc"]) < 2:
+        return "Invalid message format"
+    # loc is (message type or opcode, field, ...)
+    tag = first["loc"][0]
+    if tag_names:
+        tag = tag_names.get(tag, tag)
+    return f"Invalid {tag} message: {first['loc'][1]}: {first['msg']}"
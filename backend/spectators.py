@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import List, Set
+from tracing import untraced_task
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SpectatorChannel:
+    """Public-only fan-out group for spectator (projector) connections.
+
+    Spectators are never added to LobbyManager.players, so they do not count
+    towards all_players_ready or role assignment, and they never receive
+    player_role messages.
+
+    Frames are coalesced: messages published in the same window are flushed
+    together by a single background task, and a newer lobby_state replaces
+    any older one that has not been sent yet. Player sends never wait on
+    spectator sends.
+    """
+
+    FLUSH_INTERVAL = 0.5  # seconds between spectator flushes
+
+    def __init__(self):
+        self.connections: Set = set()
+        self._pending: List[tuple] = []  # (frame, coalesce_key)
+        self._flush_task = None
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def add(self, connection) -> None:
+        """Register a spectator connection."""
+        self.connections.add(connection)
+        logger.info(f"Spectator joined ({len(self.connections)} watching)")
+
+    def remove(self, connection) -> None:
+        """Unregister a spectator connection (no-op if unknown)."""
+        if connection in self.connections:
+            self.connections.discard(connection)
+            logger.info(f"Spectator left ({len(self.connections)} watching)")
+
+    def publish(self, frame: str, coalesce_key: str = None) -> None:
+        """Queue a serialized public frame for all spectators.
+
+        Frames sharing a coalesce_key replace each other, so only the most
+        recent one is delivered when the window is flushed.
+        """
+        if not self.connections:
+            return
+
+        if coalesce_key is not None:
+            self._pending = [p for p in self._pending if p[1] != coalesce_key]
+        self._pending.append((frame, coalesce_key))
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = untraced_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.FLUSH_INTERVAL)
+
+        frames = [frame for frame, _ in self._pending]
+        self._pending = []
+        if not frames:
+            return
+
+        connections = list(self.connections)
+        results = await asyncio.gather(
+            *(self._send_frames(conn, frames) for conn in connections),
+            return_exceptions=True
+        )
+
+        # Drop spectators whose socket failed
+        for conn, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sending to spectator: {str(result)}")
+                self.remove(conn)
+
+    @staticmethod
+    async def _send_frames(connection, frames: List[str]):
+        for frame in frames:
+            await connection.send_text(frame)
@@ -0,0 +1,69 @@
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+import logging
+from typing import Dict
+from connection import SSEConnection
+from connection_registry import connection_registry
+from message_handler import handle_message, handle_disconnect
+from lobby_manager import lobby_manager
+from schemas import MAX_FRAME_SIZE
+from opcodes import OPCODE_TABLE_FRAME
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Open SSE streams by session ID
+sse_sessions: Dict[str, SSEConnection] = {}
+
+
+async def sse_stream_endpoint(request: Request) -> StreamingResponse:
+    """Open a downstream SSE stream (fallback for clients without WebSockets)."""
+    connection = SSEConnection()
+    sse_sessions[connection.id] = connection
+    connection_registry.register(connection)
+    await connection.send_text(OPCODE_TABLE_FRAME)
+    logger.info(f"New SSE stream established ({len(sse_sessions)} open)")
+
+    async def stream():
+        try:
+            async for event in connection.events():
+                yield event
+        finally:
+            await connection.close()
+            sse_sessions.pop(connection.id, None)
+            connection_registry.unregister(connection)
+            lobby_manager.spectators.remove(connection)
+            logger.info(f"SSE stream closed ({len(sse_sessions)} open)")
+
+            # Handle disconnection with timeout for reconnection
+            if connection.player_id:
+                await handle_disconnect(connection.player_id, connection)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering
+        },
+    )
+
+
+async def sse_message_endpoint(session_id: str, request: Request) -> Response:
+    """Accept an upstream message for an open SSE stream."""
+    connection = sse_sessions.get(session_id)
+    if not connection:
+        return Response(status_code=404)
+
+    # Refuse oversized bodies before reading them (up to 4 UTF-8 bytes per character)
+    if int(request.headers.get("content-length") or 0) > MAX_FRAME_SIZE * 4:
+        return Response(status_code=413)
+
+    data = (await request.body()).decode("utf-8", errors="replace")
+    logger.info(f"Message received: {data}")
+
+    # Process messages one at a time per session, like a WebSocket would
+    async with connection.lock:
+        await handle_message(connection, data)
+
+    return Response(status_code=204)
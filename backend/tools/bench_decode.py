@@ -0,0 +1,75 @@
+"""Benchmark inbound decode + validation per message.
+
+Compares the previous path (json.loads, then a dict lookup on "type";
+field checks happened later inside each handler) with the precompiled
+schema layer in schemas.py (size cap, then one pydantic-core pass that
+parses and validates into a typed message).
+
+Usage (from the backend directory):
+    python tools/bench_decode.py [--iterations 100000]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schemas import InvalidMessage, MAX_FRAME_SIZE, MESSAGE_TYPES, decode_message  # noqa: E402
+
+FRAMES = {
+    "ping": '{"type": "ping", "rtt": 23}',
+    "ready": '{"type": "ready"}',
+    "cure_player": '{"type": "cure_player", "playerId": 17}',
+    "chat": json.dumps({"type": "chat", "text": "hola a todos " * 8, "channel": "team"}),
+    "reconnect": json.dumps({
+        "type": "reconnect", "token": "x" * 90, "lastSeq": 412,
+        "playerId": "2b1f6c9e-0c5a-4c1e-9a57-6f1f7b0f1c11", "playerName": "Ana",
+        "gameId": "9d7a4d2e-2f0b-4f4e-8a4b-0d2b1b6b9a10"
+    }),
+    "malformed": "{not json",
+    "wrong type": '{"type": "cure_player", "playerId": ["x"]}',
+    "oversized": json.dumps({"type": "chat", "text": "x" * (MAX_FRAME_SIZE * 16)}),
+}
+
+
+def legacy_decode(frame: str):
+    """What handle_message did before handing the dict to a handler."""
+    try:
+        data = json.loads(frame)
+        return data.get("type") in MESSAGE_TYPES
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def schema_decode(frame: str):
+    try:
+        return decode_message(frame)
+    except InvalidMessage:
+        return None
+
+
+def timed_us(fn, frame: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(frame)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'frame':<14}{'bytes':>8}{'json.loads us':>16}{'schema us':>12}  note")
+    for name, frame in FRAMES.items():
+        iterations = args.iterations if len(frame) < 10000 else args.iterations // 10
+        legacy = timed_us(legacy_decode, frame, iterations)
+        current = timed_us(schema_decode, frame, iterations)
+        note = "typed + validated" if schema_decode(frame) else "rejected"
+        print(f"{name:<14}{len(frame):>8}{legacy:>16.2f}{current:>12.2f}  {note}")
+
+
+if __name__ == "__main__":
+    main()
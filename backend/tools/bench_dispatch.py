@@ -0,0 +1,101 @@
+"""Benchmark per-message dispatch: type strings vs integer opcodes.
+
+Inbound, for each frame it times decoding plus finding the handler:
+- legacy: json.loads, then MESSAGE_HANDLERS[data["type"]] (before schemas)
+- type: schema decode, then MESSAGE_HANDLERS[data.type]
+- opcode: schema decode of an {"op": n} frame, then HANDLERS_BY_OPCODE[data.opcode]
+
+Outbound, it reports the bytes saved by sending opcodes and the cost of
+rewriting a frame for one connection, and for a 100-player broadcast
+(where every connection is handed the same frame). Times are the best
+of three runs.
+
+Usage (from the backend directory):
+    python tools/bench_dispatch.py [--iterations 100000]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import opcodes  # noqa: E402
+from message_handler import HANDLERS_BY_OPCODE, MESSAGE_HANDLERS  # noqa: E402
+from opcodes import OPCODES, decode_frame, opcode_frame  # noqa: E402
+from schemas import decode_message  # noqa: E402
+
+INBOUND = {
+    "ready": {},
+    "ping": {"rtt": 23},
+    "cure_player": {"playerId": 17},
+    "chat": {"text": "hola a todos", "channel": "team"},
+}
+
+OUTBOUND = {
+    "pong": {},
+    "round_started": {"roundNumber": 3, "seq": 12},
+    "player_role": {"player": {"id": "2b1f6c9e-0c5a-4c1e-9a57-6f1f7b0f1c11", "name": "Ana", "role": "ALLY"}},
+}
+
+
+def legacy(frame: str):
+    data = json.loads(frame)
+    return MESSAGE_HANDLERS[data["type"]]
+
+
+def by_type(frame: str):
+    return MESSAGE_HANDLERS[decode_message(frame).type]
+
+
+def by_opcode(frame: str):
+    return HANDLERS_BY_OPCODE[decode_frame(frame).opcode]
+
+
+def timed_us(fn, arg, iterations: int, repeats: int = 3) -> float:
+    """Best of a few runs, so one noisy run does not decide the comparison."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    n = args.iterations
+
+    print(f"{'inbound':<14}{'legacy us':>11}{'type us':>10}{'opcode us':>11}{'bytes':>8}{'op bytes':>10}")
+    for message_type, fields in INBOUND.items():
+        type_frame = json.dumps({"type": message_type, **fields}, separators=(",", ":"))
+        op_frame = json.dumps({"op": OPCODES[message_type], **fields}, separators=(",", ":"))
+        assert by_type(type_frame) is by_opcode(op_frame)
+        print(f"{message_type:<14}{timed_us(legacy, type_frame, n):>11.2f}{timed_us(by_type, type_frame, n):>10.2f}"
+              f"{timed_us(by_opcode, op_frame, n):>11.2f}{len(type_frame):>8}{len(op_frame):>10}")
+
+    print(f"\n{'outbound':<14}{'bytes':>8}{'op bytes':>10}{'rewrite us':>12}{'x100 conns us':>15}")
+    for message_type, fields in OUTBOUND.items():
+        frame = json.dumps({"type": message_type, **fields})
+        encoded = opcode_frame(frame)
+
+        def rewrite_fresh(text):
+            opcodes._last_frame = ("", "")  # Defeat the cache: a private frame per connection
+            return opcode_frame(text)
+
+        def broadcast(text):
+            for _ in range(100):
+                opcode_frame(text)
+
+        print(f"{message_type:<14}{len(frame):>8}{len(encoded):>10}{timed_us(rewrite_fresh, frame, n):>12.2f}"
+              f"{timed_us(broadcast, frame, n // 100):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
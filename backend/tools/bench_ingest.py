@@ -0,0 +1,86 @@
+"""Benchmark burst ingest: everyone in a lobby pressing READY at once.
+
+Every player sends ready, unready, ready back to back (as their socket
+would: each frame after the previous one was handled), all players at the
+same time, through the real handle_message and lobby actor. Compares
+per-frame broadcasts (LobbyActor.MAX_BATCH = 1, the previous behaviour:
+one lobby_state per frame) with batched ingest (one lobby_state per
+actor batch), and checks both end with every player READY.
+
+Usage (from the backend directory):
+    python tools/bench_ingest.py [--sizes 10,50,200,500] [--bursts 5]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from connection import Connection  # noqa: E402
+from lobby_actor import LobbyActor  # noqa: E402
+from lobby_manager import PlayerStatus, lobby_manager  # noqa: E402
+from message_handler import handle_message  # noqa: E402
+
+BURST = ('{"type": "ready"}', '{"type": "unready"}', '{"type": "ready"}')
+
+
+class CountingConnection(Connection):
+    """Connection that counts frames instead of sending them."""
+
+    transport = "bench"
+
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    async def send_text(self, text: str) -> None:
+        self.frames += 1
+
+
+async def player_burst(connection: CountingConnection) -> None:
+    for frame in BURST:
+        await handle_message(connection, frame)
+
+
+async def run(num_players: int, bursts: int, max_batch: int):
+    """Return (seconds, frames sent) for bursts rounds of everyone sending BURST."""
+    LobbyActor.MAX_BATCH = max_batch
+    lobby_manager.reset_game()
+    connections = [CountingConnection() for _ in range(num_players)]
+    for i, connection in enumerate(connections):
+        await handle_message(connection, json.dumps({"type": "join", "name": f"p{i}"}))
+    for connection in connections:
+        connection.frames = 0
+
+    start = time.perf_counter()
+    for _ in range(bursts):
+        await asyncio.gather(*(player_burst(connection) for connection in connections))
+    elapsed = time.perf_counter() - start
+
+    if any(player.status != PlayerStatus.READY for player in lobby_manager.players.values()):
+        raise SystemExit("Per-player order was not kept: someone did not end READY")
+    return elapsed, sum(connection.frames for connection in connections)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,50,200,500")
+    parser.add_argument("--bursts", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    batch_size = LobbyActor.MAX_BATCH
+
+    print(f"{'players':>8}{'per-frame ms':>14}{'frames':>10}{'batched ms':>12}{'frames':>10}{'speedup':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        legacy, legacy_frames = await run(size, args.bursts, 1)
+        batched, batched_frames = await run(size, args.bursts, batch_size)
+        print(f"{size:>8}{legacy * 1000:>14.1f}{legacy_frames:>10}"
+              f"{batched * 1000:>12.1f}{batched_frames:>10}{legacy / batched:>8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""Benchmark sending to a subset of a lobby: scan-and-filter vs multicast groups.
+
+For a lobby of --players players in a running game (a third of them
+dead), it times sending one frame to each group two ways:
+- scan: walk every connection of the lobby and check the player's role
+  or status, the way team chat picked its recipients
+- group: LobbyManager.send_to_group, which walks only the group's members
+
+Connections count frames instead of sending them, so the times are the
+cost of picking recipients plus the send path. Times are the best of
+three runs.
+
+Usage (from the backend directory):
+    python tools/bench_multicast.py [--players 100 500 2000] [--iterations 200]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from connection import Connection  # noqa: E402
+from game_roles import Role  # noqa: E402
+from lobby_manager import LobbyManager, PlayerStatus  # noqa: E402
+from multicast import ALIVE, DEAD, DOCTOR, team_group  # noqa: E402
+
+FRAME = '{"type": "chat", "messages": []}'
+
+
+class CountingConnection(Connection):
+    """Connection that counts frames instead of sending them."""
+
+    transport = "bench"
+
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    async def send_text(self, text: str) -> None:
+        self.frames += 1
+
+
+def scan_filter(lobby: LobbyManager, group: str):
+    """Recipients of a group found by checking every connection."""
+    def wanted(player) -> bool:
+        if group == ALIVE:
+            return player.status in (PlayerStatus.ALIVE, PlayerStatus.SICK)
+        if group == DEAD:
+            return player.status == PlayerStatus.DEAD
+        if group == DOCTOR:
+            return player.role == Role.DOCTOR
+        return team_group(player.role) == group
+
+    return [
+        connection for player_id, connection in lobby.connections.items()
+        if (player := lobby.players.get(player_id)) and player.role and wanted(player)
+    ]
+
+
+async def scan_send(lobby: LobbyManager, group: str) -> int:
+    recipients = scan_filter(lobby, group)
+    for connection in recipients:
+        await connection.send_text(FRAME)
+    return len(recipients)
+
+
+async def timed_us(fn, lobby, group: str, iterations: int, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await fn(lobby, group)
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def build_lobby(size: int) -> LobbyManager:
+    lobby = LobbyManager()
+    for i in range(size):
+        lobby.add_player(f"p{i}", f"p{i}", CountingConnection())
+        lobby.set_player_status(f"p{i}", PlayerStatus.READY)
+    lobby.start_game()
+    for player_id in list(lobby.alive_candidates)[:size // 3]:
+        lobby.set_player_status(player_id, PlayerStatus.DEAD)
+    return lobby
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    groups = (ALIVE, DEAD, DOCTOR, team_group(Role.ALLY), team_group(Role.ENEMY))
+    print(f"{'players':>8}  {'group':<12}{'members':>9}{'scan us':>10}{'group us':>10}")
+    for size in args.players:
+        lobby = build_lobby(size)
+        for group in groups:
+            members = await lobby.send_to_group(group, FRAME)
+            assert members == await scan_send(lobby, group)
+            scan = await timed_us(scan_send, lobby, group, args.iterations)
+            grouped = await timed_us(lambda lobby, group: lobby.send_to_group(group, FRAME),
+                                     lobby, group, args.iterations)
+            print(f"{size:>8}  {group:<12}{members:>9}{scan:>10.1f}{grouped:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
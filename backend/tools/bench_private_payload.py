@@ -0,0 +1,118 @@
+"""Benchmark building the private player_role messages of one lobby_state broadcast.
+
+Compares the previous per-call construction (role_colors / status_colors
+dicts rebuilt, list-membership role tests, json.dumps of the whole
+message) with the current one (shared metadata tables and pre-encoded
+JSON fragments), and the same for counting alive team members.
+
+Usage (from the backend directory):
+    python tools/bench_private_payload.py [--players 1000] [--broadcasts 200]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from game_roles import Role, RoleAssigner  # noqa: E402
+from lobby_manager import Player, PlayerStatus  # noqa: E402
+
+
+def legacy_role_info(role: Role) -> dict:
+    """get_role_info as it was: list tests and a color dict per call."""
+    is_heartbroken = role in [Role.HEARTBROKEN_ALLY, Role.HEARTBROKEN_ENEMY]
+    if role in [Role.ALLY, Role.HEARTBROKEN_ALLY]:
+        base_role = Role.ALLY
+    elif role in [Role.ENEMY, Role.HEARTBROKEN_ENEMY]:
+        base_role = Role.ENEMY
+    else:
+        base_role = role
+    role_colors = {
+        Role.DOCTOR: "#4CAF50",
+        Role.ALLY: "#2196F3",
+        Role.ENEMY: "#F44336"
+    }
+    return {
+        "role": role.value,
+        "baseRole": base_role.value,
+        "isHeartbroken": is_heartbroken,
+        "color": role_colors.get(base_role, "#9E9E9E")
+    }
+
+
+def legacy_private_message(player: Player) -> str:
+    """get_private_dict + json.dumps as it was."""
+    base_dict = player.to_dict()
+    base_dict.update(legacy_role_info(player.role))
+    status_colors = {
+        PlayerStatus.SICK: "#6B8E23"
+    }
+    if player.status in status_colors:
+        base_dict["statusColor"] = status_colors[player.status]
+    return json.dumps({"type": "player_role", "player": base_dict})
+
+
+def legacy_count_alive(players) -> dict:
+    """count_alive_team_members as it was, including the per-call import."""
+    from lobby_manager import PlayerStatus as Status  # noqa: F811
+    ally_count = enemy_count = 0
+    for player in players:
+        if not hasattr(player, 'role') or not player.role:
+            continue
+        if not hasattr(player, 'status') or player.status not in [Status.ALIVE, Status.SICK]:
+            continue
+        base_role = legacy_role_info(player.role)["baseRole"]
+        if base_role == "ALLY":
+            ally_count += 1
+        elif base_role == "ENEMY":
+            enemy_count += 1
+    return {"ALLY": ally_count, "ENEMY": enemy_count}
+
+
+def make_players(num_players: int) -> list:
+    players = []
+    for i, role in enumerate(RoleAssigner.assign_roles(num_players)):
+        player = Player(f"player-{i}", f"Player {i}")
+        player.role = role
+        player.status = random.choice([PlayerStatus.ALIVE, PlayerStatus.SICK, PlayerStatus.DEAD])
+        players.append(player)
+    return players
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--broadcasts", type=int, default=200)
+    args = parser.parse_args()
+
+    players = make_players(args.players)
+    for player in players:
+        assert player.private_message() == legacy_private_message(player)
+
+    print(f"{args.players} players, {args.broadcasts} broadcasts")
+
+    legacy_ms = timed(lambda: [legacy_private_message(p) for p in players], args.broadcasts)
+    current_ms = timed(lambda: [p.private_message() for p in players], args.broadcasts)
+    print(f"\nprivate payloads per broadcast  legacy {legacy_ms:8.3f} ms   current {current_ms:8.3f} ms"
+          f"   ({legacy_ms / current_ms:.1f}x)")
+    print(f"  per player                    legacy {legacy_ms / args.players * 1000:8.2f} us   "
+          f"current {current_ms / args.players * 1000:8.2f} us")
+
+    legacy_ms = timed(lambda: legacy_count_alive(players), args.broadcasts)
+    current_ms = timed(lambda: RoleAssigner.count_alive_team_members(players), args.broadcasts)
+    print(f"count alive team members        legacy {legacy_ms:8.3f} ms   current {current_ms:8.3f} ms"
+          f"   ({legacy_ms / current_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark role assignment and sick-player sampling for very large rooms.
+
+Compares the previous list-based approach (Role lists, per-player log
+lines, alive list rebuilt every round) with the current array-backed one
+(byte role codes, one log line per operation, indexed alive set).
+
+Logging goes to a discarded stream at INFO level, so per-line logging
+cost is included just like on a real server.
+
+Usage (from the backend directory):
+    python tools/bench_roles.py [--players 10000] [--rounds 500]
+"""
+import argparse
+import io
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from game_roles import Role  # noqa: E402
+from lobby_manager import LobbyManager, PlayerStatus  # noqa: E402
+
+logger = logging.getLogger("bench_roles")
+
+
+def legacy_assign_roles(lobby: LobbyManager) -> None:
+    """Role assignment as it was: Role list + shuffle + one log line per player."""
+    num_players = len(lobby.players)
+    roles = [Role.DOCTOR]
+    has_heartbroken = random.random() < 0.7 and num_players >= 3
+    remaining = num_players - 1 - int(has_heartbroken)
+    num_enemies = max(1, round(remaining / 3))
+    roles.extend([Role.ALLY] * (remaining - num_enemies))
+    roles.extend([Role.ENEMY] * num_enemies)
+    if has_heartbroken:
+        roles.append(Role.HEARTBROKEN_ALLY if random.random() < 0.5 else Role.HEARTBROKEN_ENEMY)
+    random.shuffle(roles)
+    logger.info(f"Assigned roles: {[r.value for r in roles]}")
+
+    for i, player in enumerate(list(lobby.players.values())):
+        player.role = roles[i]
+        logger.info(f"Assigned role {roles[i].value} to player {player.name}")
+
+
+def legacy_sample_sick(lobby: LobbyManager, num_to_sicken: int) -> list:
+    """Sick sampling as it was: rebuild the alive list every round."""
+    alive_players = [
+        player for player in lobby.players.values()
+        if player.status == PlayerStatus.ALIVE and player.role != Role.DOCTOR
+    ]
+    return random.sample(alive_players, min(num_to_sicken, len(alive_players)))
+
+
+def make_lobby(num_players: int) -> LobbyManager:
+    lobby = LobbyManager()
+    for i in range(num_players):
+        lobby.add_player(f"player-{i}", f"Player {i}", None)
+        lobby.players[f"player-{i}"].status = PlayerStatus.READY
+    return lobby
+
+
+def timed(fn, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+    print(f"{args.players} players, {args.rounds} rounds")
+
+    # Role assignment
+    lobby = make_lobby(args.players)
+    legacy_ms = timed(lambda: legacy_assign_roles(lobby), repeat=5)
+    current_ms = timed(lambda: lobby.assign_roles(), repeat=5)
+    print(f"\nassign roles         legacy {legacy_ms:8.2f} ms   current {current_ms:8.2f} ms"
+          f"   ({legacy_ms / current_ms:.1f}x)")
+
+    # Sick sampling: sicken 2, kill 1 per round so the alive set keeps changing
+    lobby = make_lobby(args.players)
+    lobby.start_game()
+
+    def legacy_round():
+        sick = legacy_sample_sick(lobby, 2)
+        for player in sick:
+            player.status = PlayerStatus.SICK
+        # end_round only ever touched the players it had made sick
+        for player in sick:
+            player.status = PlayerStatus.ALIVE
+
+    def current_round():
+        lobby.start_new_round()
+        lobby.cured_player = lobby.sick_players[0]
+        lobby.end_round()
+
+    legacy_ms = timed(legacy_round, repeat=args.rounds)
+    current_ms = timed(current_round, repeat=args.rounds)
+    print(f"round (sample+apply) legacy {legacy_ms:8.3f} ms   current {current_ms:8.3f} ms"
+          f"   ({legacy_ms / current_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Compare runtime profiles: WebSocket accept rate and message round-trip latency.
+
+Starts the real app (main:app) under each profile from runtime.py in a
+subprocess on this machine, then:
+
+1. opens --clients WebSocket connections at once and reports accepts/s
+2. has every client send --pings ping messages back to back and reports
+   pong round-trip latency (p50 / p99 / max) and total messages/s
+
+Usage (from the backend directory):
+    python tools/bench_runtime.py [--profiles baseline,default,event] [--clients 200] [--pings 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import websockets
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from runtime import PROFILES  # noqa: E402
+
+SERVER_SCRIPT = """
+import sys, uvicorn
+from runtime import build_uvicorn_config
+config = build_uvicorn_config(sys.argv[1])
+config["workers"] = 1
+uvicorn.run("main:app", host="127.0.0.1", port=int(sys.argv[2]), log_level="warning", **config)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(profile: str, port: int, state_dir: str) -> subprocess.Popen:
+    # Keep the server away from the real history, handoff state, hibernated lobbies and summaries
+    env = dict(
+        os.environ,
+        GAME_HISTORY_DB=os.path.join(state_dir, "history.db"),
+        GAME_STATE_FILE=os.path.join(state_dir, "lobby_state.json"),
+        GAME_HIBERNATE_DIR=os.path.join(state_dir, "hibernated"),
+        GAME_SUMMARY_DIR=os.path.join(state_dir, "summaries"),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, profile, str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Server for profile '{profile}' did not start")
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def ping_loop(ws, pings: int, latencies: list):
+    for _ in range(pings):
+        start = time.perf_counter()
+        await ws.send(json.dumps({"type": "ping"}))
+        while json.loads(await ws.recv()).get("type") != "pong":
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_client_load(port: int, clients: int, pings: int) -> dict:
+    url = f"ws://127.0.0.1:{port}/ws"
+
+    start = time.perf_counter()
+    connections = await asyncio.gather(*(websockets.connect(url, open_timeout=30) for _ in range(clients)))
+    accept_seconds = time.perf_counter() - start
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(ping_loop(ws, pings, latencies) for ws in connections))
+    ping_seconds = time.perf_counter() - start
+
+    await asyncio.gather(*(ws.close() for ws in connections))
+
+    return {
+        "accepts_per_s": clients / accept_seconds,
+        "rtt_p50_ms": statistics.median(latencies),
+        "rtt_p99_ms": percentile(latencies, 0.99),
+        "rtt_max_ms": max(latencies),
+        "msgs_per_s": len(latencies) / ping_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help="comma-separated profiles to compare")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent WebSocket clients")
+    parser.add_argument("--pings", type=int, default=20, help="pings per client")
+    args = parser.parse_args()
+
+    results = {}
+    for profile in args.profiles.split(","):
+        port = free_port()
+        with tempfile.TemporaryDirectory(prefix="bench_runtime_") as state_dir:
+            server = start_server(profile, port, state_dir)
+            try:
+                results[profile] = asyncio.run(run_client_load(port, args.clients, args.pings))
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f"\n{args.clients} clients x {args.pings} pings")
+    print(f"{'profile':<12}{'accepts/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'msgs/s':>10}")
+    for profile, r in results.items():
+        print(f"{profile:<12}{r['accepts_per_s']:>12.0f}{r['rtt_p50_ms']:>10.2f}"
+              f"{r['rtt_p99_ms']:>10.2f}{r['rtt_max_ms']:>10.2f}{r['msgs_per_s']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
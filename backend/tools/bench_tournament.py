@@ -0,0 +1,122 @@
+"""Benchmark a tournament with many participants in one process.
+
+Registers --players participants through the real handle_message, then
+plays --stages stages: the tournament seats everyone into balanced tables
+and starts every game; each table's doctor then plays rounds (start,
+cure the first sick player, end) until the game is over, all tables at
+the same time. Per stage it reports the tables, how long seating and
+playing took, frames sent, and the worst event loop lag. It also times
+plan_tables alone for larger pools.
+
+Usage (from the backend directory):
+    python tools/bench_tournament.py [--players 1200] [--table-size 8] [--stages 3] [--rules quick]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import tournament as tournament_module  # noqa: E402
+from connection import Connection  # noqa: E402
+from executors import loop_monitor  # noqa: E402
+from game_rules import get_rules  # noqa: E402
+from message_handler import handle_message  # noqa: E402
+from tournament import Participant, plan_tables, tournament  # noqa: E402
+
+
+class CountingConnection(Connection):
+    """Connection that counts frames instead of sending them."""
+
+    transport = "bench"
+
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    async def send_text(self, text: str) -> None:
+        self.frames += 1
+
+
+async def play_table(table, connections: dict) -> None:
+    """Play one table's game to the end as its doctor would."""
+    doctor = connections[table.doctor_id]
+    while table.game_in_progress:
+        await handle_message(doctor, '{"type": "start_round"}')
+        if table.sick_players:
+            await handle_message(doctor, json.dumps({"type": "cure_player", "playerId": table.sick_players[0]}))
+        await handle_message(doctor, '{"type": "end_round"}')
+
+
+async def wait_for(condition, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise SystemExit("Timed out waiting for the tournament")
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=1200)
+    parser.add_argument("--table-size", type=int, default=8)
+    parser.add_argument("--stages", type=int, default=3)
+    parser.add_argument("--rules", default="quick")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    tournament_module.BREAK_SECONDS = 0
+
+    tournament.open(args.stages, args.table_size, get_rules(args.rules))
+    connections = {}
+    start = time.perf_counter()
+    for i in range(args.players):
+        connection = CountingConnection()
+        await handle_message(connection, json.dumps({"type": "join_tournament", "name": f"p{i}"}))
+        connections[next(reversed(tournament.participants))] = connection
+    print(f"registered {args.players} participants in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    loop_monitor.start()
+    print(f"{'stage':>5}{'tables':>8}{'sizes':>8}{'seat ms':>10}{'play ms':>10}{'frames':>10}{'max lag ms':>12}")
+    tournament.start()
+    for stage in range(1, args.stages + 1):
+        started = time.perf_counter()
+        await wait_for(lambda: tournament.stage == stage and tournament.playing)
+        # Every table is seated once the stage's start has left the actor
+        await tournament.actor.call(asyncio.sleep, 0)
+        seated = time.perf_counter()
+
+        for connection in connections.values():
+            connection.frames = 0
+        loop_monitor.reset()
+        tables = tournament.tables[:tournament.seated_tables]
+        await asyncio.gather(*(play_table(table, connections) for table in tables))
+        await wait_for(lambda: not tournament.playing)
+        played = time.perf_counter()
+
+        sizes = sorted(len(table.players) for table in tables)
+        print(f"{stage:>5}{len(tables):>8}{f'{sizes[0]}-{sizes[-1]}':>8}{(seated - started) * 1000:>10.0f}"
+              f"{(played - seated) * 1000:>10.0f}{sum(c.frames for c in connections.values()):>10}"
+              f"{loop_monitor.max_lag * 1000:>12.1f}")
+
+    await wait_for(lambda: tournament.state == tournament_module.FINISHED)
+    await loop_monitor.stop()
+    leader = tournament.describe_standings(0, 1)[0]
+    print(f"winner {leader['name']} with {leader['points']} points from {leader['games']} games")
+
+    print(f"\n{'pool':>8}{'plan_tables ms':>16}")
+    for size in (1000, 10000, 100000):
+        pool = [Participant(str(i), f"p{i}", None) for i in range(size)]
+        for participant in pool:
+            participant.points = random.randrange(30)
+        start = time.perf_counter()
+        plan_tables(pool, args.table_size, 2)
+        print(f"{size:>8}{(time.perf_counter() - start) * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
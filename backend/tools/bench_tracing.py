@@ -0,0 +1,84 @@
+"""Benchmark the cost of message tracing at different sample rates.
+
+Players in one lobby send bursts of ready/unready/ping/chat frames through
+the real handle_message and lobby actor (as bench_ingest.py does), with
+the tracer sampling none, some or all of them. Reports microseconds per
+inbound message and the spans recorded per trace; the difference between
+sample rate 0 and an untraced build is the cost of the disabled checks.
+
+Usage (from the backend directory):
+    python tools/bench_tracing.py [--players 100] [--bursts 20] [--rates 0,0.01,0.1,1]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from connection import Connection  # noqa: E402
+from lobby_manager import lobby_manager  # noqa: E402
+from message_handler import handle_message  # noqa: E402
+from tracing import tracer  # noqa: E402
+
+BURST = ('{"type": "ready"}', '{"type": "ping", "rtt": 20}', '{"type": "unready"}',
+         '{"type": "chat", "text": "hola"}')
+
+
+class CountingConnection(Connection):
+    """Connection that counts frames instead of sending them (still traced as sends)."""
+
+    transport = "bench"
+
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    def _enqueue(self, text: str) -> None:
+        self.frames += 1
+
+
+async def player_burst(connection: CountingConnection) -> None:
+    for frame in BURST:
+        await handle_message(connection, frame)
+
+
+async def run(connections: list, bursts: int, rate: float) -> float:
+    """Return microseconds per inbound message."""
+    tracer.configure(rate)
+    tracer.traces.clear()
+    start = time.perf_counter()
+    for _ in range(bursts):
+        await asyncio.gather(*(player_burst(connection) for connection in connections))
+    elapsed = time.perf_counter() - start
+    return elapsed / (bursts * len(connections) * len(BURST)) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--rates", default="0,0.01,0.1,1")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    lobby_manager.reset_game()
+    lobby_manager.chat.allow = lambda player_id: True  # No rate limit in the benchmark
+    connections = [CountingConnection() for _ in range(args.players)]
+    for i, connection in enumerate(connections):
+        await handle_message(connection, json.dumps({"type": "join", "name": f"p{i}"}))
+
+    await run(connections, 2, 0)  # Warm up
+    print(f"{'sample':>8}{'us/msg':>10}{'traces':>8}{'spans/trace':>13}")
+    for rate in (float(r) for r in args.rates.split(",")):
+        per_message = min([await run(connections, args.bursts, rate) for _ in range(3)])
+        traces = list(tracer.traces)
+        spans = sum(len(t["spans"]) for t in traces) / len(traces) if traces else 0
+        print(f"{rate:>8}{per_message:>10.1f}{len(traces):>8}{spans:>13.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,476 @@
+"""Capacity-planning report: how many lobbies one server process holds at a target p99.
+
+Runs main:app in-process (lifespan included) and drives it over the ASGI
+WebSocket interface, as soak.py does, sweeping players per lobby and
+lobbies per process. The lobbies are tournament tables: each cell opens a
+tournament with tables of P players, registers P * L bots and starts it,
+and every stage seats the next games right away (no break). During
+--seconds of steady load:
+
+- every player sends --rate messages/s (random arrivals), three pings for
+  each "all" chat message
+- every table's doctor plays a round each --round-interval seconds
+  (start_round, cure one sick player, end_round)
+
+Per cell it records CPU time per inbound message (time.process_time less
+the server's idle CPU, measured first; it includes the in-process
+clients, which only check frame prefixes), memory per player
+(tracemalloc while the bots join and are seated; the bot objects are
+built before tracing starts) and the broadcast latency: from a doctor's
+start_round / end_round to the last player of the table receiving
+round_started / round_ended.
+
+It then fits a capacity model, one process being one event loop on one core:
+
+    cpu_us(P)  = a + b*P             CPU per inbound message; broadcasts fan out to P players
+    mem(L, P)  = L * (c + d*P)       bytes per lobby and per player
+    p99(P, U)  = (e + f*P) / (1 - U) broadcast latency, stretched by CPU utilisation
+                                     U = idle + lobbies * messages/s per lobby * cpu_us(P)
+
+and reports, per lobby size, the most lobbies one process can hold while
+the predicted p99 stays under --target-p99-ms and U under --max-util.
+Sockets, TLS and frame encoding are not measured (nothing leaves the
+process), so the --max-util ceiling is the headroom for them. Run one
+process per core and multiply.
+
+Usage (from the backend directory):
+    python tools/capacity_report.py [--players 4,8,16,32] [--lobbies 1,4,16] [--seconds 10] [--rate 0.5]
+                                    [--round-interval 1] [--target-p99-ms 100] [--max-util 0.7]
+                                    [--sizes 4,8,16,32,64] [--json report.json]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the run away from real state and history files
+_tmp_dir = tempfile.mkdtemp(prefix="capacity_")
+os.environ.setdefault("GAME_HISTORY_DB", os.path.join(_tmp_dir, "history.db"))
+os.environ.setdefault("GAME_STATE_FILE", os.path.join(_tmp_dir, "lobby_state.json"))
+os.environ.setdefault("GAME_HIBERNATE_DIR", os.path.join(_tmp_dir, "hibernated"))
+os.environ.setdefault("GAME_SUMMARY_DIR", os.path.join(_tmp_dir, "summaries"))
+
+import main  # noqa: E402
+import message_handler  # noqa: E402
+import tournament as tournament_module  # noqa: E402
+from executors import loop_monitor  # noqa: E402
+from game_rules import get_rules  # noqa: E402
+from lobby_manager import player_lobbies  # noqa: E402
+from tournament import tournament  # noqa: E402
+
+STAGES = 1_000_000  # never reached; a cell ends the tournament itself
+SETTLE_SECONDS = 0.5  # longer than the server's coalescing windows
+IDLE_SECONDS = 2.0  # measuring the server's CPU with no load
+CHAT_SHARE = 0.25  # of player messages; the rest are pings
+PING = json.dumps({"type": "ping"})
+CHAT = json.dumps({"type": "chat", "text": "hola"})
+# Outbound frames start with their type; bots look at nothing else
+TIMED_BROADCASTS = {'{"type": "round_started"': "start_round", '{"type": "round_ended"': "end_round"}
+JOINED = '{"type": "tournament_joined"'
+
+
+class Bot:
+    """A tournament participant speaking to the app over ASGI, reading only frame prefixes."""
+
+    def __init__(self, run: "Cell"):
+        self.run = run
+        self.to_app: asyncio.Queue = asyncio.Queue()
+        self.player_id = None
+        self.closed = False
+        self._task = None
+        self._accepted = asyncio.Event()
+        self._joined = asyncio.Event()
+
+    async def connect(self, app) -> None:
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws",
+            "path": "/ws", "raw_path": b"/ws", "root_path": "", "query_string": b"",
+            "headers": [], "client": ("127.0.0.1", 1), "server": ("capacity", 80), "subprotocols": [],
+        }
+        self.to_app.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(app(scope, self.to_app.get, self._from_app))
+        await asyncio.wait_for(self._accepted.wait(), 5)
+
+    async def join(self, name: str) -> None:
+        self.send(json.dumps({"type": "join_tournament", "name": name}))
+        await asyncio.wait_for(self._joined.wait(), 10)
+
+    async def _from_app(self, message: dict) -> None:
+        if message["type"] == "websocket.send":
+            text = message["text"]
+            self.run.frames += 1
+            prefix = text[:text.find('"', 10) + 1]
+            if prefix in TIMED_BROADCASTS:
+                self.run.received(self, TIMED_BROADCASTS[prefix])
+            elif prefix == JOINED:
+                self.player_id = json.loads(text)["playerId"]
+                self._joined.set()
+        elif message["type"] == "websocket.accept":
+            self._accepted.set()
+        elif message["type"] == "websocket.close":
+            self.closed = True
+
+    def send(self, text: str) -> None:
+        self.run.inbound += 1
+        self.to_app.put_nowait({"type": "websocket.receive", "text": text})
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self.to_app.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self.closed = True
+        self._task = None
+
+
+class Cell:
+    """One point of the sweep: `lobbies` tables of `players` bots under steady load."""
+
+    def __init__(self, players: int, lobbies: int, args, rng: random.Random, idle: float = 0.0):
+        self.players = players
+        self.lobbies = lobbies
+        self.args = args
+        self.random = rng
+        self.idle = idle  # CPU share of the server with no load, taken off the cell's CPU
+        self.inbound = 0
+        self.frames = 0
+        self.latencies: list = []  # seconds from the doctor's message to the table's last receiver
+        self._open = {}  # (table, doctor message) -> [sent at, last received at, receivers]
+
+    def timed_send(self, bot: Bot, table, message_type: str, text: str) -> None:
+        """Send a doctor message whose broadcast is timed."""
+        self._close_sample((table, message_type))
+        self._open[(table, message_type)] = [time.perf_counter(), 0.0, 0]
+        bot.send(text)
+
+    def received(self, bot: Bot, message_type: str) -> None:
+        sample = self._open.get((player_lobbies.get(bot.player_id), message_type))
+        if sample is not None:
+            sample[1] = time.perf_counter()
+            sample[2] += 1
+
+    def _close_sample(self, key) -> None:
+        sample = self._open.pop(key, None)
+        if sample is not None and sample[2]:
+            self.latencies.append(sample[1] - sample[0])
+
+    async def chatter(self, bot: Bot) -> None:
+        while True:
+            await asyncio.sleep(self.random.expovariate(self.args.rate))
+            bot.send(CHAT if self.random.random() < CHAT_SHARE else PING)
+
+    async def play_rounds(self, table, bots: dict) -> None:
+        """Act as each game's doctor at this table, one round per round interval."""
+        interval = self.args.round_interval
+        await asyncio.sleep(self.random.uniform(0, interval))  # Tables do not move in step
+        while True:
+            doctor = bots.get(table.doctor_id)
+            if doctor is not None and table.game_in_progress:
+                self.timed_send(doctor, table, "start_round", '{"type": "start_round"}')
+                await asyncio.sleep(interval / 2)
+                if table.sick_players:
+                    doctor.send(json.dumps({"type": "cure_player", "playerId": table.sick_players[0]}))
+                self.timed_send(doctor, table, "end_round", '{"type": "end_round"}')
+                await asyncio.sleep(interval / 2)
+            else:
+                await asyncio.sleep(interval / 10)  # Between games, while the stage is reseated
+
+    async def measure(self, app) -> dict:
+        total = self.players * self.lobbies
+        bots = [Bot(self) for _ in range(total)]
+        gc.collect()
+
+        # Memory: everything the server keeps for these players and tables
+        tracemalloc.start()
+        tournament.open(STAGES, self.players, get_rules(self.args.rules))
+        for i, bot in enumerate(bots):
+            await bot.connect(app)
+            await bot.join(f"b{i}")
+        tournament.start()
+        await wait_for(lambda: tournament.stage >= 1 and tournament.seated_tables == self.lobbies)
+        await tournament.actor.call(asyncio.sleep, 0)  # Seating has left the tournament actor
+        await asyncio.sleep(SETTLE_SECONDS)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        by_id = {bot.player_id: bot for bot in bots}
+        tables = tournament.tables[:self.lobbies]
+        self.inbound = self.frames = 0
+        loop_monitor.reset()
+        cpu_start, started = time.process_time(), time.perf_counter()
+        tasks = [asyncio.create_task(self.chatter(bot)) for bot in bots]
+        tasks += [asyncio.create_task(self.play_rounds(table, by_id)) for table in tables]
+        await asyncio.sleep(self.args.seconds)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        window = time.perf_counter() - started
+        await asyncio.sleep(SETTLE_SECONDS)  # Let the backlog drain; its CPU counts too
+        cpu = max(time.process_time() - cpu_start - self.idle * (time.perf_counter() - started), 0.0)
+        for key in list(self._open):
+            self._close_sample(key)
+        max_lag = loop_monitor.max_lag
+
+        await self.teardown(bots)
+        latencies_ms = sorted(latency * 1000 for latency in self.latencies)
+        return {
+            "players": self.players,
+            "lobbies": self.lobbies,
+            "total": total,
+            "seconds": round(window, 2),
+            "inbound": self.inbound,
+            "inboundPerSecond": round(self.inbound / window, 1),
+            "framesOut": self.frames,
+            "cpuSeconds": round(cpu, 3),  # Above idle
+            "utilisation": round(cpu / window, 3),
+            "cpuUsPerMessage": round(cpu / max(self.inbound, 1) * 1e6, 1),
+            "memoryBytes": memory,
+            "memoryPerPlayer": round(memory / total),
+            "broadcasts": len(latencies_ms),
+            "p50Ms": round(percentile(latencies_ms, 50), 2),
+            "p99Ms": round(percentile(latencies_ms, 99), 2),
+            "maxLagMs": round(max_lag * 1000, 1),
+        }
+
+    async def teardown(self, bots: list) -> None:
+        """End the tournament, disconnect everyone and drop the tables, so cells do not share state."""
+        await tournament.actor.call(tournament.finish)
+        for bot in bots:
+            await bot.close()
+        await wait_for(lambda: not message_handler.disconnected_players)
+
+        async def reset(table):
+            table.reset_game()
+
+        await asyncio.gather(*(table.actor.call(reset, table) for table in tournament.tables))
+        # Fresh tables next cell, so every cell pays for its own lobbies
+        tournament.tables = []
+        tournament.table_numbers = {}
+        tournament.seated_tables = 0
+        gc.collect()
+
+
+async def wait_for(condition, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise SystemExit("Timed out waiting for the server")
+        await asyncio.sleep(0.01)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile (0.0 for no values)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+def fit_line(xs: list, ys: list) -> tuple:
+    """Least-squares (intercept, slope, r squared); a flat line through the mean for a single x."""
+    if len(set(xs)) < 2:
+        return statistics.fmean(ys), 0.0, 0.0
+    slope, intercept = statistics.linear_regression(xs, ys)
+    r2 = statistics.correlation(xs, ys) ** 2 if len(set(ys)) > 1 else 1.0
+    return intercept, slope, r2
+
+
+def fit_cpu(cells: list) -> tuple:
+    """Fit cpu_us(P) = a + b*P to each cell's total CPU, so busy cells count for more.
+
+    Least squares of cpuSeconds ~ inbound * (a + b*P) (two regressors, no
+    constant), returning (a, b, r squared) with a and b in microseconds.
+    """
+    x1 = [c["inbound"] for c in cells]
+    x2 = [c["inbound"] * c["players"] for c in cells]
+    y = [c["cpuSeconds"] * 1e6 for c in cells]
+    s11, s12, s22 = (sum(u * v for u, v in zip(p, q)) for p, q in ((x1, x1), (x1, x2), (x2, x2)))
+    s1y, s2y = sum(u * v for u, v in zip(x1, y)), sum(u * v for u, v in zip(x2, y))
+    det = s11 * s22 - s12 * s12
+    if len({c["players"] for c in cells}) < 2 or det == 0:
+        return s1y / s11, 0.0, 0.0
+    a, b = (s1y * s22 - s2y * s12) / det, (s2y * s11 - s1y * s12) / det
+    mean = statistics.fmean(y)
+    residual = sum((yi - a * u - b * v) ** 2 for yi, u, v in zip(y, x1, x2))
+    total = sum((yi - mean) ** 2 for yi in y)
+    return a, b, 1 - residual / total if total else 1.0
+
+
+class CapacityModel:
+    """The fitted model; see the module docstring for its form."""
+
+    def __init__(self, cells: list, idle: float, args):
+        self.args = args
+        self.idle = idle
+        self.cpu = fit_cpu(cells)
+        # A line fitted to noisy cells must not extrapolate to free messages
+        self.cpu_floor = min(c["cpuUsPerMessage"] for c in cells if c["cpuUsPerMessage"] > 0)
+        self.memory = fit_line([c["players"] for c in cells], [c["memoryBytes"] / c["lobbies"] for c in cells])
+        timed = [c for c in cells if c["broadcasts"]]
+        self.latency = fit_line([c["players"] for c in timed],
+                                [c["p99Ms"] * (1 - min(idle + c["utilisation"], 0.95)) for c in timed])
+
+    def cpu_us(self, players: int) -> float:
+        return max(self.cpu[0] + self.cpu[1] * players, self.cpu_floor)
+
+    def lobby_bytes(self, players: int) -> float:
+        return max(self.memory[0] + self.memory[1] * players, 0.0)
+
+    def base_p99_ms(self, players: int) -> float:
+        return max(self.latency[0] + self.latency[1] * players, 0.0)
+
+    def messages_per_lobby(self, players: int) -> float:
+        """Inbound messages/s of one lobby: its players plus its doctor's three per round."""
+        return players * self.args.rate + 3 / self.args.round_interval
+
+    def utilisation(self, players: int, lobbies: int) -> float:
+        return self.idle + lobbies * self.messages_per_lobby(players) * self.cpu_us(players) / 1e6
+
+    def p99_ms(self, players: int, lobbies: int) -> float:
+        busy = self.utilisation(players, lobbies)
+        return math.inf if busy >= 1 else self.base_p99_ms(players) / (1 - busy)
+
+    def max_lobbies(self, players: int) -> int:
+        """Most lobbies of this size with predicted p99 under target and CPU under the ceiling."""
+        base = self.base_p99_ms(players)
+        if base >= self.args.target_p99_ms:
+            return 0
+        ceiling = min(self.args.max_util, 1 - base / self.args.target_p99_ms) - self.idle
+        per_lobby = self.messages_per_lobby(players) * self.cpu_us(players) / 1e6
+        return max(math.floor(ceiling / per_lobby), 0)
+
+    def describe(self) -> dict:
+        return {
+            "idleUtilisation": self.idle,
+            "cpuUsPerMessage": {"intercept": self.cpu[0], "perPlayer": self.cpu[1], "r2": self.cpu[2],
+                                "floor": self.cpu_floor},
+            "bytesPerLobby": {"intercept": self.memory[0], "perPlayer": self.memory[1], "r2": self.memory[2]},
+            "baseP99Ms": {"intercept": self.latency[0], "perPlayer": self.latency[1], "r2": self.latency[2]},
+        }
+
+
+def print_report(cells: list, model: CapacityModel, sizes: list, args) -> list:
+    print(f"\nMeasured ({args.seconds:g} s per cell, {args.rate:g} msg/s per player, "
+          f"a round every {args.round_interval:g} s per lobby, rules '{args.rules}')")
+    print(f"{'players':>8}{'lobbies':>8}{'msg/s':>8}{'frames/s':>10}{'cpu %':>7}{'us/msg':>8}"
+          f"{'KB/player':>10}{'bcasts':>8}{'p50 ms':>8}{'p99 ms':>8}{'model':>8}{'lag ms':>8}")
+    for c in cells:
+        print(f"{c['players']:>8}{c['lobbies']:>8}{c['inboundPerSecond']:>8.0f}{c['framesOut'] / c['seconds']:>10.0f}"
+              f"{c['utilisation'] * 100:>7.1f}{c['cpuUsPerMessage']:>8.0f}{c['memoryPerPlayer'] / 1024:>10.1f}"
+              f"{c['broadcasts']:>8}{c['p50Ms']:>8.1f}{c['p99Ms']:>8.1f}"
+              f"{model.p99_ms(c['players'], c['lobbies']):>8.1f}{c['maxLagMs']:>8.1f}")
+
+    cpu, memory, latency = model.cpu, model.memory, model.latency
+    print(f"\nModel (one process, one core; {model.idle:.1%} CPU when idle)")
+    print(f"  CPU per inbound message  {cpu[0]:8.1f} us + {cpu[1]:7.2f} us per player in the lobby    (r2 {cpu[2]:.2f}"
+          " of CPU seconds)")
+    print(f"  memory per lobby         {memory[0] / 1024:8.1f} KB + {memory[1] / 1024:7.2f} KB per player"
+          f"             (r2 {memory[2]:.2f})")
+    print(f"  unloaded broadcast p99   {latency[0]:8.2f} ms + {latency[1]:7.3f} ms per player, / (1 - CPU share)"
+          f" (r2 {latency[2]:.2f})")
+
+    measured = {c["players"] for c in cells}
+    low, high = min(measured), max(measured)
+    print(f"\nCapacity per process for p99 <= {args.target_p99_ms:g} ms and CPU <= {args.max_util:.0%}")
+    print(f"{'players':>8}{'lobbies':>9}{'total':>8}{'msg/s':>8}{'cpu %':>7}{'p99 ms':>8}{'memory MB':>11}")
+    capacity = []
+    for size in sizes:
+        lobbies = model.max_lobbies(size)
+        row = {
+            "players": size,
+            "lobbies": lobbies,
+            "total": lobbies * size,
+            "messagesPerSecond": round(lobbies * model.messages_per_lobby(size), 1),
+            "utilisation": round(model.utilisation(size, lobbies), 3),
+            "p99Ms": round(model.p99_ms(size, lobbies), 2),
+            "memoryBytes": round(lobbies * model.lobby_bytes(size)),
+            "extrapolated": not low <= size <= high,
+        }
+        capacity.append(row)
+        print(f"{size:>8}{lobbies:>9}{row['total']:>8}{row['messagesPerSecond']:>8.0f}{row['utilisation'] * 100:>7.1f}"
+              f"{row['p99Ms']:>8.1f}{row['memoryBytes'] / 1e6:>11.1f}"
+              + ("  (extrapolated)" if row["extrapolated"] else ""))
+    print("Not included: socket writes, TLS and frame encoding (keep CPU headroom for them).")
+    return capacity
+
+
+def parse_ints(value: str) -> list:
+    return [int(part) for part in value.split(",") if part]
+
+
+async def idle_share(seconds: float) -> float:
+    """CPU share of the running server with nothing to do (timers, the loop lag monitor)."""
+    cpu_start, started = time.process_time(), time.perf_counter()
+    await asyncio.sleep(seconds)
+    return (time.process_time() - cpu_start) / (time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    cells = []
+    async with main.app.router.lifespan_context(main.app):
+        # A short unrecorded cell first, so imports and first-use caches are not measured
+        warm_up = argparse.Namespace(**{**vars(args), "seconds": 1.0})
+        await Cell(min(args.players), 1, warm_up, rng).measure(main.app)
+        idle = await idle_share(IDLE_SECONDS)
+        print(f"idle CPU {idle:.1%}\n{'players':>8}{'lobbies':>8}  (measuring)")
+        for players in args.players:
+            for lobbies in args.lobbies:
+                print(f"{players:>8}{lobbies:>8}", flush=True)
+                cells.append(await Cell(players, lobbies, args, rng, idle).measure(main.app))
+
+    model = CapacityModel(cells, idle, args)
+    capacity = print_report(cells, model, args.sizes, args)
+    return {
+        "workload": {"seconds": args.seconds, "rate": args.rate, "roundInterval": args.round_interval,
+                     "chatShare": CHAT_SHARE, "rules": args.rules},
+        "targetP99Ms": args.target_p99_ms,
+        "maxUtilisation": args.max_util,
+        "cells": cells,
+        "model": model.describe(),
+        "capacity": capacity,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=parse_ints, default=[4, 8, 16, 32], help="players per lobby to measure")
+    parser.add_argument("--lobbies", type=parse_ints, default=[1, 4, 16], help="lobbies per process to measure")
+    parser.add_argument("--seconds", type=float, default=10.0, help="steady load per cell")
+    parser.add_argument("--rate", type=float, default=0.5, help="messages/s each player sends")
+    parser.add_argument("--round-interval", type=float, default=1.0, help="seconds between rounds per lobby")
+    parser.add_argument("--rules", default="default")
+    parser.add_argument("--target-p99-ms", type=float, default=100.0)
+    parser.add_argument("--max-util", type=float, default=0.7, help="CPU share the model may plan for")
+    parser.add_argument("--sizes", type=parse_ints, default=[4, 8, 16, 32, 64], help="lobby sizes to report")
+    parser.add_argument("--json", help="also write the cells, model and capacity table here")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    message_handler.RECONNECT_TIMEOUT = 0.01  # Departed bots are removed right after each cell
+    tournament_module.BREAK_SECONDS = 0
+
+    report = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,113 @@
+"""Measure wire bytes per message type and per game at different lobby sizes.
+
+Plays complete games through the real message handlers with in-memory
+connections and reports, for each codec, the raw bytes sent and the bytes
+after permessage-deflate (one compressor per connection, with context
+takeover, like the websockets library negotiates by default).
+
+Usage (from the backend directory):
+    python tools/measure_payload.py [--sizes 5,10,20,50,100] [--games 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from connection import Connection  # noqa: E402
+from lobby_manager import lobby_manager  # noqa: E402
+from message_handler import handle_message  # noqa: E402
+from wire import JSON_CODEC, COMPACT_CODEC  # noqa: E402
+
+
+class MeasuringConnection(Connection):
+    """Connection that records sizes instead of sending."""
+
+    transport = "measure"
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+        self.inbox = []
+        self._deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+    async def send_text(self, text: str) -> None:
+        raw = text.encode("utf-8")
+        # permessage-deflate drops the trailing 00 00 ff ff of each sync flush
+        deflated = self._deflate.compress(raw) + self._deflate.flush(zlib.Z_SYNC_FLUSH)
+        message_type = _message_type(text)
+        self.stats[message_type][0] += 1
+        self.stats[message_type][1] += len(raw)
+        self.stats[message_type][2] += len(deflated) - 4
+        self.inbox.append(text)
+
+
+def _message_type(text: str) -> str:
+    data = json.loads(text)
+    return data.get("type") or data.get("t")
+
+
+async def play_game(num_players: int, codec: str, stats) -> None:
+    """Run one game from join to game_over through handle_message."""
+    lobby_manager.reset_game()
+    compact = codec == COMPACT_CODEC
+
+    connections = []
+    for i in range(num_players):
+        connection = MeasuringConnection(stats)
+        connection.player_id = await handle_message(
+            connection, json.dumps({"type": "join", "name": f"Player {i}", "compact": compact}))
+        connections.append(connection)
+
+    for connection in connections:
+        await handle_message(connection, json.dumps({"type": "ready"}), connection.player_id)
+    await handle_message(connections[0], json.dumps({"type": "start_game"}), connections[0].player_id)
+
+    doctor = next(c for c in connections
+                  if lobby_manager.players[c.player_id].role.value == "DOCTOR")
+
+    while lobby_manager.game_in_progress:
+        await handle_message(doctor, json.dumps({"type": "start_round"}), doctor.player_id)
+        if random.random() < 0.5 and lobby_manager.sick_players:
+            target = lobby_manager.sick_players[0]
+            player_ref = lobby_manager.player_handles[target] if compact else target
+            await handle_message(doctor, json.dumps({"type": "cure_player", "playerId": player_ref}),
+                                 doctor.player_id)
+        await handle_message(doctor, json.dumps({"type": "end_round"}), doctor.player_id)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="5,10,20,50,100",
+                        help="comma-separated lobby sizes")
+    parser.add_argument("--games", type=int, default=3,
+                        help="games to average per size and codec")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        print(f"\n=== {size} players ({args.games} games) ===")
+        for codec in (JSON_CODEC, COMPACT_CODEC):
+            stats = defaultdict(lambda: [0, 0, 0])  # count, raw bytes, deflated bytes
+            for _ in range(args.games):
+                await play_game(size, codec, stats)
+
+            print(f"\n  codec={codec}")
+            print(f"  {'type':<18}{'msgs':>8}{'raw B/msg':>12}{'deflate B/msg':>15}")
+            for message_type, (count, raw, deflated) in sorted(stats.items()):
+                print(f"  {message_type:<18}{count:>8}{raw / count:>12.0f}{deflated / count:>15.0f}")
+
+            total_raw = sum(s[1] for s in stats.values()) / args.games
+            total_deflated = sum(s[2] for s in stats.values()) / args.games
+            print(f"  bytes per game: raw {total_raw:,.0f}, deflated {total_deflated:,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,380 @@
+"""Soak test: play thousands of back-to-back games through the real app.
+
+Runs main:app in-process (lifespan included) and drives it over the ASGI
+WebSocket interface with bot clients, so every frame goes through the
+same route, endpoint, connection registry, actor and handlers as in
+production. While games run, bots inject chaos:
+
+- drop their connection mid-game and resume with their token (or never
+  come back, so the reconnect timeout removes them)
+- send the same message twice
+- send malformed JSON, non-object JSON and unknown message types
+
+Every --sample-every games it records RSS, asyncio task count, gc object
+count and the size of the server's long-lived containers. When a game
+ends everyone leaves, so the idle lobby is hibernated (kept under a small
+memory budget, the rest spilled to a temporary directory). After the
+warm-up quarter, anything that keeps growing fails the run (exit code 1).
+So does any event loop stall longer than --max-lag-ms (measured by
+executors.loop_monitor; --chaos 0 plays plain, normal games).
+
+Usage (from the backend directory):
+    python tools/soak.py [--games 2000] [--players 4-12] [--chaos 0.1] [--seed 1] [--max-lag-ms 100]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the soak away from real state and history files
+_tmp_dir = tempfile.mkdtemp(prefix="soak_")
+os.environ.setdefault("GAME_HISTORY_DB", os.path.join(_tmp_dir, "history.db"))
+os.environ.setdefault("GAME_STATE_FILE", os.path.join(_tmp_dir, "lobby_state.json"))
+os.environ.setdefault("GAME_HIBERNATE_DIR", os.path.join(_tmp_dir, "hibernated"))
+os.environ.setdefault("GAME_HIBERNATE_BUDGET", str(64 * 1024))
+os.environ.setdefault("GAME_SUMMARY_DIR", os.path.join(_tmp_dir, "summaries"))
+
+import main  # noqa: E402
+import message_handler  # noqa: E402
+from connection_registry import connection_registry  # noqa: E402
+from executors import loop_monitor  # noqa: E402
+from lobby_hibernation import lobby_store  # noqa: E402
+from lobby_manager import lobby_manager  # noqa: E402
+from scheduler import scheduler  # noqa: E402
+from sse_transport import sse_sessions  # noqa: E402
+
+SETTLE_SECONDS = 0.6  # longer than the longest server-side coalescing window
+
+MALFORMED = [
+    "{not json",
+    "[]",
+    "42",
+    '{"type": 5}',
+    '{"type": "no_such_message"}',
+    '{"type": "cure_player", "playerId": ["x"]}',
+    '{"type": "chat", "text": {"a": 1}}',
+    '{"type": "join", "name": null}',
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        # Peak RSS (KB on Linux) where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+class Bot:
+    """A client speaking the game protocol to the app over ASGI."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.to_app: asyncio.Queue = asyncio.Queue()
+        self.messages = {}  # type -> list of messages received
+        self.changed = asyncio.Event()
+        self.closed = False
+        self.player_id = None
+        self.token = None
+        self.last_seq = None
+        self._task = None
+        self._accepted = asyncio.Event()
+
+    async def connect(self, app) -> None:
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws",
+            "path": "/ws", "raw_path": b"/ws", "root_path": "", "query_string": b"",
+            "headers": [], "client": ("127.0.0.1", 1), "server": ("soak", 80), "subprotocols": [],
+        }
+        self.to_app.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(app(scope, self.to_app.get, self._from_app))
+        await asyncio.wait_for(self._accepted.wait(), 5)
+
+    async def _from_app(self, message: dict) -> None:
+        if message["type"] == "websocket.accept":
+            self._accepted.set()
+        elif message["type"] == "websocket.close":
+            self.closed = True
+        elif message["type"] == "websocket.send":
+            data = json.loads(message["text"])
+            self.messages.setdefault(data.get("type"), []).append(data)
+            if "seq" in data:
+                self.last_seq = data["seq"]
+            if data.get("type") in ("joined", "reconnected"):
+                self.player_id = data.get("playerId", self.player_id)
+                self.token = data["resumeToken"]
+        self.changed.set()
+
+    def send(self, message) -> None:
+        text = message if isinstance(message, str) else json.dumps(message)
+        self.to_app.put_nowait({"type": "websocket.receive", "text": text})
+
+    def count(self, message_type: str) -> int:
+        return len(self.messages.get(message_type, ()))
+
+    async def wait_for(self, message_types, after: dict, timeout: float = 5.0):
+        """Wait for a message of one of message_types beyond the counts in `after`."""
+        deadline = time.monotonic() + timeout
+        while True:
+            for message_type in message_types:
+                received = self.messages.get(message_type, [])
+                if len(received) > after.get(message_type, 0):
+                    return received[-1]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.closed:
+                return None
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def marks(self, *message_types) -> dict:
+        return {message_type: self.count(message_type) for message_type in message_types}
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self.to_app.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self.closed = True
+        self._task = None
+
+
+class Soak:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.stats = {"games": 0, "rounds": 0, "drops": 0, "resumes": 0, "abandons": 0,
+                      "duplicates": 0, "malformed": 0, "stalls": 0}
+        self.samples = []
+
+    def chaos(self) -> bool:
+        return self.random.random() < self.args.chaos
+
+    def maybe_inject(self, bot: Bot, message: dict) -> None:
+        """Send a message, sometimes twice, sometimes followed by garbage."""
+        bot.send(message)
+        if self.chaos():
+            bot.send(message)
+            self.stats["duplicates"] += 1
+        if self.chaos():
+            bot.send(self.random.choice(MALFORMED))
+            self.stats["malformed"] += 1
+
+    async def join(self, name: str) -> Bot:
+        bot = Bot(name)
+        await bot.connect(main.app)
+        mark = bot.marks("joined", "error")
+        bot.send({"type": "join", "name": name})
+        await bot.wait_for(["joined", "error"], mark)
+        return bot
+
+    async def drop_and_resume(self, bots: list, doctor: Bot) -> None:
+        """Disconnect a random non-doctor; usually come back with the resume token."""
+        candidates = [bot for bot in bots if bot is not doctor and not bot.closed]
+        if not candidates:
+            return
+        bot = self.random.choice(candidates)
+        await bot.close()
+        bots.remove(bot)
+        self.stats["drops"] += 1
+
+        if self.random.random() < 0.2:
+            self.stats["abandons"] += 1  # Never comes back; the timeout removes them
+            return
+
+        new_bot = Bot(bot.name)
+        await new_bot.connect(main.app)
+        mark = new_bot.marks("reconnected", "game_id_mismatch", "joined")
+        new_bot.send({"type": "reconnect", "token": bot.token, "lastSeq": bot.last_seq})
+        if await new_bot.wait_for(["reconnected", "game_id_mismatch", "joined"], mark):
+            self.stats["resumes"] += 1
+        bots.append(new_bot)
+
+    async def play_game(self, game_number: int) -> None:
+        low, high = self.args.players
+        bots = [await self.join(f"g{game_number}p{i}") for i in range(self.random.randint(low, high))]
+        bots = [bot for bot in bots if bot.player_id]
+
+        for bot in bots:
+            self.maybe_inject(bot, {"type": "ready"})
+        marks = [bot.marks("player_role") for bot in bots]
+        bots[0].send({"type": "start_game"})
+        roles = [await bot.wait_for(["player_role"], mark) for bot, mark in zip(bots, marks)]
+        doctors = [bot for bot, role in zip(bots, roles) if role and role["player"]["role"] == "DOCTOR"]
+        if not doctors:
+            self.stats["stalls"] += 1
+            await self.finish(bots)
+            return
+        doctor = doctors[0]
+
+        for _ in range(self.args.max_rounds):
+            if self.chaos():
+                await self.drop_and_resume(bots, doctor)
+
+            mark = doctor.marks("sick_players", "error", "game_over")
+            self.maybe_inject(doctor, {"type": "start_round"})
+            reply = await doctor.wait_for(["sick_players", "game_over", "error"], mark)
+            if reply is None or reply["type"] != "sick_players":
+                break
+            self.stats["rounds"] += 1
+
+            sick = reply["players"]
+            cure = self.random.choice(sick + [None]) if sick else None
+            self.maybe_inject(doctor, {"type": "cure_player", "playerId": cure and cure["id"]})
+
+            # Somebody chats now and then
+            if self.chaos():
+                self.maybe_inject(self.random.choice(bots), {"type": "chat", "text": "hola"})
+
+            mark = doctor.marks("round_ended", "game_over")
+            self.maybe_inject(doctor, {"type": "end_round"})
+            ended = await doctor.wait_for(["round_ended", "game_over"], mark)
+            if ended is None:
+                self.stats["stalls"] += 1
+                break
+            if ended["type"] == "game_over":
+                break
+
+        if lobby_manager.game_in_progress:
+            mark = doctor.marks("game_over")
+            doctor.send({"type": "end_game"})
+            await doctor.wait_for(["game_over"], mark)
+
+        await self.finish(bots)
+
+    async def finish(self, bots: list) -> None:
+        """Everyone leaves; wait until hibernation empties the idle lobby."""
+        for bot in bots:
+            await bot.close()
+        deadline = time.monotonic() + 10
+        while (lobby_manager.players or message_handler.disconnected_players) and time.monotonic() < deadline:
+            await asyncio.sleep(self.args.hibernate_after / 2)
+        self.stats["games"] += 1
+
+    async def sample(self, game_number: int) -> None:
+        # Let coalescing windows (spectator flush, chat flush, broadcasts) finish first
+        await asyncio.sleep(SETTLE_SECONDS)
+        # The forced collection below is the sampler's own stall, not the server's
+        lag_ms = loop_monitor.max_lag * 1000
+        gc.collect()
+        loop_monitor.reset()
+        self.samples.append({
+            "game": game_number,
+            "rss_mb": rss_mb(),
+            "tasks": len(asyncio.all_tasks()),
+            "objects": len(gc.get_objects()),
+            "players": len(lobby_manager.players),
+            "disconnected": len(message_handler.disconnected_players),
+            "connections": len(connection_registry),
+            "lobby_conns": sum(len(c) for c in connection_registry.by_lobby.values()),
+            "timers": len(scheduler),
+            "spectators": len(lobby_manager.spectators),
+            "sse": len(sse_sessions),
+            "chat_buckets": len(lobby_manager.chat._buckets),
+            "hibernated_kb": lobby_store.describe()["memoryBytes"] // 1024,
+            "round": lobby_manager.current_round,
+            "round_log": len(lobby_manager.round_log),
+            "lag_ms": round(lag_ms, 1),
+        })
+
+    async def run(self) -> bool:
+        async with main.app.router.lifespan_context(main.app):
+            started = time.perf_counter()
+            for game_number in range(1, self.args.games + 1):
+                await self.play_game(game_number)
+                if game_number % self.args.sample_every == 0 or game_number == 1:
+                    await self.sample(game_number)
+                    self.print_sample(self.samples[-1], started)
+        return self.report()
+
+    def print_sample(self, sample: dict, started: float) -> None:
+        if len(self.samples) == 1:
+            print(" ".join(f"{key:>12}" for key in sample) + f"{'games/s':>12}")
+        rate = sample["game"] / (time.perf_counter() - started)
+        print(" ".join(f"{value:>12.1f}" if isinstance(value, float) else f"{value:>12}"
+                       for value in sample.values()) + f"{rate:>12.1f}")
+
+    def report(self) -> bool:
+        """Fail when a metric keeps growing after warm-up."""
+        print("\n" + ", ".join(f"{key}={value}" for key, value in self.stats.items()))
+        steady = self.samples[max(1, len(self.samples) // 4):]
+        if len(steady) < 4:
+            print("Not enough samples to judge growth (raise --games or lower --sample-every)")
+            return True
+
+        half = len(steady) // 2
+        # metric -> allowed growth from the first to the last half of the steady samples
+        limits = {"rss_mb": 0.10, "objects": 0.05, "tasks": 0.0, "disconnected": 0.0,
+                  "connections": 0.0, "lobby_conns": 0.0, "timers": 0.0, "chat_buckets": 0.0,
+                  "players": 0.0, "round": 0.0, "round_log": 0.0}
+        ok = True
+        for metric, allowed in limits.items():
+            first = statistics.median(sample[metric] for sample in steady[:half])
+            last = statistics.median(sample[metric] for sample in steady[half:])
+            # Small absolute slack so a single in-flight task does not fail the run
+            if last > first * (1 + allowed) + (1 if metric != "rss_mb" else 2):
+                print(f"FAIL {metric}: {first} -> {last}")
+                ok = False
+        # Hibernated lobbies fill up to the memory budget, then spill to disk
+        if max(sample["hibernated_kb"] for sample in self.samples) > lobby_store.budget // 1024:
+            print(f"FAIL hibernated lobbies exceed the {lobby_store.budget} byte budget")
+            ok = False
+        worst_lag = max(sample["lag_ms"] for sample in self.samples[1:])
+        if worst_lag > self.args.max_lag_ms:
+            print(f"FAIL event loop blocked for {worst_lag} ms (limit {self.args.max_lag_ms} ms)")
+            ok = False
+        print("PASS: no unbounded growth, no loop stalls" if ok else "Leak or loop stall suspected")
+        return ok
+
+
+def parse_range(value: str):
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--players", type=parse_range, default=(4, 12), help="players per game, e.g. 4-12")
+    parser.add_argument("--chaos", type=float, default=0.1, help="probability of each injected fault")
+    parser.add_argument("--max-rounds", type=int, default=30)
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument("--reconnect-timeout", type=float, default=0.05,
+                        help="seconds before a dropped player is removed (the server uses 60)")
+    parser.add_argument("--hibernate-after", type=float, default=0.05,
+                        help="seconds an empty lobby waits before it is hibernated (the server uses 300)")
+    parser.add_argument("--max-lag-ms", type=float, default=100,
+                        help="longest event loop stall allowed after the first sample")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log-level", default="CRITICAL")
+    args = parser.parse_args()
+
+    logging.disable(getattr(logging, args.log_level.upper()))
+    message_handler.RECONNECT_TIMEOUT = args.reconnect_timeout
+    message_handler.HIBERNATE_AFTER = args.hibernate_after
+    random.seed(args.seed)
+
+    ok = asyncio.run(Soak(args).run())
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,124 @@
+"""Read the shared-memory lobby summaries, or stress the seqlock across processes.
+
+Without --selftest it prints what every running worker publishes (the same
+data as GET /api/lobbies), optionally refreshing with --watch.
+
+With --selftest it starts --writers processes that each publish records
+as fast as they can into their own region, and --readers processes that
+read all regions in a loop. Every record a writer publishes keeps
+round == players and connected == spectators, so a torn read (half an
+old record, half a new one) breaks the invariant; readers count those,
+how often the seqlock made them retry, and how fast reads are.
+
+Usage (from the backend directory):
+    python tools/summary_check.py [--dir DIR] [--watch 1]
+    python tools/summary_check.py --selftest [--writers 4] [--readers 4] [--seconds 3]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import lobby_summary  # noqa: E402
+from lobby_summary import STATUSES, SummaryPublisher, SummaryReader  # noqa: E402
+
+
+def writer(directory: str, seconds: float, ready) -> None:
+    publisher = SummaryPublisher(directory)
+    publisher.start()
+    game_id = str(uuid.uuid4())
+    rng = random.Random()
+    ready.wait()
+    deadline = time.monotonic() + seconds
+    writes = 0
+    while time.monotonic() < deadline:
+        counts = [rng.randrange(200) for _ in STATUSES]
+        players = sum(counts)
+        publisher.write(game_id, bool(writes % 2), players, writes, writes, counts)
+        writes += 1
+    # Leave the region mapped until the readers are done
+    time.sleep(0.5)
+    publisher.stop()
+
+
+def reader(directory: str, seconds: float, ready, results) -> None:
+    summary_reader = SummaryReader(directory)
+    ready.wait()
+    deadline = time.monotonic() + seconds
+    reads = torn = 0
+    versions = {}
+    started = time.perf_counter()
+    while time.monotonic() < deadline:
+        for summary in summary_reader.read_all():
+            reads += 1
+            if summary["round"] != summary["players"] or summary["connected"] != summary["spectators"]:
+                torn += 1
+            # A region's version never goes backwards
+            if summary["version"] < versions.get(summary["pid"], 0):
+                torn += 1
+            versions[summary["pid"]] = summary["version"]
+    elapsed = time.perf_counter() - started
+    results.put((reads, torn, elapsed))
+
+
+def selftest(args) -> bool:
+    directory = tempfile.mkdtemp(prefix="summary_check_")
+    ready = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    writers = [multiprocessing.Process(target=writer, args=(directory, args.seconds, ready))
+               for _ in range(args.writers)]
+    readers = [multiprocessing.Process(target=reader, args=(directory, args.seconds, ready, results))
+               for _ in range(args.readers)]
+    for process in writers:
+        process.start()
+    # Wait for every writer to create its region before the clock starts
+    while len(os.listdir(directory)) < args.writers:
+        time.sleep(0.01)
+    for process in readers:
+        process.start()
+    ready.set()
+
+    totals = [results.get() for _ in readers]
+    for process in writers + readers:
+        process.join()
+
+    reads = sum(r for r, _, _ in totals)
+    torn = sum(t for _, t, _ in totals)
+    elapsed = max(e for _, _, e in totals)
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s: "
+          f"{reads} reads ({reads / elapsed:,.0f}/s, {elapsed / max(reads, 1) * 1e6 * args.readers:.2f} us each), "
+          f"torn={torn}")
+    return torn == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=lobby_summary.SUMMARY_DIR)
+    parser.add_argument("--watch", type=float, default=0, help="refresh every N seconds")
+    parser.add_argument("--selftest", action="store_true")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    if args.selftest:
+        sys.exit(0 if selftest(args) else 1)
+
+    summary_reader = SummaryReader(args.dir)
+    while True:
+        print(json.dumps(summary_reader.read_all(), indent=2))
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
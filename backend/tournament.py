@@ -0,0 +1,432 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+from connection import Connection
+from connection_registry import connection_registry
+from game_rules import GameRules, DEFAULT_RULES, get_rules
+from lobby_actor import LobbyActor
+from lobby_manager import LobbyManager, PlayerStatus
+from scheduler import scheduler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TABLE_SIZE = int(os.getenv("GAME_TOURNAMENT_TABLE_SIZE", "8"))  # most players per table
+BREAK_SECONDS = float(os.getenv("GAME_TOURNAMENT_BREAK", "15"))  # between stages, to read the standings
+GAME_TIMEOUT = float(os.getenv("GAME_TOURNAMENT_GAME_TIMEOUT", "1200"))  # a stage's games are ended after this
+
+# Tournament states
+IDLE = "idle"
+REGISTRATION = "registration"
+RUNNING = "running"
+FINISHED = "finished"
+
+
+class Participant:
+    """A tournament entrant and their running totals."""
+
+    __slots__ = ("id", "name", "connection", "points", "wins", "survived", "games")
+
+    def __init__(self, id: str, name: str, connection: Optional[Connection]):
+        self.id = id
+        self.name = name
+        self.connection = connection  # Last known connection (bound to a table while seated)
+        self.points = 0
+        self.wins = 0
+        self.survived = 0
+        self.games = 0
+
+    def live_connection(self) -> Optional[Connection]:
+        connection = connection_registry.get(self.id) or self.connection
+        return connection if connection is not None and not connection.closed else None
+
+
+def plan_tables(participants: List[Participant], table_size: int, min_players: int) -> List[List[Participant]]:
+    """Split participants into balanced tables.
+
+    As few tables as table_size allows (but none below min_players), with
+    sizes differing by at most one. Participants are dealt in snake order
+    by standing (1..k, k..1, ...), so every table gets a similar mix of
+    leaders and trailers; ties are broken at random. O(n log n).
+    """
+    if len(participants) < min_players:
+        return []
+
+    count = max(1, min(math.ceil(len(participants) / table_size), len(participants) // min_players))
+    ranked = list(participants)
+    random.shuffle(ranked)
+    ranked.sort(key=lambda p: (p.points, p.wins), reverse=True)  # Stable, so ties stay shuffled
+
+    tables: List[List[Participant]] = [[] for _ in range(count)]
+    for i, participant in enumerate(ranked):
+        row, column = divmod(i, count)
+        tables[column if row % 2 == 0 else count - 1 - column].append(participant)
+    return tables
+
+
+class Tournament:
+    """Runs many tables at once from one pool of participants.
+
+    Participants register into the pool, then play in stages: at the start
+    of every stage everyone with a live connection is dealt into balanced
+    tables (see plan_tables) and every table starts its game at once.
+    Tables are ordinary LobbyManagers, each with its own actor, so their
+    games run in parallel through the usual handlers; the table objects
+    are reused from stage to stage. Results arrive from
+    LobbyManager.end_game as history records; when the last table of the
+    stage is done, everyone is sent the standings and, after a break, the
+    next stage is seated. Participants who are away when a stage starts
+    sit it out and are seated again once they are back.
+
+    Registration, results and standings are plain (synchronous) updates;
+    seating and timeouts run on the tournament's own actor, which only
+    ever calls into table actors, never the other way round.
+    """
+
+    WIN_POINTS = 3
+    SURVIVAL_POINTS = 1
+    TOP_STANDINGS = 10  # entries in every standings message
+
+    def __init__(self):
+        self.state = IDLE
+        self.participants: Dict[str, Participant] = {}
+        self.tables: List[LobbyManager] = []  # Grown as needed, reused every stage
+        self.seated_tables = 0  # Tables in use this stage (a prefix of self.tables)
+        self.playing: set = set()  # Tables whose game of this stage has not finished
+        self.table_numbers: Dict[LobbyManager, int] = {}
+        self.stage = 0
+        self.stages = 0
+        self.table_size = TABLE_SIZE
+        self.rules: GameRules = DEFAULT_RULES
+        self.round_seconds: Optional[int] = None
+        self.actor = LobbyActor("tournament")
+        self._timers: list = []  # Scheduler handles of the current stage
+        self._standings: Optional[List[Participant]] = None  # Sorted, until the next result
+        self._saved_playing: set = set()  # Table numbers still playing when saved (see restore_snapshot)
+
+    def open(self, stages: int, table_size: int = TABLE_SIZE, rules: GameRules = DEFAULT_RULES,
+             round_seconds: Optional[int] = None) -> bool:
+        """Start taking registrations for a new tournament (False while one is running)."""
+        if self.state in (REGISTRATION, RUNNING):
+            return False
+
+        self.participants = {}
+        self._standings = None
+        self.stage = 0
+        self.stages = stages
+        self.table_size = max(table_size, rules.min_players)
+        self.rules = rules
+        self.round_seconds = round_seconds or rules.round_seconds
+        self.state = REGISTRATION
+        logger.info(f"Tournament open: {stages} stages, tables of up to {self.table_size}, rules '{rules.name}'")
+        return True
+
+    def register(self, player_id: str, name: str, connection: Connection) -> Optional[Participant]:
+        """Add a participant to the pool (None if no tournament is taking entries).
+
+        Late entries are welcome while the tournament runs; they are seated
+        from the next stage on.
+        """
+        if self.state not in (REGISTRATION, RUNNING):
+            return None
+
+        participant = Participant(player_id, name, connection)
+        self.participants[player_id] = participant
+        self._standings = None
+        logger.info(f"{name} ({player_id}) entered the tournament ({len(self.participants)} participants)")
+        return participant
+
+    def attach(self, player_id: str, connection: Connection) -> Optional[Participant]:
+        """Give a returning participant who is not seated a new connection."""
+        participant = self.participants.get(player_id)
+        if participant is not None:
+            participant.connection = connection
+        return participant
+
+    def start(self) -> bool:
+        """Seat the first stage (False unless registration is open with enough players)."""
+        if self.state != REGISTRATION or len(self.participants) < self.rules.min_players:
+            return False
+
+        self.state = RUNNING
+        self.actor.submit(self.start_stage)
+        return True
+
+    async def start_stage(self) -> None:
+        """Seat everyone who is connected and start every table's game (runs in the actor)."""
+        if self.state != RUNNING:
+            return
+
+        # Free last stage's tables first, so no player is ever bound to two
+        await asyncio.gather(*(table.actor.call(self._clear_table, table)
+                               for table in self.tables[:self.seated_tables]))
+
+        present = [p for p in self.participants.values() if p.live_connection() is not None]
+        groups = plan_tables(present, self.table_size, self.rules.min_players)
+        if not groups:
+            logger.warning(f"Only {len(present)} participants connected - ending the tournament")
+            await self.finish()
+            return
+
+        self.stage += 1
+        while len(self.tables) < len(groups):
+            table = LobbyManager(tournament=self)
+            self.table_numbers[table] = len(self.tables) + 1
+            self.tables.append(table)
+        self.seated_tables = len(groups)
+        self.playing = set(self.tables[:len(groups)])
+
+        await asyncio.gather(*(table.actor.call(self._seat_table, table, group)
+                               for table, group in zip(self.tables, groups)))
+        self._timers = [scheduler.call_later(GAME_TIMEOUT, self.actor.submit, self.end_overdue_games, self.stage)]
+        logger.info(f"Tournament stage {self.stage}/{self.stages}: {len(present)} players at {len(groups)} tables "
+                    f"({len(self.participants) - len(present)} sitting out)")
+
+    async def _clear_table(self, table: LobbyManager) -> None:
+        # Runs in the table's actor. Remember who is connected, then unbind everyone
+        for player_id, connection in table.connections.items():
+            participant = self.participants.get(player_id)
+            if participant is not None:
+                participant.connection = connection
+        table.reset_game()
+
+    async def _seat_table(self, table: LobbyManager, group: List[Participant]) -> None:
+        # Runs in the table's actor
+        table.set_rules(self.rules)
+        table.round_seconds = self.round_seconds
+        for participant in group:
+            table.add_player(participant.id, participant.name, participant.live_connection())
+            table.players[participant.id].status = PlayerStatus.READY
+
+        if not table.start_game():
+            logger.error(f"Table {self.table_numbers[table]} could not start its game")
+            self._table_done(table)
+            return
+
+        for participant in group:
+            await table.send_to(participant.id, {
+                "type": "table_assigned",
+                "stage": self.stage,
+                "table": self.table_numbers[table],
+                "gameId": table.game_id,
+                "handle": table.player_handles[participant.id]
+            })
+        # Same order as a manual start: lobby state with roles, then game_started
+        table.request_lobby_state()
+        await table.broadcast({
+            "type": "game_started"
+        })
+
+    def record_result(self, table: LobbyManager, record: dict) -> None:
+        """Add a finished table game to the standings (called by LobbyManager.end_game)."""
+        if table not in self.playing:
+            return
+
+        for entry in record["players"]:
+            participant = self.participants.get(entry["id"])
+            if participant is None:
+                continue
+            participant.games += 1
+            if entry["won"]:
+                participant.wins += 1
+                participant.points += self.WIN_POINTS
+            if entry["survived"]:
+                participant.survived += 1
+                participant.points += self.SURVIVAL_POINTS
+        self._standings = None
+        logger.info(f"Table {self.table_numbers[table]} finished stage {self.stage}: {record['winner']} won")
+        self._table_done(table)
+
+    def _table_done(self, table: LobbyManager) -> None:
+        self.playing.discard(table)
+        if not self.playing:
+            self.actor.submit(self.finish_stage, self.stage)
+
+    async def end_overdue_games(self, stage: int) -> None:
+        """End the games of a stage that ran past GAME_TIMEOUT (e.g. every player left a table)."""
+        if stage != self.stage:
+            return
+        for table in list(self.playing):
+            table.actor.submit(self._end_table_game, table)
+
+    async def _end_table_game(self, table: LobbyManager) -> None:
+        # Runs in the table's actor
+        if not table.game_in_progress:
+            self._table_done(table)
+            return
+
+        logger.info(f"Table {self.table_numbers[table]} timed out in stage {self.stage}")
+        await table.flush_lobby_state()
+        winner = table.end_game()  # Records the result
+        await table.broadcast({
+            "type": "game_over",
+            "winner": winner,
+            "timedOut": True
+        })
+        table.request_lobby_state()
+
+    async def finish_stage(self, stage: int) -> None:
+        """Send the standings, then seat the next stage after a break (runs in the actor)."""
+        if stage != self.stage or self.playing:
+            return
+
+        for handle in self._timers:
+            handle.cancel()
+        if self.stage >= self.stages:
+            await self.finish()
+            return
+
+        await self.send_standings(final=False)
+        self._timers = [scheduler.call_later(BREAK_SECONDS, self.actor.submit, self.start_stage)]
+
+    async def finish(self) -> None:
+        """End the tournament and send everyone the final standings."""
+        self.state = FINISHED
+        # Games still running (when ended early) no longer count, and no stage timer fires
+        for handle in self._timers:
+            handle.cancel()
+        self._timers = []
+        self.playing = set()
+        await self.send_standings(final=True)
+        logger.info(f"Tournament finished after {self.stage} stages with {len(self.participants)} participants")
+
+    def standings(self) -> List[Participant]:
+        """Participants by points, then wins, then survivals (sorted once per change)."""
+        if self._standings is None:
+            self._standings = sorted(self.participants.values(),
+                                     key=lambda p: (-p.points, -p.wins, -p.survived, p.name))
+        return self._standings
+
+    @staticmethod
+    def _standing(rank: int, participant: Participant) -> dict:
+        return {
+            "rank": rank,
+            "id": participant.id,
+            "name": participant.name,
+            "points": participant.points,
+            "wins": participant.wins,
+            "survived": participant.survived,
+            "games": participant.games
+        }
+
+    def describe_standings(self, offset: int = 0, limit: int = 50) -> List[dict]:
+        standings = self.standings()
+        return [self._standing(rank, participant)
+                for rank, participant in enumerate(standings[offset:offset + limit], start=offset + 1)]
+
+    async def send_standings(self, final: bool) -> None:
+        """Send every connected participant the top of the table and their own place.
+
+        The shared part is encoded once; each participant's frame only adds
+        their own entry.
+        """
+        head = json.dumps({
+            "type": "tournament_standings",
+            "stage": self.stage,
+            "stages": self.stages,
+            "final": final,
+            "participants": len(self.participants),
+            "top": self.describe_standings(0, self.TOP_STANDINGS)
+        })[:-1]
+        for rank, participant in enumerate(self.standings(), start=1):
+            connection = participant.live_connection()
+            if connection is not None:
+                you = json.dumps(self._standing(rank, participant))
+                await connection_registry.send(connection, f'{head}, "you": {you}}}')
+
+    def to_snapshot(self, table_snapshots: List[dict]) -> dict:
+        """Save the pool, standings and stage; tables are saved by their own actors first.
+
+        Taking the table snapshots before this one means a game that ends in
+        between is in the standings and already over in playing, so it can
+        never be counted twice after a restore.
+        """
+        return {
+            "state": self.state,
+            "stage": self.stage,
+            "stages": self.stages,
+            "tableSize": self.table_size,
+            "rules": self.rules.name,
+            "roundSeconds": self.round_seconds,
+            "participants": [
+                {"id": p.id, "name": p.name, "points": p.points, "wins": p.wins,
+                 "survived": p.survived, "games": p.games}
+                for p in self.participants.values()
+            ],
+            "tables": table_snapshots,
+            "playing": [self.table_numbers[table] for table in self.playing]
+        }
+
+    def restore_snapshot(self, snapshot: dict) -> List[Tuple[LobbyManager, dict]]:
+        """Load a tournament saved by to_snapshot (runs in the actor).
+
+        Returns fresh tables with the snapshots to restore into them (in
+        their own actors); call resume_stage once they are loaded.
+        Participants start without connections.
+        """
+        self.state = snapshot["state"]
+        self.stage = snapshot["stage"]
+        self.stages = snapshot["stages"]
+        self.table_size = snapshot["tableSize"]
+        self.rules = get_rules(snapshot["rules"]) or DEFAULT_RULES
+        self.round_seconds = snapshot["roundSeconds"]
+        self.participants = {}
+        for data in snapshot["participants"]:
+            participant = Participant(data["id"], data["name"], None)
+            participant.points = data["points"]
+            participant.wins = data["wins"]
+            participant.survived = data["survived"]
+            participant.games = data["games"]
+            self.participants[participant.id] = participant
+        self._standings = None
+
+        self.tables = [LobbyManager(tournament=self) for _ in snapshot["tables"]]
+        self.table_numbers = {table: number for number, table in enumerate(self.tables, start=1)}
+        self.seated_tables = len(self.tables)
+        self.playing = set()
+        self._saved_playing = set(snapshot["playing"])
+        logger.info(f"Restored tournament at stage {self.stage}/{self.stages} with "
+                    f"{len(self.participants)} participants at {len(self.tables)} tables")
+        return list(zip(self.tables, snapshot["tables"]))
+
+    def resume_stage(self) -> None:
+        """Carry on after a restore: wait for the tables whose game survived, or end the stage."""
+        if self.state != RUNNING:
+            return
+        self.playing = {table for table in self.tables
+                        if self.table_numbers[table] in self._saved_playing and table.game_in_progress}
+        self._saved_playing = set()
+        if self.playing:
+            self._timers = [scheduler.call_later(GAME_TIMEOUT, self.actor.submit, self.end_overdue_games, self.stage)]
+        else:
+            self.actor.submit(self.finish_stage, self.stage)
+
+    def describe(self) -> dict:
+        return {
+            "state": self.state,
+            "stage": self.stage,
+            "stages": self.stages,
+            "participants": len(self.participants),
+            "tableSize": self.table_size,
+            "rules": self.rules.name,
+            "roundSeconds": self.round_seconds,
+            "tables": [
+                {
+                    "table": self.table_numbers[table],
+                    "gameId": table.game_id,
+                    "players": len(table.players),
+                    "connected": len(table.connections),
+                    "gameInProgress": table.game_in_progress,
+                    "round": table.current_round
+                }
+                for table in self.tables[:self.seated_tables]
+            ]
+        }
+
+
+# Create a singleton instance
+tournament = Tournament()
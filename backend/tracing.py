@@ -0,0 +1,273 @@
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+import contextvars
+from contextvars import ContextVar
+from typing import Callable, Iterable, List, Optional
+from executors import disk_pool
+from scheduler import scheduler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = float(os.getenv("GAME_TRACE_SAMPLE", "0"))  # share of inbound messages traced
+BUFFER_SIZE = int(os.getenv("GAME_TRACE_BUFFER", "1000"))  # finished traces kept in memory
+MAX_SPANS = int(os.getenv("GAME_TRACE_MAX_SPANS", "2000"))  # per trace; a big broadcast is cut short
+TRACE_FILE = os.getenv("GAME_TRACE_FILE", "")  # also append finished traces here as JSON lines
+FLUSH_INTERVAL = 1.0  # seconds between trace file writes
+
+# The span that new spans attach to, in the task (or lobby actor item) doing the work
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)  # 0 is every trace's root
+
+
+class Span:
+    """A timed step of a trace; use as a context manager.
+
+    A span can belong to several traces at once: the work a lobby actor
+    does after a batch (one lobby_state for every message in it) is
+    recorded in the trace of every sampled message of the batch. Children
+    inherit the traces of their parent.
+    """
+
+    __slots__ = ("name", "traces", "id", "parent_id", "attrs", "start", "_token")
+
+    def __init__(self, name: str, traces: tuple, parent_id: Optional[int], attrs: dict, span_id: int = None):
+        self.name = name
+        self.traces = traces
+        self.id = next(_span_ids) if span_id is None else span_id
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start = 0.0
+        self._token = None
+
+    def child(self, name: str, **attrs) -> "Span":
+        return Span(name, self.traces, self.id, attrs)
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def record(self, name: str, start: float, end: float, **attrs) -> None:
+        """Add a finished child span measured elsewhere (perf_counter times)."""
+        span = self.child(name, **attrs)
+        span.start = start
+        span._finish(end)
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self._finish(time.perf_counter())
+
+    def _finish(self, end: float) -> None:
+        for trace in self.traces:
+            trace.add(self, end)
+
+
+class _NullSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """One traced inbound message: its root span and every span under it."""
+
+    __slots__ = ("tracer", "id", "started_at", "start", "root", "spans", "dropped")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.start = 0.0
+        self.root = Span(name, (self,), None, attrs, span_id=0)
+        self.spans: List[dict] = []
+        self.dropped = 0
+
+    def add(self, span: Span, end: float) -> None:
+        if span is self.root:
+            return
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({
+            "id": span.id,
+            "parent": span.parent_id,
+            "name": span.name,
+            "startUs": round((span.start - self.start) * 1e6, 1),
+            "durationUs": round((end - span.start) * 1e6, 1),
+            **span.attrs
+        })
+
+    def __enter__(self) -> "Trace":
+        self.root.__enter__()
+        self.start = self.root.start
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.root.__exit__(exc_type, exc, tb)
+        self.tracer.finish(self, time.perf_counter())
+
+
+class Tracer:
+    """Samples inbound messages and keeps their traces, with no collector.
+
+    start() decides per message: a random sample at sample_rate, plus every
+    message from a followed player (to chase one player's report). When a
+    message is not sampled nothing is recorded, and instrumented code pays
+    a context variable lookup per span. Finished traces go into a ring
+    buffer (GET /api/traces) and, if a trace file is set, are appended to
+    it as JSON lines in batches on the disk pool.
+    """
+
+    def __init__(self, sample_rate: float = SAMPLE_RATE, buffer_size: int = BUFFER_SIZE, path: str = TRACE_FILE):
+        self.sample_rate = sample_rate
+        self.followed: set = set()  # Player IDs whose every message is traced
+        self.traces: deque = deque(maxlen=buffer_size)
+        self.path = path
+        self.started = 0
+        self._pending: List[str] = []  # JSON lines not yet written
+        self._flush_timer = None
+
+    def start(self, name: str, player_id: Optional[str] = None, **attrs) -> Optional[Trace]:
+        """Begin a trace for this message, or return None if it is not sampled."""
+        if player_id not in self.followed and not (self.sample_rate and random.random() < self.sample_rate):
+            return None
+        self.started += 1
+        return Trace(self, name, {"playerId": player_id, **attrs})
+
+    def finish(self, trace: Trace, end: float) -> None:
+        root = trace.root
+        trace.spans.sort(key=lambda span: span["startUs"])
+        record = {
+            "traceId": trace.id,
+            "startedAt": trace.started_at,
+            "name": root.name,
+            "durationUs": round((end - trace.start) * 1e6, 1),
+            **root.attrs,
+            "droppedSpans": trace.dropped,
+            "spans": trace.spans
+        }
+        self.traces.append(record)
+        if self.path:
+            self._pending.append(json.dumps(record))
+            if self._flush_timer is None:
+                self._flush_timer = scheduler.call_later(FLUSH_INTERVAL, self._schedule_flush)
+
+    def recent(self, limit: int = 50, message_type: str = None, player_id: str = None) -> List[dict]:
+        """Newest finished traces first, optionally only one message type or player."""
+        found = []
+        for record in reversed(self.traces):
+            if message_type and record.get("type") != message_type:
+                continue
+            if player_id and record.get("playerId") != player_id:
+                continue
+            found.append(record)
+            if len(found) >= limit:
+                break
+        return found
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        return next((record for record in self.traces if record["traceId"] == trace_id), None)
+
+    def configure(self, sample_rate: float = None, follow: Iterable[str] = (), unfollow: Iterable[str] = ()) -> None:
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        self.followed.update(follow)
+        self.followed.difference_update(unfollow)
+        logger.info(f"Tracing {self.sample_rate:.2%} of messages, following {len(self.followed)} players")
+
+    def describe(self) -> dict:
+        return {
+            "sampleRate": self.sample_rate,
+            "followed": sorted(self.followed),
+            "started": self.started,
+            "buffered": len(self.traces),
+            "bufferSize": self.traces.maxlen,
+            "file": self.path or None
+        }
+
+    def _schedule_flush(self) -> None:
+        # Scheduler callback: write on the disk pool, never on the event loop
+        self._flush_timer = None
+        untraced_task(self.flush())
+
+    async def flush(self) -> None:
+        """Append pending traces to the trace file."""
+        lines, self._pending = self._pending, []
+        if lines:
+            await disk_pool.run(self._write, lines)
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def untraced_task(coro, name: Optional[str] = None) -> asyncio.Task:
+    """Start a background task outside of any trace.
+
+    A task copies the context it is created in, so one started while a
+    message is traced would keep attaching its spans (every later send) to
+    that trace after it was recorded, and keep the trace alive with it.
+    """
+    return asyncio.create_task(coro, name=name, context=contextvars.Context())
+
+
+def current_span() -> Optional[Span]:
+    """The span new work is attributed to (None when nothing is traced)."""
+    return _current.get()
+
+
+def span(name: str, **attrs):
+    """A child of the current span, or a no-op stand-in when nothing is traced."""
+    parent = _current.get()
+    if parent is None:
+        return NULL_SPAN
+    return parent.child(name, **attrs)
+
+
+def shared_span(name: str, traces: List[Trace], **attrs) -> Span:
+    """A span recorded under the root of each of several traces."""
+    return Span(name, tuple(traces), 0, attrs)
+
+
+def traced(name: str) -> Callable:
+    """Decorator: record calls of a (synchronous) function as spans when traced."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _current.get()
+            if parent is None:
+                return fn(*args, **kwargs)
+            with parent.child(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Create a singleton instance
+tracer = Tracer()
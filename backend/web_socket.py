@@ -1,6 +1,10 @@
 from fastapi import WebSocket
 import logging
+from connection import WebSocketConnection
+from connection_registry import connection_registry
 from message_handler import handle_message, handle_disconnect
+from lobby_manager import lobby_manager
+from opcodes import OPCODE_TABLE_FRAME
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -10,20 +14,28 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("New WebSocket connection established")
 
-    player_id = None
+    connection = WebSocketConnection(websocket)
+    connection_registry.register(connection)
 
     try:
+        # Clients that know opcodes can switch to them on join/reconnect
+        await connection.send_text(OPCODE_TABLE_FRAME)
+
         while True:
             # Receive message from client
             data = await websocket.receive_text()
             logger.info(f"Message received: {data}")
 
-            # Process message with the handler
-            player_id = await handle_message(websocket, data, player_id)
+            # Process message with the handler (the registry tracks who the sender is)
+            await handle_message(connection, data)
 
     except Exception as e:
         logger.error(f"WebSocket disconnected: {str(e)}")
     finally:
+        await connection.close()
+        connection_registry.unregister(connection)
+        lobby_manager.spectators.remove(connection)
+
         # Handle disconnection with timeout for reconnection
-        if player_id:
-            await handle_disconnect(player_id)
+        if connection.player_id:
+            await handle_disconnect(connection.player_id, connection)
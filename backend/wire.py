@@ -0,0 +1,60 @@
+import json
+from typing import Dict, List
+from game_roles import Role
+
+# Wire codecs a connection can negotiate
+JSON_CODEC = "json"
+COMPACT_CODEC = "compact"
+
+# Compact codes for enum values (index in the list is the code)
+STATUS_CODES: Dict[str, int] = {
+    status: code for code, status in enumerate(["WAITING", "READY", "ALIVE", "SICK", "DEAD"])
+}
+ROLE_CODES: Dict[str, int] = {
+    role.value: code for code, role in enumerate(Role)
+}
+
+
+def dumps(message: dict) -> str:
+    """Serialize a message without optional whitespace."""
+    return json.dumps(message, separators=(",", ":"))
+
+
+def encode_lobby_state(lobby_state: dict, handles: Dict[str, int]) -> str:
+    """Encode a lobby_state message with the compact schema.
+
+    Compact lobby_state:
+        {"t": "ls",
+         "p": [[handle, name, statusCode, roleCode or -1], ...],
+         "r": allReady (0/1),
+         "g": gameInProgress (0/1),
+         "id": gameId,
+         "ru": rules (rule set name),
+         "rs": roundSeconds (0 for untimed rounds),
+         "re": roundEndsAt (epoch ms; omitted when no timed round is running)}
+
+    Player handles are small integers given out by LobbyManager when a
+    player joins; clients learn their own handle from the joined message.
+    """
+    players: List[list] = [
+        [
+            handles.get(p["id"], -1),
+            p["name"],
+            STATUS_CODES[p["status"]],
+            ROLE_CODES.get(p.get("role"), -1)
+        ]
+        for p in lobby_state["players"]
+    ]
+
+    message = {
+        "t": "ls",
+        "p": players,
+        "r": int(lobby_state["allReady"]),
+        "g": int(lobby_state["gameInProgress"]),
+        "id": lobby_state["gameId"],
+        "ru": lobby_state["rules"],
+        "rs": lobby_state["roundSeconds"] or 0
+    }
+    if lobby_state["roundEndsAt"]:
+        message["re"] = lobby_state["roundEndsAt"]
+    return dumps(message)
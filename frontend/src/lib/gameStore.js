@@ -17,6 +17,9 @@ export const gameState = writable({
   gameStarted: false,
   gameOver: false,
   gameInProgress: false,
+  rules: null,
+  roundSeconds: null, // Round timer length (null: the doctor ends rounds)
+  roundEndsAt: null, // Epoch ms when the current timed round ends
   
   // Role information
   playerRole: null,
@@ -80,6 +83,9 @@ export function resetGameState() {
     gameStarted: false,
     gameOver: false,
     gameInProgress: false,
+    rules: null,
+    roundSeconds: null,
+    roundEndsAt: null,
     playerRole: null,
     roleInfo: null,
     currentRound: 0,
@@ -14,6 +14,13 @@ import { get } from 'svelte/store';
 // Socket instance
 let socket = null;
 
+// SSE fallback (for networks that break WebSockets)
+let eventSource = null;
+let sseSessionId = null;
+let useSSE = false;
+let failedSocketOpens = 0;
+const SOCKET_FAILURES_BEFORE_SSE = 2;
+
 // Game tracking
 let currentGameId = null;
 
@@ -22,12 +29,30 @@ let reconnectAttempts = 0;
 const maxReconnectAttempts = 5;
 const reconnectInterval = 3000; // 3 seconds between reconnect attempts
 let reconnectTimer = null;
+let nextReconnectDelay = null; // Backoff hint from the server, used once
 let isIntentionalDisconnect = false;
 let pingInterval = null;
 const PING_INTERVAL = 30000; // 30 seconds
+let pingSentAt = null;
+let lastRtt = null; // Round-trip time of the last ping, reported with the next one
+
+// Integer opcodes for message types, from the table the server sends on connect
+const OPCODE_VERSION = 2;
+let opcodeTable = null; // type -> opcode
+let typesByOpcode = null; // opcode -> type
+
+// Compact lobby_state schema (backend wire.py): codes index into these lists
+const STATUS_CODES = ['WAITING', 'READY', 'ALIVE', 'SICK', 'DEAD'];
+const ROLE_CODES = ['DOCTOR', 'ALLY', 'ENEMY', 'HEARTBROKEN_ALLY', 'HEARTBROKEN_ENEMY'];
+let ownHandle = null; // Our player handle, from joined/reconnected
 
 // Connect to the WebSocket server
 export function connect() {
+  if (useSSE) {
+    connectSSE();
+    return;
+  }
+
   // Close existing connection if any
   if (socket) {
     socket.close();
@@ -39,9 +64,12 @@ export function connect() {
   
   try {
     socket = new WebSocket(wsUrl);
+    let opened = false;
     
     // Connection opened
     socket.addEventListener('open', (event) => {
+      opened = true;
+      failedSocketOpens = 0;
       reconnectAttempts = 0;
       isIntentionalDisconnect = false;
       
@@ -51,19 +79,7 @@ export function connect() {
         connectionError: null 
       });
       
-      // Check if we need to send a reconnect message
-      if (window.localStorage.getItem('playerId') && 
-          window.localStorage.getItem('playerName') &&
-          window.localStorage.getItem('gameId')) {
-        setTimeout(() => {
-          sendMessage({
-            type: 'reconnect',
-            playerId: window.localStorage.getItem('playerId'),
-            playerName: window.localStorage.getItem('playerName'),
-            gameId: window.localStorage.getItem('gameId')
-          });
-        }, 500);
-      }
+      sendStoredReconnect();
       
       console.log('Connected to WebSocket server');
       startPingInterval();
@@ -79,6 +95,12 @@ export function connect() {
       updateConnectionState({ isConnected: false });
       console.log('Disconnected from WebSocket server');
       
+      // WebSockets never got through - fall back to SSE
+      if (!opened && ++failedSocketOpens >= SOCKET_FAILURES_BEFORE_SSE) {
+        console.log('WebSocket unavailable, switching to SSE fallback');
+        useSSE = true;
+      }
+      
       // Start reconnection attempts if not deliberately disconnected
       if (!isIntentionalDisconnect) {
         attemptReconnect();
@@ -103,12 +125,94 @@ export function connect() {
   }
 }
 
+// Connect using the SSE stream + HTTP POST fallback
+function connectSSE() {
+  if (eventSource) {
+    eventSource.close();
+  }
+
+  eventSource = new EventSource('/sse');
+
+  // The server opens every stream with a session event
+  eventSource.addEventListener('session', (event) => {
+    sseSessionId = JSON.parse(event.data).sessionId;
+    reconnectAttempts = 0;
+    isIntentionalDisconnect = false;
+
+    updateConnectionState({
+      isConnected: true,
+      isReconnecting: false,
+      connectionError: null
+    });
+
+    sendStoredReconnect();
+
+    console.log('Connected to SSE stream');
+  });
+
+  eventSource.addEventListener('message', handleSocketMessage);
+
+  // EventSource retries on its own and gets a new session event
+  eventSource.addEventListener('error', (event) => {
+    sseSessionId = null;
+    updateConnectionState({ isConnected: false });
+    console.error('SSE error:', event);
+  });
+}
+
+// Send a reconnect message if we have a stored session
+function sendStoredReconnect() {
+  if (window.localStorage.getItem('playerId') && 
+      window.localStorage.getItem('playerName') &&
+      window.localStorage.getItem('gameId')) {
+    setTimeout(() => {
+      // Sequence numbers are per game (each tournament table has its own)
+      const lastSeq = window.localStorage.getItem('lastSeqGameId') === window.localStorage.getItem('gameId')
+        ? window.localStorage.getItem('lastSeq')
+        : null;
+      sendMessage({
+        type: 'reconnect',
+        token: window.localStorage.getItem('resumeToken') || undefined,
+        lastSeq: lastSeq ? Number(lastSeq) : undefined,
+        playerId: window.localStorage.getItem('playerId'),
+        playerName: window.localStorage.getItem('playerName'),
+        gameId: window.localStorage.getItem('gameId')
+      });
+    }, 500);
+  }
+}
+
 // Handle incoming WebSocket messages
 function handleSocketMessage(event) {
   try {
-    const data = JSON.parse(event.data);
+    const data = decodeCompact(JSON.parse(event.data));
     console.log('Message from server:', data);
     
+    // Once negotiated, frames carry an opcode instead of the type name
+    if (data.op !== undefined && typesByOpcode) {
+      data.type = typesByOpcode[data.op];
+    }
+    
+    // Remember the last public event so a reconnect only replays what we missed
+    if (data.seq) {
+      window.localStorage.setItem('lastSeq', data.seq);
+      window.localStorage.setItem('lastSeqGameId', window.localStorage.getItem('gameId'));
+    }
+    
+    // Seated at a (new) tournament table: its game and event sequence replace the old ones
+    if (data.type === 'table_assigned') {
+      currentGameId = data.gameId;
+      ownHandle = data.handle ?? null;
+      window.localStorage.setItem('gameId', data.gameId);
+      window.localStorage.removeItem('lastSeq');
+      window.localStorage.removeItem('lastSeqGameId');
+    }
+    
+    // Keep the latest resume token for fast reconnects
+    if (data.resumeToken) {
+      window.localStorage.setItem('resumeToken', data.resumeToken);
+    }
+    
     // Check for game_id_mismatch message type
     if (data.type === 'game_id_mismatch') {
       console.log('Game ID mismatch. Server has a different game. Forcing refresh...');
@@ -137,17 +241,26 @@ function handleSocketMessage(event) {
         return;
       }
       
+      if (data.gameId !== storedGameId) {
+        window.localStorage.removeItem('lastSeq');
+        window.localStorage.removeItem('lastSeqGameId');
+      }
       currentGameId = data.gameId;
       window.localStorage.setItem('gameId', data.gameId);
     }
     
     switch (data.type) {
+      case 'opcodes':
+        handleOpcodes(data);
+        break;
+      
       case 'joined':
         handleJoined(data);
         break;
       
       case 'reconnected':
         // No need for a message
+        ownHandle = data.handle ?? null;
         break;
       
       case 'lobby_state':
@@ -187,8 +300,19 @@ function handleSocketMessage(event) {
         handleRoundEnded(data);
         break;
         
+      case 'server_restarting':
+        // Come back after the server's hint so clients do not all reconnect at once
+        console.log(`Server restarting, reconnecting in ${data.retryAfterMs}ms`);
+        nextReconnectDelay = data.retryAfterMs;
+        reconnectAttempts = 0;
+        break;
+        
       case 'pong':
         // Got pong response from server
+        if (pingSentAt !== null) {
+          lastRtt = Math.round(performance.now() - pingSentAt);
+          pingSentAt = null;
+        }
         console.log('Received pong from server');
         break;
       
@@ -206,9 +330,61 @@ function handleSocketMessage(event) {
   }
 }
 
+// Handle the opcode table sent on connect (ignored if we speak another version)
+function handleOpcodes(data) {
+  if (data.version !== OPCODE_VERSION) {
+    opcodeTable = null;
+    typesByOpcode = null;
+    return;
+  }
+  opcodeTable = data.opcodes;
+  typesByOpcode = [];
+  for (const [type, opcode] of Object.entries(opcodeTable)) {
+    typesByOpcode[opcode] = type;
+  }
+}
+
+// Expand a compact lobby_state ("t": "ls") into the verbose message
+function decodeCompact(data) {
+  if (data.t !== 'ls') {
+    return data;
+  }
+  const playerId = get(gameState).playerId;
+  return {
+    type: 'lobby_state',
+    players: data.p.map(([handle, name, status, role]) => ({
+      id: handle === ownHandle && playerId ? playerId : handle,
+      name,
+      status: STATUS_CODES[status],
+      ...(role >= 0 ? { role: ROLE_CODES[role] } : {})
+    })),
+    allReady: data.r === 1,
+    gameInProgress: data.g === 1,
+    gameId: data.id,
+    rules: data.ru,
+    roundSeconds: data.rs || null,
+    roundEndsAt: data.re ?? null
+  };
+}
+
+// Replace the type name with its opcode ("op" must be the first key) and
+// ask for opcodes in return when joining or reconnecting
+function encodeMessage(message) {
+  if (!opcodeTable || opcodeTable[message.type] === undefined) {
+    return message;
+  }
+  const { type, ...rest } = message;
+  const encoded = { op: opcodeTable[type], ...rest };
+  if (type === 'join' || type === 'reconnect') {
+    encoded.opcodes = OPCODE_VERSION;
+  }
+  return encoded;
+}
+
 // Handle joined message
 function handleJoined(data) {
   updatePlayerInfo({ playerId: data.playerId });
+  ownHandle = data.handle ?? null;
   
   // Save player ID and name to localStorage for reconnection
   if (data.playerId) {
@@ -256,7 +432,10 @@ function handleLobbyState(data) {
   updateGameState({
     players: data.players,
     allReady: data.allReady,
-    gameInProgress: data.gameInProgress
+    gameInProgress: data.gameInProgress,
+    rules: data.rules,
+    roundSeconds: data.roundSeconds,
+    roundEndsAt: data.roundEndsAt
   });
 }
 
@@ -358,8 +537,19 @@ function handleRoundEnded(data) {
 
 // Send a message to the server
 export function sendMessage(message) {
+  if (useSSE) {
+    if (!sseSessionId) {
+      return false;
+    }
+    const messageString = JSON.stringify(encodeMessage(message));
+    console.log('Sending message:', messageString);
+    fetch(`/sse/${sseSessionId}`, { method: 'POST', body: messageString })
+      .catch(err => console.error('Error sending message:', err));
+    return true;
+  }
+
   if (socket && socket.readyState === WebSocket.OPEN) {
-    const messageString = JSON.stringify(message);
+    const messageString = JSON.stringify(encodeMessage(message));
     console.log('Sending message:', messageString);
     socket.send(messageString);
     return true;
@@ -385,9 +575,12 @@ function attemptReconnect() {
     }
     
     // Try to reconnect after delay
+    // Jitter spreads out reconnects when many phones drop at once
+    const delay = (nextReconnectDelay ?? reconnectInterval) + Math.random() * 1000;
+    nextReconnectDelay = null;
     reconnectTimer = setTimeout(() => {
       connect();
-    }, reconnectInterval);
+    }, delay);
   } else {
     updateConnectionState({
       isReconnecting: false,
@@ -403,7 +596,8 @@ function startPingInterval() {
   
   pingInterval = setInterval(() => {
     if (socket && socket.readyState === WebSocket.OPEN) {
-      sendMessage({ type: 'ping' });
+      pingSentAt = performance.now();
+      sendMessage(lastRtt === null ? { type: 'ping' } : { type: 'ping', rtt: lastRtt });
     }
   }, PING_INTERVAL);
 }
@@ -436,6 +630,9 @@ export function clearSession() {
   window.localStorage.removeItem('playerId');
   window.localStorage.removeItem('playerName');
   window.localStorage.removeItem('gameId');
+  window.localStorage.removeItem('resumeToken');
+  window.localStorage.removeItem('lastSeq');
+  window.localStorage.removeItem('lastSeqGameId');
   resetGameState();
 }
 
@@ -454,4 +651,10 @@ export function disconnect() {
     socket.close();
     socket = null;
   }
+
+  if (eventSource) {
+    eventSource.close();
+    eventSource = null;
+    sseSessionId = null;
+  }
 }